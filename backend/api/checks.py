@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .versioning import UNSHARED_VERSIONS_MESSAGE, versions_are_shared
+
+
+@register(Tags.caches)
+def check_rating_coalescing_cache(app_configs, **kwargs):
+    """Coalesced rating writes are applied by flush_ratings, in a process of its own."""
+    if settings.RATING_WRITE_COALESCING and not versions_are_shared():
+        return [
+            Error(
+                "RATING_WRITE_COALESCING requires a default cache shared by all processes.",
+                hint=UNSHARED_VERSIONS_MESSAGE,
+                id="api.E001",
+            )
+        ]
+    return []
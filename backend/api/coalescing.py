@@ -0,0 +1,69 @@
+from django.db import connection, transaction
+
+from .models import DirtyLocationRating, Location, Rating
+from .versioning import CATALOG, GRAPH, bump_version
+
+
+def mark_location_dirty(location_id):
+    """
+    Queues a location for a rating refresh; a no-op if it is already queued.
+
+    Call it once the rating change has committed (see queue_location_refresh).
+    Marked inside the rater's transaction, the insert could find the location
+    still queued and do nothing while a flusher dequeues it and recomputes
+    without the uncommitted rating, which would then never be counted.
+    """
+    DirtyLocationRating.objects.bulk_create(
+        [DirtyLocationRating(location_id=location_id)], ignore_conflicts=True
+    )
+
+
+def queue_location_refresh(location_id):
+    """Marks a location dirty once the current transaction commits."""
+    transaction.on_commit(lambda: mark_location_dirty(location_id))
+
+
+def flush_dirty_locations(batch_size):
+    """
+    Refreshes the rating totals and average of up to ``batch_size`` queued
+    locations, oldest first, and returns how many were refreshed.
+
+    The batch is dequeued and recomputed in one transaction with a single
+    UPDATE ... FROM over the aggregated Rating rows. Rows another flusher has
+    locked are skipped. Locations are only queued once their rating change
+    has committed, so every change is either seen by the flush that dequeues
+    its location or queues the location again for a later one.
+    """
+    with transaction.atomic():
+        location_ids = list(
+            DirtyLocationRating.objects.select_for_update(skip_locked=True)
+            .order_by("marked_at")
+            .values_list("location_id", flat=True)[:batch_size]
+        )
+        if not location_ids:
+            return 0
+        DirtyLocationRating.objects.filter(location_id__in=location_ids).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {Location._meta.db_table} AS location
+                SET rating_sum = totals.rating_sum,
+                    rating_count = totals.rating_count,
+                    rating = CASE WHEN totals.rating_count > 0
+                        THEN totals.rating_sum::double precision / totals.rating_count
+                        ELSE 0 END
+                FROM (
+                    SELECT dirty.id, COALESCE(SUM(rating.value), 0) AS rating_sum,
+                        COUNT(rating.id) AS rating_count
+                    FROM unnest(%s::bigint[]) AS dirty(id)
+                    LEFT JOIN {Rating._meta.db_table} AS rating ON rating.location_id = dirty.id
+                    GROUP BY dirty.id
+                ) AS totals
+                WHERE location.id = totals.id
+                """,
+                [location_ids],
+            )
+        # A raw UPDATE does not send the signals that usually do this
+        bump_version(GRAPH)
+        bump_version(CATALOG)
+    return len(location_ids)
@@ -0,0 +1,155 @@
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+
+from .graph import get_snapshot
+
+Leg = namedtuple("Leg", ["travel_time", "travel_cost"])
+
+
+def all_pairs(size, sources, targets, weights, carried):
+    """
+    Floyd–Warshall over a dense matrix, vectorized one pivot at a time.
+
+    Returns the shortest ``weights`` distance between every pair of nodes, and
+    the total of ``carried`` along each of those shortest paths.
+    """
+    best = np.full((size, size), np.inf)
+    along = np.full((size, size), np.inf)
+    np.fill_diagonal(best, 0)
+    np.fill_diagonal(along, 0)
+    best[sources, targets] = weights
+    along[sources, targets] = carried
+    for k in range(size):
+        # Row and column k never improve while pivoting on k, so both updates
+        # can read them after the in-place write.
+        via = best[:, k, None] + best[None, k, :]
+        better = via < best
+        np.copyto(best, via, where=better)
+        np.copyto(along, along[:, k, None] + along[None, k, :], where=better)
+    return best, along
+
+
+class LegMatrices:
+    """
+    Fastest and cheapest travel between every pair of locations, over any
+    number of Route hops and across districts. Rows and columns follow the
+    node numbering of the GraphSnapshot they were built from.
+    """
+
+    def __init__(self, digest, pks, fastest_time, fastest_cost, cheapest_cost, cheapest_time):
+        self.digest = digest
+        self.pks = pks
+        self.fastest_time = fastest_time
+        self.fastest_cost = fastest_cost
+        self.cheapest_cost = cheapest_cost
+        self.cheapest_time = cheapest_time
+        self.index = {int(pk): node for node, pk in enumerate(pks)}
+
+    @classmethod
+    def build(cls, graph):
+        size = len(graph)
+        sources = np.frombuffer(graph.edge_source, dtype=np.int32)
+        targets = np.frombuffer(graph.edge_target, dtype=np.int32)
+        times = np.frombuffer(graph.edge_time, dtype=np.int32)
+        costs = np.frombuffer(graph.edge_cost, dtype=np.int32)
+        fastest_time, fastest_cost = all_pairs(size, sources, targets, times, costs)
+        cheapest_cost, cheapest_time = all_pairs(size, sources, targets, costs, times)
+        pks = np.frombuffer(graph.pks, dtype=np.int64).copy()
+        return cls(graph.routes_digest, pks, fastest_time, fastest_cost, cheapest_cost, cheapest_time)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                str(data["digest"]),
+                data["pks"],
+                data["fastest_time"],
+                data["fastest_cost"],
+                data["cheapest_cost"],
+                data["cheapest_time"],
+            )
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write next to the target and rename, so readers never see half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            digest=self.digest,
+            pks=self.pks,
+            fastest_time=self.fastest_time,
+            fastest_cost=self.fastest_cost,
+            cheapest_cost=self.cheapest_cost,
+            cheapest_time=self.cheapest_time,
+        )
+        os.replace(tmp_path, path)
+
+    def _leg(self, source_pk, destination_pk, time_matrix, cost_matrix):
+        source = self.index.get(source_pk)
+        destination = self.index.get(destination_pk)
+        if source is None or destination is None:
+            return None
+        travel_time = time_matrix[source, destination]
+        if np.isinf(travel_time):
+            return None
+        return Leg(int(travel_time), int(cost_matrix[source, destination]))
+
+    def fastest_leg(self, source_pk, destination_pk):
+        return self._leg(source_pk, destination_pk, self.fastest_time, self.fastest_cost)
+
+    def cheapest_leg(self, source_pk, destination_pk):
+        return self._leg(source_pk, destination_pk, self.cheapest_time, self.cheapest_cost)
+
+
+def artifact_path(digest):
+    return os.path.join(settings.ROUTE_ARTIFACT_DIR, f"legs-{digest}.npz")
+
+
+def prune_artifacts(digest):
+    """Deletes the leg artifacts of every other route graph, returns how many."""
+    keep = os.path.basename(artifact_path(digest))
+    try:
+        names = os.listdir(settings.ROUTE_ARTIFACT_DIR)
+    except FileNotFoundError:
+        return 0
+    pruned = 0
+    for name in names:
+        if name.startswith("legs-") and name.endswith(".npz") and ".tmp." not in name and name != keep:
+            os.remove(os.path.join(settings.ROUTE_ARTIFACT_DIR, name))
+            pruned += 1
+    return pruned
+
+
+def build_leg_matrices(graph):
+    """Computes the matrices for a snapshot and stores them as an artifact."""
+    matrices = LegMatrices.build(graph)
+    matrices.save(artifact_path(matrices.digest))
+    return matrices
+
+
+_matrices = None
+_matrices_lock = threading.Lock()
+
+
+def get_leg_matrices():
+    """
+    Returns the leg matrices for the current graph, loading the artifact written
+    by ``manage.py precompute_legs``, or None while there is none for the
+    current routes. Building them is O(n³), far too slow for a request.
+    """
+    global _matrices
+    digest = get_snapshot().routes_digest
+    matrices = _matrices
+    if matrices is None or matrices.digest != digest:
+        path = artifact_path(digest)
+        if not os.path.exists(path):
+            return None
+        with _matrices_lock:
+            if _matrices is None or _matrices.digest != digest:
+                _matrices = LegMatrices.load(path)
+            matrices = _matrices
+    return matrices
@@ -0,0 +1,72 @@
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri, iri_to_uri
+
+from .models import Location
+
+# Columns LocationEncoder reads, for Location.objects.values()
+LOCATION_FIELDS = ("id", "name", "image", "description", "rating", "district", "category")
+
+
+def location_rows(pks):
+    """Fetches ``.values()`` rows for the given Location ids in one query, keyed by id."""
+    return {row["id"]: row for row in Location.objects.filter(pk__in=pks).values(*LOCATION_FIELDS)}
+
+
+def image_url_builder(request):
+    """
+    Returns a function turning a stored image name into the URL
+    LocationSerializer.get_image would give for it. For file system storage
+    under a path-only MEDIA_URL the absolute prefix is built once, up front.
+    """
+    storage = Location._meta.get_field("image").storage
+    if request is None:
+        return storage.url
+    base_url = getattr(storage, "base_url", None)
+    if not (
+        isinstance(storage, FileSystemStorage)
+        and base_url
+        and base_url.startswith("/")
+        and not base_url.startswith("//")
+    ):
+        return lambda name: request.build_absolute_uri(storage.url(name))
+
+    prefix = request.build_absolute_uri(base_url)
+
+    def image_url(name):
+        path = filepath_to_uri(name).lstrip("/")
+        if "./" in path:
+            # Dot segments are resolved by build_absolute_uri, let it do that
+            return request.build_absolute_uri(storage.url(name))
+        return prefix + iri_to_uri(path)
+
+    return image_url
+
+
+class LocationEncoder:
+    """
+    Read-only stand-in for LocationSerializer that encodes ``.values()`` rows
+    (see LOCATION_FIELDS) into exactly the data the serializer produces for the
+    same locations, without going through the serializer field machinery.
+    ``user_ratings`` maps location ids to the requesting user's rating.
+    """
+
+    def __init__(self, request=None, user_ratings=None):
+        self.image_url = image_url_builder(request)
+        self.user_ratings = user_ratings or {}
+
+    def encode(self, row):
+        image = row["image"]
+        return {
+            "id": row["id"],
+            "image": self.image_url(image) if image else None,
+            "user_rating": self.user_ratings.get(row["id"]),
+            "name": row["name"],
+            "description": row["description"],
+            "rating": row["rating"],
+            "district": row["district"],
+            "category": row["category"],
+        }
+
+    def encode_many(self, rows):
+        encode = self.encode
+        return [encode(row) for row in rows]
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+from array import array
+from functools import cached_property
+
+from .models import Location, Route
+from .versioning import GRAPH, get_version
+
+
+class GraphSnapshot:
+    """
+    Read-only, compiled copy of the Location/Route graph.
+
+    Locations are numbered 0..n-1 in primary key order and every per-node
+    attribute lives in a parallel list or array indexed by that number. Routes
+    are numbered in primary key order as well, and the outgoing routes of each
+    node are stored CSR style: ``adj_edges[adj_offsets[v]:adj_offsets[v + 1]]``.
+    """
+
+    def __init__(self, version, locations, routes):
+        self.version = version
+
+        self.pks = array("q")
+        self.names = []
+        self.districts = []
+        self.ratings = array("d")
+        # Categories are interned per district: each district numbers its own
+        # category names, and a node's mask uses its own district's numbering.
+        self.category_bits = {}
+        self.category_masks = []
+        self.index = {}
+        self.pk_index = {}
+        for pk, name, district, rating, category in locations:
+            node = len(self.names)
+            self.pks.append(pk)
+            self.names.append(name)
+            self.districts.append(district)
+            self.ratings.append(rating)
+            bits = self.category_bits.setdefault(district, {})
+            mask = 0
+            for tag in category or ():
+                mask |= 1 << bits.setdefault(tag, len(bits))
+            self.category_masks.append(mask)
+            self.index[name] = node
+            self.pk_index[pk] = node
+
+        self.edge_source = array("i")
+        self.edge_target = array("i")
+        self.edge_time = array("i")
+        self.edge_cost = array("i")
+        # Routes whose destination lies in a district, keyed by district name
+        self.district_edges = {}
+        for source_pk, destination_pk, travel_time, travel_cost in routes:
+            edge = len(self.edge_source)
+            source = self.pk_index[source_pk]
+            target = self.pk_index[destination_pk]
+            self.edge_source.append(source)
+            self.edge_target.append(target)
+            self.edge_time.append(travel_time)
+            self.edge_cost.append(travel_cost)
+            self.district_edges.setdefault(self.districts[target], array("i")).append(edge)
+
+        node_count = len(self.names)
+        degree = [0] * (node_count + 1)
+        for source in self.edge_source:
+            degree[source + 1] += 1
+        for node in range(node_count):
+            degree[node + 1] += degree[node]
+        self.adj_offsets = array("i", degree)
+        self.adj_edges = array("i", bytes(4 * len(self.edge_source)))
+        fill = list(degree[:-1])
+        for edge, source in enumerate(self.edge_source):
+            self.adj_edges[fill[source]] = edge
+            fill[source] += 1
+        self._district_digests = {}
+
+    @cached_property
+    def routes_digest(self):
+        """
+        Content hash of the nodes and routes, stable across processes. Unlike
+        ``version`` it only changes when the travel network itself changes.
+        """
+        digest = hashlib.sha1(self.pks.tobytes())
+        for column in (self.edge_source, self.edge_target, self.edge_time, self.edge_cost):
+            digest.update(column.tobytes())
+        return digest.hexdigest()
+
+    def district_digest(self, district):
+        """
+        Content hash of what a plan into ``district`` depends on: the district's
+        locations with their ratings and categories, and the routes leading into
+        it. Stable across processes and graph versions.
+        """
+        digest = self._district_digests.get(district)
+        if digest is None:
+            content = hashlib.sha1()
+            for node, node_district in enumerate(self.districts):
+                if node_district == district:
+                    content.update(
+                        repr(
+                            (self.pks[node], self.names[node], self.ratings[node], self.category_masks[node])
+                        ).encode("utf-8")
+                    )
+            content.update(repr(sorted(self.category_bits.get(district, {}).items())).encode("utf-8"))
+            for edge in self.district_edges.get(district, ()):
+                content.update(
+                    repr(
+                        (
+                            self.pks[self.edge_source[edge]],
+                            self.pks[self.edge_target[edge]],
+                            self.edge_time[edge],
+                            self.edge_cost[edge],
+                        )
+                    ).encode("utf-8")
+                )
+            digest = self._district_digests[district] = content.hexdigest()
+        return digest
+
+    def category_mask(self, district, category):
+        """Bit for a category in a district's numbering, 0 if no location there has it."""
+        bit = self.category_bits.get(district, {}).get(category)
+        return 0 if bit is None else 1 << bit
+
+    def __len__(self):
+        return len(self.names)
+
+    def out_edges(self, node):
+        return self.adj_edges[self.adj_offsets[node]:self.adj_offsets[node + 1]]
+
+
+def build_snapshot(version):
+    locations = Location.objects.order_by("id").values_list(
+        "id", "name", "district", "rating", "category"
+    )
+    routes = Route.objects.order_by("id").values_list(
+        "source_id", "destination_id", "travel_time", "travel_cost"
+    )
+    return GraphSnapshot(version, locations, routes)
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Returns this process's compiled graph, rebuilding it first if a Location or
+    Route write has bumped the graph version since it was built.
+    """
+    global _snapshot
+    version = get_version(GRAPH)
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != version:
+        with _snapshot_lock:
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = build_snapshot(version)
+            snapshot = _snapshot
+    return snapshot
@@ -0,0 +1,259 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connection
+
+# Timings of the request being handled, None outside ServerTimingMiddleware
+_current = ContextVar("api_request_timings", default=None)
+
+# Upper bounds of the duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class RequestTimings:
+    """Per-request span durations (milliseconds), query count and DB time."""
+
+    def __init__(self):
+        self.spans = {}
+        self.queries = 0
+        self.db_ms = 0.0
+
+    def add(self, name, ms):
+        self.spans[name] = self.spans.get(name, 0.0) + ms
+
+
+class _Span:
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name, timings):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """
+    Times the enclosed block as a named phase of the current request. Outside a
+    request handled by ServerTimingMiddleware this is a shared no-op. Repeated
+    spans with the same name add up.
+    """
+    timings = _current.get()
+    if timings is None:
+        return _NULL_SPAN
+    return _Span(name, timings)
+
+
+class Histogram:
+    """Cumulative Prometheus style histogram with one series per label value."""
+
+    def __init__(self, name, help_text, label, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(
+                (value, list(counts), total, count)
+                for value, (counts, total, count) in self._series.items()
+            )
+        for value, counts, total, count in series:
+            label = f'{self.label}="{_escape(value)}"'
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {count}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Prometheus style counter with one series per label value."""
+
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + 1
+
+    def value(self, label_value):
+        with self._lock:
+            return self._values.get(label_value, 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for value, count in values:
+            lines.append(f'{self.name}{{{self.label}="{_escape(value)}"}} {count}')
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_duration = Histogram(
+    "api_request_duration_seconds", "Time spent handling API requests.", "view", DURATION_BUCKETS
+)
+request_db_duration = Histogram(
+    "api_request_db_duration_seconds", "Time spent in database queries per API request.", "view", DURATION_BUCKETS
+)
+request_queries = Histogram(
+    "api_request_db_queries", "Database queries per API request.", "view", QUERY_COUNT_BUCKETS
+)
+span_duration = Histogram(
+    "api_span_duration_seconds", "Time spent in named request phases.", "span", DURATION_BUCKETS
+)
+HISTOGRAMS = (request_duration, request_db_duration, request_queries, span_duration)
+
+route_cache_lookups = Counter(
+    "api_route_cache_lookups_total", "Route result cache lookups by result (hit or miss).", "result"
+)
+COUNTERS = (route_cache_lookups,)
+
+
+def render_metrics():
+    """All histograms and counters in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in (*HISTOGRAMS, *COUNTERS)) + "\n"
+
+
+class ServerTimingMiddleware:
+    """
+    Collects span timings, query count and DB time for every request, reports
+    them in a Server-Timing response header and records them in the histograms.
+
+    Works under WSGI and ASGI. For async views the query wrapper is installed
+    in the thread that runs their sync_to_async database work, which is one
+    thread per request, since a connection's wrappers only see its own thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self._record_query(timings)):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._report(request, response, timings, (time.perf_counter() - start) * 1000)
+        return response
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            queries = await sync_to_async(self._enter_query_wrapper)(timings)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(queries.__exit__)(None, None, None)
+        finally:
+            _current.reset(token)
+        self._report(request, response, timings, (time.perf_counter() - start) * 1000)
+        return response
+
+    def _enter_query_wrapper(self, timings):
+        queries = connection.execute_wrapper(self._record_query(timings))
+        queries.__enter__()
+        return queries
+
+    @staticmethod
+    def _report(request, response, timings, total_ms):
+        entries = [
+            f"total;dur={total_ms:.2f}",
+            f'db;dur={timings.db_ms:.2f};desc="{timings.queries} queries"',
+        ]
+        entries.extend(f"{name};dur={ms:.2f}" for name, ms in timings.spans.items())
+        response["Server-Timing"] = ", ".join(entries)
+
+        match = getattr(request, "resolver_match", None)
+        view = match.url_name if match and match.url_name else "unmatched"
+        request_duration.observe(view, total_ms / 1000)
+        request_db_duration.observe(view, timings.db_ms / 1000)
+        request_queries.observe(view, timings.queries)
+        for name, ms in timings.spans.items():
+            span_duration.observe(name, ms / 1000)
+
+    @staticmethod
+    def _record_query(timings):
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                timings.queries += 1
+                timings.db_ms += (time.perf_counter() - start) * 1000
+
+        return wrapper
+
+
+class TimedViewMixin:
+    """Times a view's dispatch, DRF authentication and permissions included, as the "view" span."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with span("view"):
+            return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.coalescing import flush_dirty_locations
+from api.versioning import UNSHARED_VERSIONS_MESSAGE, versions_are_shared
+
+
+class Command(BaseCommand):
+    help = (
+        "Refreshes the ratings of locations queued by coalesced rating writes. Runs until "
+        "stopped, flushing at least every RATING_FLUSH_INTERVAL seconds, unless --once is given. "
+        "Needs a default cache shared with the web processes, which read the versions it bumps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Flush the queue once and exit.")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.RATING_FLUSH_INTERVAL,
+            help="Seconds between flushes, which bounds how stale an average can get.",
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.RATING_FLUSH_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not versions_are_shared():
+            raise CommandError(UNSHARED_VERSIONS_MESSAGE)
+        while True:
+            started = time.monotonic()
+            flushed = 0
+            while True:
+                count = flush_dirty_locations(options["batch_size"])
+                flushed += count
+                if count < options["batch_size"]:
+                    break
+            if flushed or options["once"]:
+                self.stdout.write(f"Refreshed ratings of {flushed} locations")
+            if options["once"]:
+                return
+            time.sleep(max(0.0, options["interval"] - (time.monotonic() - started)))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.distances import artifact_path, build_leg_matrices, prune_artifacts
+from api.graph import get_snapshot
+
+
+class Command(BaseCommand):
+    help = "Precomputes the all-pairs fastest/cheapest leg matrices for the current route graph."
+
+    def handle(self, *args, **options):
+        graph = get_snapshot()
+        path = artifact_path(graph.routes_digest)
+        start = time.perf_counter()
+        build_leg_matrices(graph)
+        elapsed = time.perf_counter() - start
+        pruned = prune_artifacts(graph.routes_digest)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built leg matrices for {len(graph)} locations in {elapsed:.2f}s: {path}"
+                f" (removed {pruned} superseded)"
+            )
+        )
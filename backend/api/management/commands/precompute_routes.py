@@ -0,0 +1,96 @@
+import multiprocessing
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.graph import get_snapshot
+from api.models import PrecomputedRoute
+from api.precompute import bucket_queries, pair_digest, route_pairs
+from api.utils import plan_itineraries
+from api.worker import init_worker, plan_in_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Materializes greedy itineraries for every source/destination district pair over the "
+        "configured budget and day buckets. Pairs whose inputs are unchanged since the last "
+        "run are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.ROUTE_PLANNER_WORKERS,
+            help="Planner processes to use; 1 plans in this process.",
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Recompute every pair, even unchanged ones."
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        graph = get_snapshot()
+        digests = {pair: pair_digest(graph, *pair) for pair in route_pairs(graph)}
+
+        stale = []
+        fresh = set()
+        for pk, source, destination, budget, days, digest in PrecomputedRoute.objects.values_list(
+            "id", "source_district", "destination_district", "budget", "days", "digest"
+        ):
+            if options["force"] or digests.get((source, destination)) != digest:
+                stale.append(pk)
+            else:
+                fresh.add((source, destination, budget, days))
+
+        queries = [
+            query
+            for pair in digests
+            for query in bucket_queries(*pair)
+            if query[:4] not in fresh
+        ]
+        changed = {query[:2] for query in queries}
+
+        if options["workers"] > 1 and queries:
+            with ProcessPoolExecutor(
+                max_workers=options["workers"],
+                mp_context=multiprocessing.get_context(settings.ROUTE_PLANNER_START_METHOD),
+                initializer=init_worker,
+                initargs=(pickle.dumps(graph),),
+            ) as executor:
+                chunksize = max(1, len(queries) // (4 * options["workers"]))
+                results = list(executor.map(plan_in_worker, queries, chunksize=chunksize))
+        else:
+            results = [
+                [[graph.pks[node] for node in nodes] for nodes in plan_itineraries(graph, *query)]
+                for query in queries
+            ]
+
+        with transaction.atomic():
+            PrecomputedRoute.objects.filter(pk__in=stale).delete()
+            PrecomputedRoute.objects.bulk_create(
+                [
+                    PrecomputedRoute(
+                        source_district=source,
+                        destination_district=destination,
+                        budget=budget,
+                        days=days,
+                        digest=digests[(source, destination)],
+                        location_ids=itineraries[0],
+                    )
+                    for (source, destination, budget, days, *_), itineraries in zip(queries, results)
+                ],
+                batch_size=1000,
+            )
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Precomputed {len(queries)} itineraries for {len(changed)} of {len(digests)} "
+                f"district pairs in {elapsed:.2f}s"
+            )
+        )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from api.models import Location, Rating
+from api.versioning import CATALOG, GRAPH, bump_version, versions_are_shared
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every location's rating totals and average from its Rating rows in one "
+        "UPDATE; locations without ratings get an average of 0. Running servers only see the "
+        "new averages at once when the default cache is shared with them, otherwise after they "
+        "restart."
+    )
+
+    def handle(self, *args, **options):
+        ratings = Rating.objects.filter(location=OuterRef("pk")).values("location")
+        rating_sum = Coalesce(Subquery(ratings.annotate(total=Sum("value")).values("total")), 0)
+        rating_count = Coalesce(Subquery(ratings.annotate(total=Count("id")).values("total")), 0)
+        average = Subquery(ratings.annotate(average=Avg("value")).values("average"))
+
+        with transaction.atomic():
+            drifted = (
+                Location.objects.annotate(actual_sum=rating_sum, actual_count=rating_count)
+                .filter(~Q(rating_sum=F("actual_sum")) | ~Q(rating_count=F("actual_count")))
+                .count()
+            )
+            updated = Location.objects.update(
+                rating_sum=rating_sum,
+                rating_count=rating_count,
+                # The average is NULL for locations without ratings, which
+                # rating writes and flush_ratings leave at 0 as well
+                rating=Coalesce(average, 0.0),
+            )
+            # Queryset updates bypass the post_save signals that usually do
+            # this. Bumps in a process-local cache would reach no server.
+            shared = versions_are_shared()
+            if shared:
+                bump_version(GRAPH)
+                bump_version(CATALOG)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {updated} locations, {drifted} had drifted totals")
+        )
+        if not shared:
+            self.stdout.write(
+                self.style.WARNING(
+                    "The default cache is process-local, so running servers keep their cached "
+                    "ratings until they restart."
+                )
+            )
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 20:01
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecomputedRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_district', models.CharField(max_length=100)),
+                ('destination_district', models.CharField(max_length=100)),
+                ('budget', models.FloatField(blank=True, null=True)),
+                ('days', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('digest', models.CharField(max_length=40)),
+                ('location_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, size=None)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='precomputedroute',
+            index=models.Index(fields=['source_district', 'destination_district'], name='api_precomp_source__e89eb1_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_precomputedroute'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['-rating', '-id'], name='location_rating_id_desc'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-18 20:10
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_location_rating_id_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='location',
+            name='location_rating_id_desc',
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['category'], name='location_category_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(condition=models.Q(('name', models.F('district')), _negated=True), fields=['-rating', '-id'], name='location_browse_rating'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 20:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_totals(apps, schema_editor):
+    Location = apps.get_model('api', 'Location')
+    Rating = apps.get_model('api', 'Rating')
+    totals = Rating.objects.filter(location=OuterRef('pk')).values('location')
+    Location.objects.update(
+        rating_sum=Coalesce(Subquery(totals.annotate(total=Sum('value')).values('total')), 0),
+        rating_count=Coalesce(Subquery(totals.annotate(total=Count('id')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_location_browse_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='rating_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_totals, migrations.RunPython.noop),
+    ]
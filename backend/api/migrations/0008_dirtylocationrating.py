@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 20:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_location_rating_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyLocationRating',
+            fields=[
+                ('location', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='api.location')),
+                ('marked_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-18 20:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def plain_text(column):
+    """
+    SQL for the words of a text or HTML column as the search document sees
+    them: tags turned into spaces, common entities decoded, Unicode in NFC
+    form and zero width joiners dropped. A frozen copy of what
+    api.search.search_terms did when this migration was written.
+    """
+    text = f"regexp_replace(replace(coalesce({column}, ''), '<', ' <'), '<[^>]*>', ' ', 'g')"
+    entities = (("&nbsp;", " "), ("&lt;", "<"), ("&gt;", ">"), ("&quot;", '"'), ("&#39;", "''"), ("&amp;", "&"))
+    for entity, char in entities:
+        text = f"replace({text}, '{entity}', '{char}')"
+    return f"translate(normalize({text}, NFC), E'\\u200c\\u200d\\ufeff', '')"
+
+
+def document(*parts):
+    return " || ".join(
+        f"setweight(to_tsvector('simple', {plain_text(column)}), '{weight}')" for column, weight in parts
+    )
+
+
+FILL_SEARCH_VECTORS = f"""
+UPDATE api_location SET search_vector = {document(
+    ("name", "A"),
+    ("district || ' ' || array_to_string(category, ' ')", "B"),
+    ("description", "C"),
+)}
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_dirtylocationrating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='location_search_gin'),
+        ),
+        migrations.RunSQL(FILL_SEARCH_VECTORS, migrations.RunSQL.noop),
+    ]
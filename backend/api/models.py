@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from ckeditor.fields import RichTextField
 
 
@@ -8,8 +10,29 @@ class Location(models.Model):
     image = models.ImageField(upload_to="pics", blank=True, null=True)
     description = RichTextField(blank=True)
     rating = models.FloatField(default=0)
+    # Running totals of the Rating rows, so that ``rating`` can be kept up to
+    # date with atomic increments instead of re-averaging every rating
+    rating_sum = models.BigIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     district = models.CharField(max_length=100, db_index=True)
     category = ArrayField(models.CharField(max_length=100), blank=True, default=list)
+    # Name, district, categories and description text, kept up to date by a
+    # post_save signal (see api.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # category__contains lookups
+            GinIndex(fields=["category"], name="location_category_gin"),
+            # Stable order for the keyset paginated location listing, which
+            # skips the districts' own locations
+            models.Index(
+                fields=["-rating", "-id"],
+                condition=~models.Q(name=models.F("district")),
+                name="location_browse_rating",
+            ),
+            GinIndex(fields=["search_vector"], name="location_search_gin"),
+        ]
 
     def __str__(self):
         if self.district == self.name:
@@ -42,3 +65,40 @@ class Rating(models.Model):
 
     def __str__(self):
         return f"{self.user.username} rated {self.location.name}: {self.value}"
+
+
+class PrecomputedRoute(models.Model):
+    """
+    Greedy itinerary materialized by ``manage.py precompute_routes`` for one
+    uncategorized query. ``digest`` is the content digest of the plan's inputs
+    when it was computed; a row only answers queries while it still matches.
+    """
+
+    source_district = models.CharField(max_length=100)
+    destination_district = models.CharField(max_length=100)
+    budget = models.FloatField(null=True, blank=True)
+    days = models.PositiveSmallIntegerField(null=True, blank=True)
+    digest = models.CharField(max_length=40)
+    location_ids = ArrayField(models.BigIntegerField(), default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["source_district", "destination_district"])]
+
+    def __str__(self):
+        return f"{self.source_district} - {self.destination_district} ({self.budget}, {self.days})"
+
+
+class DirtyLocationRating(models.Model):
+    """
+    Location whose rating totals are out of date with its Rating rows, queued
+    by RatingView when RATING_WRITE_COALESCING is on. Each location is queued at
+    most once however many ratings arrive before ``manage.py flush_ratings``
+    picks it up.
+    """
+
+    location = models.OneToOneField(Location, primary_key=True, on_delete=models.CASCADE)
+    marked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.location_id} dirty since {self.marked_at}"
@@ -0,0 +1,82 @@
+import asyncio
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from .worker import init_worker, plan_versioned
+
+
+class PlannerBusy(Exception):
+    """Raised when the planner pool already has as many jobs as it accepts."""
+
+
+class PlannerPool:
+    """
+    Bounded process pool that runs route planning off the event loop.
+
+    The workers live as long as the pool. Jobs are tagged with the graph
+    version they plan against, and a worker still holding an older snapshot
+    asks for the new one, which is pickled once per version in a thread and
+    only sent to workers that need it. Graph changes therefore never restart
+    the workers.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, start_method=None):
+        self.max_workers = max_workers or settings.ROUTE_PLANNER_WORKERS
+        self.max_pending = max_pending or settings.ROUTE_PLANNER_MAX_PENDING
+        self.start_method = start_method or settings.ROUTE_PLANNER_START_METHOD
+        self._executor = None
+        self._snapshot = (None, None)  # (version, pickled snapshot)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def plan(self, graph, query):
+        """
+        Plans a normalized route query against ``graph`` on the pool. Raises
+        PlannerBusy instead of queueing when ``max_pending`` jobs are already
+        running or waiting.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PlannerBusy()
+            self._pending += 1
+        try:
+            itineraries = await self._submit(graph.version, query)
+            if itineraries is None:
+                itineraries = await self._submit(graph.version, query, await self._pickled(graph))
+            return itineraries
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _submit(self, *args):
+        loop = asyncio.get_running_loop()
+        # Submitted under the lock so that shutdown() cannot close the
+        # executor between looking it up and handing it the job
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=init_worker,
+                )
+            return loop.run_in_executor(self._executor, plan_versioned, *args)
+
+    async def _pickled(self, graph):
+        version, snapshot_bytes = self._snapshot
+        if version != graph.version:
+            snapshot_bytes = await asyncio.get_running_loop().run_in_executor(None, pickle.dumps, graph)
+            self._snapshot = (graph.version, snapshot_bytes)
+        return snapshot_bytes
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor, self._snapshot = self._executor, None, (None, None)
+        if executor is not None:
+            executor.shutdown()
+
+
+planner_pool = PlannerPool()
@@ -0,0 +1,326 @@
+import bisect
+import time
+from itertools import accumulate
+
+from django.conf import settings
+
+from .utils import (
+    ACCOMMODATION_COST_PER_NIGHT,
+    CATEGORY_FILTER,
+    CATEGORY_RESTRICT,
+    FOOD_COST_PER_DAY,
+    GREEDY,
+    MAX_TRAVEL_MINUTES_PER_DAY,
+    category_matcher,
+    filter_route,
+    greedy_route,
+)
+
+
+class SearchState:
+    __slots__ = ("score", "cost", "remaining", "day", "minutes", "mask", "route")
+
+    def __init__(self, score, cost, remaining, day, minutes, mask, route):
+        self.score = score
+        self.cost = cost  # total trip cost so far, including food and nights
+        self.remaining = remaining  # budget left, inf when there is no budget
+        self.day = day
+        self.minutes = minutes  # travel minutes spent on the current day
+        self.mask = mask  # bitset of visited nodes, in district-local numbering
+        self.route = route
+
+    def rank(self):
+        return (-self.score, self.cost, self.day, self.minutes)
+
+    def dominates(self, other):
+        return (
+            self.day <= other.day
+            and self.minutes <= other.minutes
+            and self.remaining >= other.remaining
+        )
+
+
+def apply_move(state, travel_time, travel_cost, budget, days):
+    """
+    Returns the (cost, remaining, day, minutes) after travelling one route from
+    ``state``, or None when the move breaks the day or budget limit. The cost
+    model is the one used by the greedy planner.
+    """
+    day = state.day
+    cost = travel_cost
+    if state.minutes + travel_time > MAX_TRAVEL_MINUTES_PER_DAY:
+        day += 1
+        minutes = travel_time
+        # Accommodation for previous night + food for new day
+        cost += ACCOMMODATION_COST_PER_NIGHT + FOOD_COST_PER_DAY
+    else:
+        minutes = state.minutes + travel_time
+
+    if days and day > days:
+        return None
+    remaining = state.remaining
+    if budget:
+        if remaining < cost:
+            return None
+        remaining -= cost
+    return state.cost + cost, remaining, day, minutes
+
+
+class ItineraryPool:
+    """
+    The ``k`` best itineraries seen so far, best first, where two itineraries
+    count as the same when they keep the same stops after category filtering.
+    """
+
+    def __init__(self, k, relevant_mask):
+        self.k = k
+        self.relevant_mask = relevant_mask
+        self.entries = []
+
+    def offer(self, state):
+        key = state.mask & self.relevant_mask
+        for i, entry in enumerate(self.entries):
+            if entry.mask & self.relevant_mask == key:
+                if entry.rank() <= state.rank():
+                    return
+                del self.entries[i]
+                break
+        bisect.insort(self.entries, state, key=SearchState.rank)
+        del self.entries[self.k:]
+
+    def floor(self):
+        """Score an itinerary has to beat to get into a full pool."""
+        if len(self.entries) < self.k:
+            return float("-inf")
+        return self.entries[-1].score
+
+
+def search_itineraries(
+    graph,
+    source_district,
+    destination_district,
+    budget,
+    days,
+    category,
+    k=1,
+    deadline=None,
+    beam_width=None,
+    category_mode=CATEGORY_FILTER,
+    incumbent=None,
+):
+    """
+    Searches for the ``k`` distinct itineraries with the highest total rating of
+    the stops kept by the category filter, under the same move and cost model
+    as the greedy planner, and returns them unfiltered, best first.
+
+    This is a beam search with branch-and-bound: states with the same set of
+    visited locations are pruned when another one is no later, has no more
+    travel time on its day and has no less budget left, and states whose rating
+    upper bound cannot beat the k-th best itinerary so far are dropped. The
+    greedy itinerary, or ``incumbent`` when the caller already planned it, seeds
+    the search, and whatever is best when ``deadline`` seconds have passed is
+    returned. With CATEGORY_RESTRICT only stops matching the category are
+    considered at all.
+    """
+    source = graph.index.get(source_district)
+    if source is None:
+        return []
+    if deadline is None:
+        deadline = settings.ROUTE_OPTIMAL_DEADLINE_MS / 1000
+    if beam_width is None:
+        beam_width = settings.ROUTE_OPTIMAL_BEAM_WIDTH
+    stop_at = time.monotonic() + deadline
+
+    ratings = graph.ratings
+    districts = graph.districts
+    edge_target = graph.edge_target
+    matches = category_matcher(graph, destination_district, category)
+    restrict = category and category_mode == CATEGORY_RESTRICT
+
+    def relevant(node):
+        return node == source or matches(node)
+
+    # Number the source and the reachable part of the district compactly so
+    # that a set of visited locations is a small integer bitset.
+    local = {source: 0}
+    nodes = [source]
+    for node in nodes:
+        for edge in graph.out_edges(node):
+            target = edge_target[edge]
+            if districts[target] != destination_district or target in local:
+                continue
+            if restrict and not matches(target):
+                continue
+            local[target] = len(nodes)
+            nodes.append(target)
+    gains = [ratings[node] if relevant(node) else 0.0 for node in nodes]
+    relevant_mask = sum(1 << i for i, node in enumerate(nodes) if relevant(node))
+    total_gain = sum(gains)
+    # Best case for n more stops: the n highest gains anywhere in the district
+    top_gains = [0.0] + list(accumulate(sorted(gains[1:], reverse=True)))
+    min_cost = min(
+        (
+            graph.edge_cost[edge]
+            for node in nodes
+            for edge in graph.out_edges(node)
+            if edge_target[edge] in local
+        ),
+        default=0,
+    )
+
+    remaining = budget or float("inf")
+    if budget:
+        remaining -= FOOD_COST_PER_DAY
+        if remaining < 0:
+            return [[source]]
+
+    def upper_bound(state):
+        moves_left = len(top_gains) - 1
+        if budget and min_cost > 0:
+            moves_left = min(moves_left, int(state.remaining // min_cost))
+        return state.score + min(total_gain - state.score, top_gains[moves_left])
+
+    pool = ItineraryPool(k, relevant_mask)
+    # The greedy itinerary is a valid plan under the same model, so it seeds
+    # the pool. Its end state is not tracked, so any other itinerary with the
+    # same stops and score replaces it.
+    if incumbent is None:
+        incumbent = greedy_route(
+            graph, source_district, destination_district, budget, days, category, category_mode
+        )
+    pool.offer(
+        SearchState(
+            sum(gains[local[node]] for node in incumbent),
+            float("inf"),
+            float("-inf"),
+            float("inf"),
+            float("inf"),
+            sum(1 << local[node] for node in incumbent),
+            tuple(incumbent),
+        )
+    )
+
+    layer = [SearchState(gains[0], FOOD_COST_PER_DAY, remaining, 1, 0, 1, (source,))]
+    while layer:
+        frontier = {}
+        for position, state in enumerate(layer):
+            if time.monotonic() >= stop_at:
+                # Out of time: every state reached so far is still a feasible
+                # itinerary, even if it could have been extended further.
+                for leftover in layer[position:]:
+                    pool.offer(leftover)
+                for rivals in frontier.values():
+                    for leftover in rivals:
+                        pool.offer(leftover)
+                return [list(entry.route) for entry in pool.entries]
+            if upper_bound(state) <= pool.floor():
+                continue
+            extended = False
+            for node in state.route:
+                for edge in graph.out_edges(node):
+                    target = edge_target[edge]
+                    bit = 1 << local.get(target, 0)
+                    if bit == 1 or state.mask & bit:
+                        continue  # Outside the district, or already visited
+                    moved = apply_move(state, graph.edge_time[edge], graph.edge_cost[edge], budget, days)
+                    if moved is None:
+                        continue
+                    extended = True
+                    child = SearchState(
+                        state.score + gains[local[target]],
+                        *moved,
+                        state.mask | bit,
+                        state.route + (target,),
+                    )
+                    rivals = frontier.setdefault(child.mask, [])
+                    if any(rival.dominates(child) for rival in rivals):
+                        continue
+                    rivals[:] = [rival for rival in rivals if not child.dominates(rival)]
+                    rivals.append(child)
+            if not extended:
+                pool.offer(state)  # A complete itinerary
+        layer = sorted(
+            (state for rivals in frontier.values() for state in rivals), key=SearchState.rank
+        )
+        # States that fall out of the beam will not be extended any further
+        for state in layer[beam_width:]:
+            pool.offer(state)
+        del layer[beam_width:]
+
+    return [list(entry.route) for entry in pool.entries]
+
+
+def plan_optimal_route(
+    graph,
+    source_district,
+    destination_district,
+    budget,
+    days,
+    category,
+    deadline=None,
+    beam_width=None,
+    category_mode=CATEGORY_FILTER,
+):
+    """
+    Returns the highest rated itinerary found by search_itineraries, filtered by
+    category like the greedy planner's.
+    """
+    routes = search_itineraries(
+        graph,
+        source_district,
+        destination_district,
+        budget,
+        days,
+        category,
+        1,
+        deadline,
+        beam_width,
+        category_mode,
+    )
+    if not routes:
+        return []
+    return filter_route(graph, routes[0], source_district, destination_district, category)
+
+
+def plan_alternatives(
+    graph,
+    source_district,
+    destination_district,
+    budget,
+    days,
+    category,
+    mode=GREEDY,
+    deadline=None,
+    k=1,
+    category_mode=CATEGORY_FILTER,
+):
+    """
+    Returns up to ``k`` distinct itineraries from a single search pass. The first
+    one is the itinerary the given planner mode would pick on its own, and the
+    rest are the best other ones found, ranked by total rating and then cost.
+    """
+    incumbent = None
+    if mode == GREEDY:
+        # Planned once: it seeds the search and is also the first itinerary
+        incumbent = greedy_route(
+            graph, source_district, destination_district, budget, days, category, category_mode
+        )
+    routes = [
+        filter_route(graph, route, source_district, destination_district, category)
+        for route in search_itineraries(
+            graph,
+            source_district,
+            destination_district,
+            budget,
+            days,
+            category,
+            k,
+            deadline,
+            category_mode=category_mode,
+            incumbent=incumbent,
+        )
+    ]
+    if mode == GREEDY and routes:
+        primary = filter_route(graph, incumbent, source_district, destination_district, category)
+        routes = [primary] + [route for route in routes if set(route) != set(primary)]
+    return routes[:k]
@@ -0,0 +1,151 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over one ordering field, highest first, with the id as
+    tie breaker. The cursor is the (value, id) of the last row handed out and
+    the next page starts right after it, so every page is an index range scan
+    no matter how deep it is.
+
+    Pagination is opt-in: only requests with a ``limit`` or ``cursor`` parameter
+    get a page, everything else gets the full list as before.
+
+    Subclasses name the ``ordering_field``, the settings holding the default
+    and largest page size, and how field values go in and out of a cursor.
+    """
+
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    invalid_cursor_message = "Invalid cursor"
+    ordering_field = None
+    page_size_setting = None
+    max_page_size_setting = None
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.limit_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        self.request = request
+        self.limit = self.get_limit(request)
+
+        field = self.ordering_field
+        queryset = queryset.order_by(f"-{field}", "-id")
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            value, pk = self.decode_cursor(cursor)
+            # The first condition bounds the index scan, the second one only
+            # has to skip rows tied with the cursor's value
+            queryset = queryset.filter(Q(**{f"{field}__lt": value}) | Q(id__lt=pk), **{f"{field}__lte": value})
+
+        # One row more than asked for tells whether there is a next page
+        rows = list(queryset[: self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        page = rows[: self.limit]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_limit(self, request):
+        default = getattr(settings, self.page_size_setting)
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, default))
+        except ValueError:
+            limit = default
+        return min(max(limit, 1), getattr(settings, self.max_page_size_setting))
+
+    def encode_cursor(self, row):
+        if isinstance(row, dict):
+            value, pk = row[self.ordering_field], row["id"]
+        else:
+            value, pk = getattr(row, self.ordering_field), row.pk
+        payload = json.dumps([self.encode_value(value), pk])
+        return base64.urlsafe_b64encode(payload.encode("ascii")).decode("ascii")
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return self.decode_value(value), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_value(self, value):
+        return value
+
+    def decode_value(self, value):
+        """Field value from a cursor; raises ValueError or TypeError if it is not one."""
+        return value
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "next_cursor": self.next_cursor, "results": data})
+
+
+class RatingKeysetPagination(KeysetPagination):
+    """Keyset pages of locations ordered by rating, best first."""
+
+    ordering_field = "rating"
+    page_size_setting = "LOCATION_PAGE_SIZE"
+    max_page_size_setting = "LOCATION_MAX_PAGE_SIZE"
+
+    def decode_value(self, value):
+        return float(value)
+
+
+class SearchPagination(BasePagination):
+    """
+    Limit/offset pages of ranked search results. Ranking has to score every
+    match before the first page is known anyway, so an offset costs little
+    more than a cursor here, and no total count is computed.
+    """
+
+    limit_query_param = "limit"
+    offset_query_param = "offset"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        # One row more than asked for tells whether there is a next page
+        rows = list(queryset[self.offset : self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[: self.limit]
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, settings.SEARCH_PAGE_SIZE))
+        except ValueError:
+            limit = settings.SEARCH_PAGE_SIZE
+        return min(max(limit, 1), settings.SEARCH_MAX_PAGE_SIZE)
+
+    def get_offset(self, request):
+        try:
+            return max(int(request.query_params.get(self.offset_query_param, 0)), 0)
+        except ValueError:
+            return 0
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
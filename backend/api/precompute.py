@@ -0,0 +1,73 @@
+import hashlib
+
+from django.conf import settings
+
+from .models import PrecomputedRoute
+from .utils import CATEGORY_FILTER, GREEDY
+
+
+def pair_digest(graph, source_district, destination_district):
+    """
+    Digest of everything a plan from ``source_district`` into
+    ``destination_district`` depends on, or None when the source is unknown.
+    """
+    source = graph.index.get(source_district)
+    if source is None:
+        return None
+    content = f"{graph.pks[source]}:{graph.district_digest(destination_district)}"
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def is_precomputable(query):
+    """Whether precompute_routes materializes queries like this normalized one."""
+    _, _, _, _, category, mode, _, k, category_mode = query
+    return category is None and mode == GREEDY and k is None and category_mode == CATEGORY_FILTER
+
+
+def route_pairs(graph):
+    """Every (source, destination district) pair: district hubs to all districts."""
+    districts = sorted(set(graph.districts))
+    sources = [district for district in districts if district in graph.index]
+    return [(source, destination) for source in sources for destination in districts]
+
+
+def bucket_queries(source_district, destination_district, budgets=None, days=None):
+    """Normalized queries for one pair over the configured budget and day buckets."""
+    from .route_cache import normalize_route_query
+
+    if budgets is None:
+        budgets = settings.ROUTE_PRECOMPUTE_BUDGETS
+    if days is None:
+        days = settings.ROUTE_PRECOMPUTE_DAYS
+    return [
+        normalize_route_query(source_district, destination_district, budget, day, None)
+        for budget in [None, *budgets]
+        for day in [None, *days]
+    ]
+
+
+def precomputed_itineraries(graph, query):
+    """
+    Returns the materialized itineraries for a normalized query as lists of
+    Location ids, or None when the query is not precomputed or its row is stale.
+    """
+    if not is_precomputable(query):
+        return None
+    source_district, destination_district, budget, days = query[:4]
+    digest = pair_digest(graph, source_district, destination_district)
+    if digest is None:
+        return None
+    location_ids = (
+        PrecomputedRoute.objects.filter(
+            source_district=source_district,
+            destination_district=destination_district,
+            budget=budget,
+            days=days,
+            digest=digest,
+        )
+        .values_list("location_ids", flat=True)
+        .first()
+    )
+    if location_ids is None:
+        return None
+    return [location_ids]
@@ -0,0 +1,103 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .graph import get_snapshot
+from .instrumentation import route_cache_lookups, span
+from .precompute import precomputed_itineraries
+from .utils import CATEGORY_FILTER, GREEDY, OPTIMAL, plan_itineraries
+from .versioning import GRAPH, RATING, aget_version, get_version
+
+
+def _route_cache():
+    return caches[settings.ROUTE_CACHE_ALIAS]
+
+
+def normalize_route_query(
+    source_district,
+    destination_district,
+    budget,
+    days,
+    category,
+    mode=GREEDY,
+    deadline=None,
+    k=None,
+    category_mode=CATEGORY_FILTER,
+):
+    """
+    Reduces a route query to the values that actually influence find_route, so
+    that equivalent requests share one cache entry. The result is a tuple of
+    ``plan_itineraries`` arguments.
+    """
+    k = int(k) if k and int(k) > 1 else None
+    return (
+        source_district or "",
+        destination_district or "",
+        float(budget) if budget else None,
+        int(days) if days else None,
+        category or None,
+        mode,
+        float(deadline) if (mode == OPTIMAL or k) and deadline is not None else None,
+        k,
+        category_mode if category else CATEGORY_FILTER,
+    )
+
+
+def route_cache_key(query, graph_version, rating_version):
+    digest = hashlib.sha1(repr(query).encode("utf-8")).hexdigest()
+    return f"route:{graph_version}:{rating_version}:{digest}"
+
+
+def cached_itineraries(query, graph=None):
+    """
+    Returns the itineraries for a normalized query as lists of Location ids,
+    planning them against ``graph`` (or this process's snapshot) on a cache
+    miss, unless precompute_routes has materialized a still valid answer for
+    it. The first list is the itinerary itself, any further ones are the
+    alternatives asked for. Entries are keyed on the graph and rating versions,
+    so any Location, Route or Rating write makes them unreachable.
+    """
+    cache = _route_cache()
+    with span("cache"):
+        graph_version = graph.version if graph is not None else get_version(GRAPH)
+        key = route_cache_key(query, graph_version, get_version(RATING))
+        itineraries = cache.get(key)
+    route_cache_lookups.inc("miss" if itineraries is None else "hit")
+
+    if itineraries is None:
+        if graph is None:
+            with span("graph"):
+                graph = get_snapshot()
+        with span("precomputed"):
+            itineraries = precomputed_itineraries(graph, query)
+        if itineraries is None:
+            with span("plan"):
+                itineraries = [
+                    [graph.pks[node] for node in nodes] for nodes in plan_itineraries(graph, *query)
+                ]
+        cache.set(key, itineraries)
+    return itineraries
+
+
+async def acached_itineraries(query, planner):
+    """
+    Async counterpart of cached_itineraries that plans cache misses on
+    ``planner``, a PlannerPool, instead of in the calling thread. Precomputed
+    answers are used the same way.
+    """
+    cache = _route_cache()
+    graph_version = await aget_version(GRAPH)
+    key = route_cache_key(query, graph_version, await aget_version(RATING))
+    itineraries = await cache.aget(key)
+    route_cache_lookups.inc("miss" if itineraries is None else "hit")
+
+    if itineraries is None:
+        graph = await sync_to_async(get_snapshot)()
+        itineraries = await sync_to_async(precomputed_itineraries)(graph, query)
+        if itineraries is None:
+            itineraries = await planner.plan(graph, query)
+        await cache.aset(key, itineraries)
+    return itineraries
+
@@ -0,0 +1,59 @@
+import html
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import Value
+from django.utils.html import strip_tags
+
+# Postgres has no Bangla dictionary, so documents and queries use the
+# "simple" configuration: lower-cased words, no stemming, no stop words.
+# Queries match word prefixes, which also covers most inflected forms.
+SEARCH_CONFIG = "simple"
+
+# Zero width (non-)joiners only affect how Bangla conjuncts are drawn, so
+# words typed with and without them must index the same
+_INVISIBLE = dict.fromkeys(map(ord, "\u200c\u200d\ufeff"))
+
+
+def search_terms(text):
+    """
+    Words of a plain text or HTML fragment, normalized the same way for the
+    index and for queries: tags and entities removed, Unicode in NFC form
+    and lower-cased. Combining marks stay part of their word, so Bangla vowel
+    signs and hasanta never split one.
+    """
+    # Tags become spaces so that words in adjacent blocks do not run together
+    text = html.unescape(strip_tags((text or "").replace("<", " <")))
+    text = unicodedata.normalize("NFC", text).translate(_INVISIBLE)
+    chars = [ch if ch.isalnum() or unicodedata.category(ch)[0] == "M" else " " for ch in text]
+    return "".join(chars).lower().split()
+
+
+def search_document(*parts):
+    """
+    tsvector expression for ``(text, weight)`` parts, e.g. the title as "A"
+    and body HTML as "C". Meant for ``.update(search_vector=...)``.
+    """
+    vector = None
+    for text, weight in parts:
+        part = SearchVector(Value(" ".join(search_terms(text))), config=SEARCH_CONFIG, weight=weight)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def search_query(text):
+    """Prefix tsquery matching documents with every word of ``text``, None if it has none."""
+    terms = search_terms(text)
+    if not terms:
+        return None
+    # Terms only hold letters, digits and marks, so quoting them is enough
+    return SearchQuery(" & ".join(f"'{term}':*" for term in terms), config=SEARCH_CONFIG, search_type="raw")
+
+
+def location_document(location):
+    category = location.category or []
+    return search_document(
+        (location.name, "A"),
+        (f"{location.district} {' '.join(category)}", "B"),
+        (location.description, "C"),
+    )
@@ -40,6 +40,11 @@ class LocationSerializer(serializers.ModelSerializer):
         return None
 
     def get_user_rating(self, obj):
+        # Views pass the requesting user's ratings in as one map (see
+        # user_ratings_context) rather than querying them row by row
+        user_ratings = self.context.get("user_ratings")
+        if user_ratings is not None:
+            return user_ratings.get(obj.pk)
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if user and user.is_authenticated:
@@ -49,10 +54,33 @@ class LocationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Location
-        fields = "__all__"
+        exclude = ("rating_sum", "rating_count", "search_vector")
         extra_fields = ["user_rating"]
 
 
+def user_rating_map(request, location_ids):
+    """The requesting user's rating of each of ``location_ids``, in one query."""
+    user = getattr(request, "user", None)
+    if not (user and user.is_authenticated):
+        return {}
+    return dict(
+        Rating.objects.filter(user=user, location_id__in=set(location_ids)).values_list(
+            "location_id", "value"
+        )
+    )
+
+
+def user_ratings_context(request, locations):
+    """
+    Serializer context for LocationSerializer with the requesting user's rating
+    of each of ``locations`` looked up in a single query.
+    """
+    return {
+        "request": request,
+        "user_ratings": user_rating_map(request, [location.pk for location in locations]),
+    }
+
+
 class RouteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Route
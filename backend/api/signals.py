@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Location, Rating, Route
+from .search import location_document
+from .versioning import CATALOG, GRAPH, RATING, bump_version
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def invalidate_graph(sender, **kwargs):
+    bump_version(GRAPH)
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_ratings(sender, **kwargs):
+    bump_version(RATING)
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_catalog(sender, **kwargs):
+    bump_version(CATALOG)
+
+
+# Location fields that make up its search document
+SEARCHED_LOCATION_FIELDS = {"name", "district", "category", "description"}
+
+
+@receiver(post_save, sender=Location)
+def index_location(sender, instance, update_fields=None, **kwargs):
+    # Rating updates save only the rating fields and need no reindexing
+    if update_fields is not None and not SEARCHED_LOCATION_FIELDS.intersection(update_fields):
+        return
+    Location.objects.filter(pk=instance.pk).update(search_vector=location_document(instance))
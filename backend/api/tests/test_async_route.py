@@ -0,0 +1,84 @@
+import asyncio
+import pickle
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from api.graph import GraphSnapshot
+from api.models import Location, Route
+from api.offload import PlannerBusy, PlannerPool, planner_pool
+from api.route_cache import normalize_route_query
+from api.utils import plan_itineraries
+
+
+class PlannerPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.graph = GraphSnapshot(
+            1,
+            [(1, "D", "D", 0.0, []), (2, "A", "D", 5.0, []), (3, "B", "D", 4.0, [])],
+            [(1, 2, 60, 100), (1, 3, 60, 100)],
+        )
+        self.pool = PlannerPool(max_workers=1, max_pending=1)
+        self.addCleanup(self.pool.shutdown)
+
+    def test_snapshot_survives_pickling(self):
+        graph = pickle.loads(pickle.dumps(self.graph))
+        query = normalize_route_query("D", "D", None, None, None)
+        self.assertEqual(plan_itineraries(graph, *query), plan_itineraries(self.graph, *query))
+
+    def test_plans_in_worker_and_applies_backpressure(self):
+        query = normalize_route_query("D", "D", None, None, None)
+
+        async def plan_twice():
+            return await asyncio.gather(
+                self.pool.plan(self.graph, query), self.pool.plan(self.graph, query), return_exceptions=True
+            )
+
+        first, second = asyncio.run(plan_twice())
+        self.assertEqual(first, [[1, 2, 3]])
+        self.assertIsInstance(second, PlannerBusy)
+        self.assertEqual(self.pool._pending, 0)
+
+    def test_new_graph_reuses_workers(self):
+        query = normalize_route_query("D", "D", None, None, None)
+        changed = GraphSnapshot(2, [(1, "D", "D", 0.0, []), (2, "A", "D", 5.0, [])], [(1, 2, 60, 100)])
+
+        async def plan_both():
+            first = await self.pool.plan(self.graph, query)
+            executor = self.pool._executor
+            second = await self.pool.plan(changed, query)
+            return first, second, executor is self.pool._executor
+
+        first, second, same_executor = asyncio.run(plan_both())
+        self.assertEqual((first, second), ([[1, 2, 3]], [[1, 2]]))
+        self.assertTrue(same_executor)
+
+    def test_submit_after_shutdown(self):
+        query = normalize_route_query("D", "D", None, None, None)
+
+        async def plan_around_shutdown():
+            await self.pool.plan(self.graph, query)
+            self.pool.shutdown()
+            return await self.pool.plan(self.graph, query)
+
+        self.assertEqual(asyncio.run(plan_around_shutdown()), [[1, 2, 3]])
+
+
+class AsyncRouteApiTests(APITestCase):
+    def setUp(self):
+        self.addCleanup(planner_pool.shutdown)
+        hub = Location.objects.create(name="D", district="D", rating=0)
+        a = Location.objects.create(name="A", district="D", rating=5)
+        b = Location.objects.create(name="B", district="D", rating=4)
+        Route.objects.create(source=hub, destination=a, travel_time=60, travel_cost=100)
+        Route.objects.create(source=a, destination=b, travel_time=60, travel_cost=100)
+
+    def test_matches_sync_route_view(self):
+        payload = {"source": "D", "destination": "D", "budget": 5000, "alternatives": 1}
+        expected = self.client.post("/api/route/", payload, format="json").json()
+        resp = self.client.post("/api/route/async/", payload, format="json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), expected)
+        self.assertEqual([l["name"] for l in resp.json()["route"]], ["D", "A", "B"])
+
+    def test_invalid_payload(self):
+        resp = self.client.post("/api/route/async/", {"source": "D", "mode": "fast"}, format="json")
+        self.assertEqual(resp.status_code, 400)
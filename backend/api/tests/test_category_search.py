@@ -0,0 +1,74 @@
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from api.graph import GraphSnapshot
+from api.models import Location, Route
+from api.optimizer import plan_optimal_route
+from api.utils import CATEGORY_PREFER, CATEGORY_RESTRICT, greedy_route, plan_route
+
+LOCATIONS = [
+    (1, "D", "D", 0.0, []),
+    (2, "A", "D", 5.0, ["culture"]),
+    (3, "B", "D", 4.0, ["nature"]),
+    (4, "C", "D", 3.0, ["nature", "sea"]),
+    (5, "X", "D", 2.0, ["culture"]),
+]
+ROUTES = [(1, 2, 60, 1150), (1, 3, 60, 100), (3, 4, 60, 100), (1, 5, 60, 10)]
+
+
+class CategorySearchTests(SimpleTestCase):
+    def setUp(self):
+        self.graph = GraphSnapshot(0, LOCATIONS, ROUTES)
+
+    def names(self, nodes):
+        return [self.graph.names[n] for n in nodes]
+
+    def test_filter_mode_spends_budget_on_dropped_stops(self):
+        self.assertEqual(self.names(plan_route(self.graph, "D", "D", 2000, None, "nature")), ["D"])
+
+    def test_prefer_mode_visits_matching_stops_first(self):
+        raw = greedy_route(self.graph, "D", "D", 2000, None, "nature", CATEGORY_PREFER)
+        self.assertEqual(self.names(raw), ["D", "B", "C", "X"])
+        route = plan_route(self.graph, "D", "D", 2000, None, "nature", CATEGORY_PREFER)
+        self.assertEqual(self.names(route), ["D", "B", "C"])
+
+    def test_restrict_mode_never_leaves_the_category(self):
+        raw = greedy_route(self.graph, "D", "D", 2000, None, "nature", CATEGORY_RESTRICT)
+        self.assertEqual(self.names(raw), ["D", "B", "C"])
+
+    def test_optimal_restrict(self):
+        route = plan_optimal_route(self.graph, "D", "D", 2000, None, "sea", 5, category_mode=CATEGORY_RESTRICT)
+        # B has no "sea" tag, so C cannot be reached through it
+        self.assertEqual(self.names(route), ["D"])
+
+    def test_categories_interned_per_district(self):
+        self.assertEqual(self.graph.category_bits["D"], {"culture": 0, "nature": 1, "sea": 2})
+        self.assertEqual(self.graph.category_masks[self.graph.index["C"]], 0b110)
+
+
+class CategorySearchApiTests(APITestCase):
+    def setUp(self):
+        locations = {}
+        for _, name, district, rating, category in LOCATIONS:
+            locations[name] = Location.objects.create(name=name, district=district, rating=rating, category=category)
+        for source, destination, travel_time, travel_cost in ROUTES:
+            Route.objects.create(
+                source=locations[LOCATIONS[source - 1][1]],
+                destination=locations[LOCATIONS[destination - 1][1]],
+                travel_time=travel_time,
+                travel_cost=travel_cost,
+            )
+
+    def test_category_mode(self):
+        payload = {"source": "D", "destination": "D", "budget": 2000, "category": "nature"}
+        resp = self.client.post("/api/route/", payload, format="json")
+        self.assertEqual([l["name"] for l in resp.data["route"]], ["D"])
+        resp = self.client.post("/api/route/", {**payload, "category_mode": "prefer"}, format="json")
+        self.assertEqual([l["name"] for l in resp.data["route"]], ["D", "B", "C"])
+        resp = self.client.post("/api/route/", {**payload, "category_mode": "nope"}, format="json")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_non_string_category_rejected(self):
+        payload = {"source": "D", "destination": "D", "budget": 2000}
+        for category in (["nature"], {"a": 1}, 5):
+            resp = self.client.post("/api/route/", {**payload, "category": category}, format="json")
+            self.assertEqual(resp.status_code, 400)
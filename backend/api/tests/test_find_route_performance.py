@@ -1,63 +1,204 @@
+import json
 import logging
+import math
+import os
+import random
 import time
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 from api.models import Location, Route
 from api.utils import find_route
+from core.testing import summarize
 
 logging.disable(logging.CRITICAL)
 
+# Benchmark knobs, all read from the environment. Graph sizes are comma
+# separated location counts; the defaults stay small enough for every test
+# run, larger sizes (up to 100000) are opt-in.
+SIZES = [int(n) for n in os.environ.get("ROUTE_BENCHMARK_SIZES", "100,1000").split(",") if n]
+RUNS = int(os.environ.get("ROUTE_BENCHMARK_RUNS", "20"))
+SEED = int(os.environ.get("ROUTE_BENCHMARK_SEED", "1"))
+OUTPUT = os.environ.get(
+    "ROUTE_BENCHMARK_OUTPUT", os.path.join(settings.ROUTE_ARTIFACT_DIR, "benchmarks", "route-planner.json")
+)
+# Results are compared with this file when it is set, and a timing that got
+# slower by more than THRESHOLD (a fraction) or a query count that grew fails.
+BASELINE = os.environ.get("ROUTE_BENCHMARK_BASELINE")
+THRESHOLD = float(os.environ.get("ROUTE_BENCHMARK_THRESHOLD", "0.25"))
 
-class FindRoutePerformanceTest(TestCase):
-    def setUp_locations_and_routes(self, n):
-        locations = []
-        for i in range(n):
-            loc = Location.objects.create(
-                name=f"Location{i}",
-                district="TestDistrict",
-                category=["nature"],
-                rating=5.0,
+CATEGORIES = ["nature", "culture", "history", "sea", "hill", "food", "religious", "adventure"]
+BUDGETS = [None, 5000, 10000, 20000, 50000]
+DAYS = [None, 1, 2, 3, 5]
+
+
+def generate_graph(size, seed, district_size=80):
+    """
+    Bulk-inserts a seeded synthetic network of ``size`` locations.
+
+    Locations are split into districts of about ``district_size``, each with a
+    hub named after the district. Inside a district every location gets a few
+    outgoing routes (1-8, skewed low) to nearby locations, and hubs are linked
+    to a handful of other hubs. Travel times are log-normal around an hour,
+    costs grow with time, and ratings lean towards the top of the scale.
+    Returns the district names.
+    """
+    rng = random.Random(seed)
+    district_count = max(1, size // district_size)
+    districts = [f"District{d}" for d in range(district_count)]
+    rows = []
+    for i in range(size):
+        district = districts[i % district_count]
+        rows.append(
+            Location(
+                name=district if i < district_count else f"Location{i}",
+                district=district,
+                category=rng.sample(CATEGORIES, rng.choice([0, 1, 1, 2, 2, 3])),
+                rating=round(rng.triangular(1, 5, 4.2), 1),
             )
-            locations.append(loc)
-        # Branching: each i connects to i+1 and i+2 (if they exist)
-        for i in range(n):
-            for j in range(1, 3):
-                if i + j < n:
-                    Route.objects.create(
-                        source=locations[i],
-                        destination=locations[i + j],
-                        travel_time=60,
-                        travel_cost=100,
+        )
+    locations = Location.objects.bulk_create(rows, batch_size=5000)
+
+    members = {district: [] for district in districts}
+    for location in locations:
+        members[location.district].append(location.pk)
+
+    def leg():
+        travel_time = min(600, max(10, int(rng.lognormvariate(math.log(60), 0.6))))
+        travel_cost = int(travel_time * rng.uniform(4, 15) + rng.lognormvariate(math.log(100), 0.8))
+        return travel_time, travel_cost
+
+    pairs = set()
+    for district_pks in members.values():
+        for position, source in enumerate(district_pks):
+            for _ in range(min(8, 1 + int(rng.expovariate(1 / 2.5)))):
+                # Mostly short hops to neighbouring locations, sometimes far away
+                offset = int(rng.gauss(0, 6)) or 1
+                target = district_pks[(position + offset) % len(district_pks)]
+                if target != source:
+                    pairs.add((source, target))
+    hubs = [members[district][0] for district in districts]
+    for hub in hubs:
+        for other in rng.sample(hubs, min(len(hubs), 4)):
+            if other != hub:
+                pairs.add((hub, other))
+
+    routes = []
+    for source, target in sorted(pairs):
+        travel_time, travel_cost = leg()
+        routes.append(
+            Route(source_id=source, destination_id=target, travel_time=travel_time, travel_cost=travel_cost)
+        )
+    Route.objects.bulk_create(routes, batch_size=5000)
+    return districts
+
+
+def find_regressions(results, baseline, threshold):
+    """Human readable list of the metrics in ``results`` that regressed from ``baseline``."""
+    regressions = []
+    for size, targets in baseline.get("sizes", {}).items():
+        for target, metrics in targets.items():
+            current = results["sizes"].get(size, {}).get(target)
+            if not isinstance(current, dict):
+                continue
+            for metric in ("p50_ms", "p95_ms"):
+                if metric in metrics and current[metric] > metrics[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{size} {target} {metric}: {current[metric]:.2f} > {metrics[metric]:.2f}"
                     )
-        return locations
+            if "max_queries" in metrics and current["max_queries"] > metrics["max_queries"]:
+                regressions.append(
+                    f"{size} {target} max_queries: {current['max_queries']} > {metrics['max_queries']}"
+                )
+    return regressions
 
-    def measure_route_time(self, source, destination, budget, days, category, runs=5):
-        times = []
-        for _ in range(runs):
-            start = time.perf_counter()
-            r = find_route(source, destination, budget, days, category)
-            end = time.perf_counter()
-            times.append((end - start) * 1000)  # ms
-        avg_time = sum(times) / len(times)
-        max_time = max(times)
-        return avg_time, max_time
+
+class BenchmarkHelpersTests(SimpleTestCase):
+    def test_summarize(self):
+        self.assertEqual(
+            summarize([float(n) for n in range(100, 0, -1)]), {"p50_ms": 50.0, "p95_ms": 95.0, "max_ms": 100.0}
+        )
+
+    def test_find_regressions(self):
+        baseline = {"sizes": {"100": {"api": {"p50_ms": 10.0, "p95_ms": 20.0, "max_queries": 2}}}}
+        current = {"sizes": {"100": {"api": {"p50_ms": 12.0, "p95_ms": 30.0, "max_queries": 3}}}}
+        self.assertEqual(
+            find_regressions(current, baseline, 0.25),
+            ["100 api p95_ms: 30.00 > 20.00", "100 api max_queries: 3 > 2"],
+        )
+
+
+class FindRoutePerformanceTest(TestCase):
+    def test_generator_is_seeded(self):
+        districts = generate_graph(200, seed=5)
+        first = list(Route.objects.order_by("id").values_list("travel_time", "travel_cost"))
+        Route.objects.all().delete()
+        Location.objects.all().delete()
+        self.assertEqual(generate_graph(200, seed=5), districts)
+        self.assertEqual(list(Route.objects.order_by("id").values_list("travel_time", "travel_cost")), first)
+
+    def measure(self, plan, queries):
+        """Times ``plan`` once per query with an empty route cache."""
+        route_cache = caches[settings.ROUTE_CACHE_ALIAS]
+        timings = []
+        query_counts = []
+        for query in queries:
+            route_cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                plan(*query)
+                timings.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(captured))
+        return {**summarize(timings), "max_queries": max(query_counts)}
 
     def test_performance(self):
-        results = []
-        for n in [10, 25, 50]:
-            Location.objects.all().delete()
+        client = APIClient()
+
+        def call_api(source, destination, budget, days):
+            payload = {"source": source, "destination": destination, "budget": budget}
+            if days:
+                payload["start_date"] = "2025-01-01"
+                payload["end_date"] = f"2025-01-{days:02d}"
+            response = client.post("/api/route/", payload, format="json")
+            self.assertEqual(response.status_code, 200)
+
+        results = {"seed": SEED, "runs": RUNS, "sizes": {}}
+        for size in SIZES:
             Route.objects.all().delete()
-            locations = self.setUp_locations_and_routes(n)
-            source = locations[0].name
-            destination_district = locations[-1].district
-            avg_time, max_time = self.measure_route_time(
-                source=source,
-                destination=destination_district,
-                budget=10000,
-                days=5,
-                category=None,
-                runs=5,
-            )
-            results.append((n, avg_time, max_time))
-        print("\nNumber of Locations | Average Route Finding Time (ms) | Max Route Finding Time (ms)")
-        for n, avg_time, max_time in results:
-            print(f"{n:>19} | {avg_time:>30.2f} | {max_time:>27.2f}")
+            Location.objects.all().delete()
+            districts = generate_graph(size, SEED)
+            rng = random.Random(SEED)
+            queries = [
+                (rng.choice(districts), rng.choice(districts), rng.choice(BUDGETS), rng.choice(DAYS))
+                for _ in range(RUNS)
+            ]
+            start = time.perf_counter()
+            find_route(districts[0], districts[0], None, None, None)  # builds the snapshot
+            snapshot_ms = (time.perf_counter() - start) * 1000
+            results["sizes"][str(size)] = {
+                "snapshot_ms": snapshot_ms,
+                "find_route": self.measure(lambda *q: find_route(*q, None), queries),
+                "api": self.measure(call_api, queries),
+            }
+
+        os.makedirs(os.path.dirname(OUTPUT), exist_ok=True)
+        with open(OUTPUT, "w") as f:
+            json.dump(results, f, indent=2)
+
+        print("\nNumber of Locations | Target     | p50 (ms) | p95 (ms) | Max (ms) | Queries")
+        for size, targets in results["sizes"].items():
+            for target in ("find_route", "api"):
+                m = targets[target]
+                print(
+                    f"{size:>19} | {target:<10} | {m['p50_ms']:>8.2f} | {m['p95_ms']:>8.2f} "
+                    f"| {m['max_ms']:>8.2f} | {m['max_queries']:>7}"
+                )
+
+        if BASELINE:
+            with open(BASELINE) as f:
+                baseline = json.load(f)
+            regressions = find_regressions(results, baseline, THRESHOLD)
+            self.assertFalse(regressions, "Route planner regressions:\n" + "\n".join(regressions))
@@ -0,0 +1,97 @@
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from api.instrumentation import COUNTERS, HISTOGRAMS, Counter, Histogram, ServerTimingMiddleware, span
+from api.offload import planner_pool
+from api.models import Location, Route
+
+
+class HistogramTests(SimpleTestCase):
+    def test_render(self):
+        histogram = Histogram("latency_seconds", "Latency.", "view", (0.1, 1.0))
+        histogram.observe("route", 0.05)
+        histogram.observe("route", 0.1)
+        histogram.observe("route", 3.0)
+        self.assertEqual(
+            histogram.render().splitlines(),
+            [
+                "# HELP latency_seconds Latency.",
+                "# TYPE latency_seconds histogram",
+                'latency_seconds_bucket{view="route",le="0.1"} 2',
+                'latency_seconds_bucket{view="route",le="1.0"} 2',
+                'latency_seconds_bucket{view="route",le="+Inf"} 3',
+                'latency_seconds_sum{view="route"} 3.15',
+                'latency_seconds_count{view="route"} 3',
+            ],
+        )
+
+    def test_counter_render(self):
+        counter = Counter("lookups_total", "Lookups.", "result")
+        counter.inc("miss")
+        counter.inc("hit")
+        counter.inc("hit")
+        self.assertEqual(
+            counter.render().splitlines(),
+            [
+                "# HELP lookups_total Lookups.",
+                "# TYPE lookups_total counter",
+                'lookups_total{result="hit"} 2',
+                'lookups_total{result="miss"} 1',
+            ],
+        )
+
+    def test_span_is_a_no_op_outside_requests(self):
+        with span("plan") as first, span("load") as second:
+            pass
+        self.assertIs(first, second)
+
+
+class ServerTimingTests(APITestCase):
+    def setUp(self):
+        for metric in (*HISTOGRAMS, *COUNTERS):
+            metric.reset()
+        hub = Location.objects.create(name="D", district="D", rating=0)
+        a = Location.objects.create(name="A", district="D", rating=5)
+        Route.objects.create(source=hub, destination=a, travel_time=60, travel_cost=100)
+
+    def test_route_phases_in_header(self):
+        resp = self.client.post("/api/route/", {"source": "D", "destination": "D"}, format="json")
+        entries = dict(entry.split(";", 1) for entry in resp["Server-Timing"].split(", "))
+        for name in ("total", "db", "view", "cache", "graph", "precomputed", "plan", "load", "serialize"):
+            self.assertIn(name, entries)
+        self.assertRegex(entries["db"], r'^dur=[0-9.]+;desc="\d+ queries"$')
+
+    async def test_async_route_phases_in_header(self):
+        self.addCleanup(planner_pool.shutdown)
+        resp = await self.async_client.post(
+            "/api/route/async/", {"source": "D", "destination": "D"}, content_type="application/json"
+        )
+        self.assertEqual(resp.status_code, 200)
+        entries = dict(entry.split(";", 1) for entry in resp["Server-Timing"].split(", "))
+        self.assertIn("total", entries)
+        queries = int(entries["db"].split('desc="')[1].split(" ")[0])
+        self.assertGreater(queries, 0)
+
+    def test_follows_the_handler_mode(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(ServerTimingMiddleware.sync_capable and ServerTimingMiddleware.async_capable)
+        self.assertTrue(iscoroutinefunction(ServerTimingMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(ServerTimingMiddleware(lambda request: None)))
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.post("/api/route/", {"source": "D", "destination": "D"}, format="json")
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 401)
+        self.client.force_authenticate(User.objects.create_user(username="user", password="pass"))
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+        self.client.force_authenticate(User.objects.create_user(username="staff", password="pass", is_staff=True))
+        resp = self.client.get("/api/metrics/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = resp.content.decode()
+        self.assertIn('api_request_duration_seconds_count{view="route"} 1', body)
+        self.assertIn('api_span_duration_seconds_count{span="plan"} 1', body)
+        self.assertIn('api_request_db_queries_bucket{view="route",le="+Inf"} 1', body)
+        self.assertIn('api_route_cache_lookups_total{result="miss"} 1', body)
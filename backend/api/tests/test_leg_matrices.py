@@ -0,0 +1,101 @@
+import heapq
+import os
+import random
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from api.distances import LegMatrices, artifact_path, build_leg_matrices
+from api.graph import GraphSnapshot
+from api.models import Location, Route
+
+
+def dijkstra(size, routes, source, weight):
+    adjacency = [[] for _ in range(size)]
+    for a, b, t, c in routes:
+        adjacency[a - 1].append((b - 1, t if weight == "time" else c))
+    dist = [float("inf")] * size
+    dist[source] = 0
+    heap = [(0, source)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        for target, w in adjacency[node]:
+            if d + w < dist[target]:
+                dist[target] = d + w
+                heapq.heappush(heap, (d + w, target))
+    return dist
+
+
+class LegMatricesTests(SimpleTestCase):
+    def test_matches_dijkstra_on_random_graph(self):
+        rng = random.Random(7)
+        size = 30
+        locations = [(pk, f"L{pk}", rng.choice("DE"), 4.0, []) for pk in range(1, size + 1)]
+        pairs = {(rng.randint(1, size), rng.randint(1, size)) for _ in range(90)}
+        routes = [(a, b, rng.randint(10, 300), rng.randint(50, 2000)) for a, b in sorted(pairs) if a != b]
+        matrices = LegMatrices.build(GraphSnapshot(0, locations, routes))
+        for source in range(size):
+            by_time = dijkstra(size, routes, source, "time")
+            by_cost = dijkstra(size, routes, source, "cost")
+            for target in range(size):
+                fastest = matrices.fastest_leg(source + 1, target + 1)
+                cheapest = matrices.cheapest_leg(source + 1, target + 1)
+                if by_time[target] == float("inf"):
+                    self.assertIsNone(fastest)
+                    self.assertIsNone(cheapest)
+                else:
+                    self.assertEqual(fastest.travel_time, by_time[target])
+                    self.assertEqual(cheapest.travel_cost, by_cost[target])
+
+    def test_artifact_round_trip(self):
+        graph = GraphSnapshot(0, [(1, "A", "D", 4.0, []), (2, "B", "E", 4.0, [])], [(1, 2, 90, 300)])
+        with tempfile.TemporaryDirectory() as tmp, override_settings(ROUTE_ARTIFACT_DIR=tmp):
+            built = build_leg_matrices(graph)
+            loaded = LegMatrices.load(artifact_path(graph.routes_digest))
+            self.assertEqual(os.listdir(tmp), [f"legs-{graph.routes_digest}.npz"])
+        self.assertEqual(loaded.digest, built.digest)
+        self.assertEqual(loaded.fastest_leg(1, 2), (90, 300))
+        self.assertIsNone(loaded.fastest_leg(2, 1))
+
+
+class LegApiTests(APITestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(ROUTE_ARTIFACT_DIR=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        a = Location.objects.create(name="A", district="D", rating=4)
+        b = Location.objects.create(name="B", district="D", rating=4)
+        c = Location.objects.create(name="C", district="E", rating=4)
+        Route.objects.create(source=a, destination=c, travel_time=600, travel_cost=200)
+        Route.objects.create(source=a, destination=b, travel_time=60, travel_cost=300)
+        Route.objects.create(source=b, destination=c, travel_time=60, travel_cost=300)
+        self.c = c
+        call_command("precompute_legs", stdout=StringIO())
+
+    def test_fastest_and_cheapest_cross_district(self):
+        resp = self.client.get("/api/route/leg/", {"source": "A", "destination": "C"})
+        self.assertEqual(resp.data, {"by": "time", "travel_time": 120, "travel_cost": 600})
+        resp = self.client.get("/api/route/leg/", {"source": "A", "destination": "C", "by": "cost"})
+        self.assertEqual(resp.data, {"by": "cost", "travel_time": 600, "travel_cost": 200})
+
+    def test_unreachable(self):
+        resp = self.client.get("/api/route/leg/", {"source": "C", "destination": "A"})
+        self.assertEqual(resp.status_code, 404)
+
+    def test_unavailable_until_precomputed(self):
+        old = set(os.listdir(self.tmp.name))
+        Route.objects.create(source=self.c, destination=Location.objects.get(name="A"), travel_time=5, travel_cost=5)
+        resp = self.client.get("/api/route/leg/", {"source": "C", "destination": "A"})
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp["Retry-After"], "60")
+
+        call_command("precompute_legs", stdout=StringIO())
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+        self.assertNotEqual(set(os.listdir(self.tmp.name)), old)
+        resp = self.client.get("/api/route/leg/", {"source": "C", "destination": "A"})
+        self.assertEqual(resp.data["travel_time"], 5)
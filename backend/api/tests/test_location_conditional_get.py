@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from api.models import Location, Rating
+
+
+class LocationConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="A", district="D", category=["nature"], rating=4)
+        self.user = User.objects.create_user(username="user", password="pass")
+        self.token = Token.objects.create(user=self.user)
+
+    def assertNotModified(self, url, resp, **headers):
+        with self.assertNumQueries(0):
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=resp["ETag"], **headers)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], resp["ETag"])
+
+    def test_list_and_detail_revalidate(self):
+        for url in ("/api/locations/?category=nature", f"/api/locations/{self.location.pk}/"):
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertRegex(resp["ETag"], r'^"[0-9a-f]{40}"$')
+            self.assertIn("Last-Modified", resp)
+            self.assertIn("Authorization", resp["Vary"])
+            self.assertNotModified(url, resp)
+
+    def test_location_and_rating_writes_change_the_etag(self):
+        url = "/api/locations/"
+        etag = self.client.get(url)["ETag"]
+        self.location.description = "<p>new</p>"
+        self.location.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp["ETag"]
+        Rating.objects.create(user=self.user, location=self.location, value=5)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_per_user_variants(self):
+        url = f"/api/locations/{self.location.pk}/"
+        Rating.objects.create(user=self.user, location=self.location, value=5)
+        anonymous = self.client.get(url)
+        auth = {"HTTP_AUTHORIZATION": f"Token {self.token.key}"}
+        authenticated = self.client.get(url, **auth)
+        self.assertEqual(authenticated.data["user_rating"], 5)
+        self.assertNotEqual(anonymous["ETag"], authenticated["ETag"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=anonymous["ETag"], **auth).status_code, 200)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=authenticated["ETag"], **auth)
+        self.assertEqual(resp.status_code, 304)
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from api.encoders import LOCATION_FIELDS, LocationEncoder
+from api.models import Location, Rating
+from api.serializers import LocationSerializer, user_rating_map
+
+
+class LocationEncoderTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass")
+        Location.objects.create(
+            name="চট্টগ্রাম", district="চট্টগ্রাম", rating=0, description="<p>বন্দর &amp; \"শহর\"</p>"
+        )
+        rated = Location.objects.create(
+            name="Patenga", district="চট্টগ্রাম", rating=4.25, category=["sea", "নদী"], image="pics/sea view.jpg"
+        )
+        Location.objects.create(name="Foy's Lake", district="চট্টগ্রাম", rating=3, image="pics/ফয়েস লেক (1).png")
+        Location.objects.create(name="Odd", district="X", rating=1e-7, image="pics/./odd%20name.jpg")
+        Rating.objects.create(user=self.user, location=rated, value=4)
+
+    def assertSameBytes(self, request):
+        locations = Location.objects.order_by("id")
+        user_ratings = user_rating_map(request, [location.pk for location in locations])
+        expected = LocationSerializer(
+            locations, many=True, context={"request": request, "user_ratings": user_ratings}
+        ).data
+        encoded = LocationEncoder(request, user_ratings).encode_many(locations.values(*LOCATION_FIELDS))
+        self.assertEqual(JSONRenderer().render(encoded), JSONRenderer().render(expected))
+
+    def test_matches_serializer_with_and_without_request(self):
+        request = Request(APIRequestFactory().get("/api/locations/"))
+        request.user = AnonymousUser()
+        self.assertSameBytes(request)
+        request.user = self.user
+        self.assertSameBytes(request)
+        self.assertSameBytes(None)
+
+    @override_settings(MEDIA_URL="https://cdn.example.com/media/")
+    def test_matches_serializer_with_absolute_media_url(self):
+        request = Request(APIRequestFactory().get("/api/locations/", secure=True))
+        request.user = AnonymousUser()
+        self.assertSameBytes(request)
+        image = LocationEncoder(request).encode(Location.objects.values(*LOCATION_FIELDS).get(name="Patenga"))["image"]
+        self.assertEqual(image, "https://cdn.example.com/media/pics/sea%20view.jpg")
+
+    def test_listing_matches_serializer(self):
+        resp = self.client.get("/api/locations/")
+        locations = Location.objects.exclude(name="চট্টগ্রাম").order_by("-rating")
+        expected = LocationSerializer(locations, many=True, context={"request": resp.wsgi_request}).data
+        self.assertEqual(resp.content, JSONRenderer().render(expected))
@@ -0,0 +1,44 @@
+from rest_framework.test import APITestCase
+from api.models import Location
+
+
+class LocationKeysetPaginationTests(APITestCase):
+    def setUp(self):
+        Location.objects.create(name="D", district="D", rating=5)
+        for i in range(25):
+            Location.objects.create(name=f"L{i}", district="D", category=["nature"] if i % 3 else [], rating=i % 4)
+
+    def walk(self, params):
+        names = []
+        resp = self.client.get("/api/locations/", params)
+        while True:
+            self.assertEqual(resp.status_code, 200)
+            self.assertLessEqual(len(resp.data["results"]), params["limit"])
+            names.extend(l["name"] for l in resp.data["results"])
+            if resp.data["next"] is None:
+                return names
+            with self.assertNumQueries(1):
+                resp = self.client.get(resp.data["next"])
+
+    def test_pages_cover_the_listing_once_in_order(self):
+        expected = [l["name"] for l in self.client.get("/api/locations/").data]
+        self.assertEqual(len(expected), 25)
+        # Only four distinct ratings, so pages end inside runs of ties
+        self.assertEqual(self.walk({"limit": 7}), expected)
+
+    def test_category_filter_is_kept_across_pages(self):
+        expected = [l["name"] for l in self.client.get("/api/locations/", {"category": "nature"}).data]
+        self.assertEqual(self.walk({"limit": 4, "category": "nature"}), expected)
+
+    def test_cursor_response(self):
+        resp = self.client.get("/api/locations/", {"limit": 25})
+        self.assertEqual(len(resp.data["results"]), 25)
+        self.assertIsNone(resp.data["next"])
+        self.assertIsNone(resp.data["next_cursor"])
+        resp = self.client.get("/api/locations/", {"limit": 2})
+        cursor = resp.data["next_cursor"]
+        resp = self.client.get("/api/locations/", {"cursor": cursor, "limit": 2})
+        self.assertEqual(len(resp.data["results"]), 2)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/api/locations/", {"cursor": "nope"}).status_code, 404)
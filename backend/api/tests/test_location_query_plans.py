@@ -0,0 +1,52 @@
+import random
+from django.db import connection
+from django.db.models import F, Q
+from django.test import TestCase
+from api.models import Location
+
+
+class LocationBrowseQueryPlanTests(TestCase):
+    """
+    The category listing's queries must be answered from the browse indexes.
+    The table is seeded and analyzed so the plans reflect real statistics.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(3)
+        tags = [f"tag{i}" for i in range(40)]
+        rows = [Location(name=f"District{d}", district=f"District{d}", rating=0) for d in range(50)]
+        rows += [
+            Location(
+                name=f"Location{i}",
+                district=f"District{i % 50}",
+                category=rng.sample(tags, rng.randint(1, 3)) + (["rare"] if i % 500 == 0 else []),
+                rating=round(rng.uniform(1, 5), 1),
+            )
+            for i in range(20000)
+        ]
+        Location.objects.bulk_create(rows, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE api_location")
+
+    def browse(self, category=None):
+        qs = Location.objects.exclude(name=F("district"))
+        if category:
+            qs = qs.filter(category__contains=[category])
+        return qs.order_by("-rating", "-id")
+
+    def test_category_filter_uses_gin_index(self):
+        plan = self.browse("rare").explain()
+        self.assertIn("location_category_gin", plan)
+        self.assertNotIn("Seq Scan", plan)
+
+    def test_first_page_uses_partial_index(self):
+        plan = self.browse()[:50].explain()
+        self.assertIn("Index Scan using location_browse_rating", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_deep_page_uses_partial_index(self):
+        rating, pk = self.browse().values_list("rating", "id")[5000]
+        plan = self.browse().filter(Q(rating__lt=rating) | Q(id__lt=pk), rating__lte=rating)[:50].explain()
+        self.assertIn("Index Scan using location_browse_rating", plan)
+        self.assertIn("Index Cond: (rating <=", plan)
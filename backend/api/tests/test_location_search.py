@@ -0,0 +1,97 @@
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APITestCase
+from api.models import Location
+from api.search import search_query, search_terms
+
+
+class SearchTermsTests(SimpleTestCase):
+    def test_html_is_stripped(self):
+        self.assertEqual(
+            search_terms("<p>Sea&nbsp;beach</p><p>Sunset <b>view</b></p>"), ["sea", "beach", "sunset", "view"]
+        )
+
+    def test_bangla_words_stay_whole(self):
+        # Vowel signs and hasanta are combining marks, the joiner is dropped
+        self.assertEqual(search_terms("কক্স‌বাজার, সমুদ্র সৈকত!"), ["কক্সবাজার", "সমুদ্র", "সৈকত"])
+
+    def test_query_without_words(self):
+        self.assertIsNone(search_query(" !? "))
+
+
+class LocationSearchApiTests(APITestCase):
+    def setUp(self):
+        Location.objects.create(name="Cox's Bazar", district="Cox's Bazar")  # district hub, not listed
+        self.beach = Location.objects.create(
+            name="Inani Beach",
+            district="Cox's Bazar",
+            category=["sea"],
+            description="<p>A rocky <strong>beach</strong> south of the town.</p>",
+            rating=4,
+        )
+        self.temple = Location.objects.create(
+            name="Ramu Temple",
+            district="Cox's Bazar",
+            description="<p>Buddhist temple near the beach road.</p>",
+            rating=5,
+        )
+        self.hill = Location.objects.create(
+            name="নীলগিরি", district="বান্দরবান", description="<p>মেঘের উপরে পাহাড়ি রিসোর্ট</p>", rating=3
+        )
+
+    def search(self, q, **params):
+        resp = self.client.get("/api/locations/search/", {"q": q, **params})
+        self.assertEqual(resp.status_code, 200)
+        return resp
+
+    def test_ranked_by_field_weight(self):
+        resp = self.search("beach")
+        # The name match outranks the one in the description
+        self.assertEqual([r["name"] for r in resp.data["results"]], ["Inani Beach", "Ramu Temple"])
+        self.assertEqual(resp.data["results"][0]["description"], self.beach.description)
+
+    def test_prefix_and_bangla(self):
+        self.assertEqual([r["id"] for r in self.search("beac templ").data["results"]], [self.temple.id])
+        self.assertEqual([r["id"] for r in self.search("পাহাড়ি").data["results"]], [self.hill.id])
+        self.assertEqual([r["id"] for r in self.search("বান্দর").data["results"]], [self.hill.id])
+
+    def test_reindexed_on_save(self):
+        self.hill.description = "<p>Cloud resort</p>"
+        self.hill.save()
+        self.assertEqual([r["id"] for r in self.search("cloud").data["results"]], [self.hill.id])
+        self.assertEqual(self.search("পাহাড়ি").data["results"], [])
+
+    def test_pages(self):
+        first = self.search("beach", limit=1).data
+        self.assertEqual(len(first["results"]), 1)
+        second = self.client.get(first["next"]).data
+        self.assertEqual([r["id"] for r in second["results"]], [self.temple.id])
+        self.assertIsNone(second["next"])
+
+    def test_empty_query(self):
+        self.assertEqual(self.client.get("/api/locations/search/", {"q": "  "}).status_code, 400)
+
+
+class LocationSearchQueryPlanTests(TestCase):
+    """Searches must be answered from the GIN index, checked on a seeded and analyzed table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO api_location
+                    (name, district, description, rating, rating_sum, rating_count, category, search_vector)
+                SELECT 'Location' || i, 'District' || i % 50, text, 0, 0, 0, '{}', to_tsvector('simple', text)
+                FROM (
+                    SELECT i, CASE WHEN i % 1000 = 0 THEN 'lake' ELSE 'hill' || i % 97 || ' forest' || i % 89 END
+                    FROM generate_series(1, 50000) AS i
+                ) AS rows (i, text)
+                """
+            )
+            cursor.execute("ANALYZE api_location")
+
+    def test_search_uses_gin_index(self):
+        plan = Location.objects.filter(search_vector=search_query("lake")).explain()
+        self.assertIn("location_search_gin", plan)
+        self.assertNotIn("Seq Scan", plan)
@@ -0,0 +1,98 @@
+import random
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from api.graph import GraphSnapshot
+from api.models import Location, Route
+from api.optimizer import SearchState, apply_move, plan_optimal_route
+from api.utils import FOOD_COST_PER_DAY, plan_route
+from api.views import parse_route_request
+
+
+def brute_force_best(graph, source, district, budget, days):
+    """Best total rating over every feasible move sequence."""
+    remaining = (budget - FOOD_COST_PER_DAY) if budget else float("inf")
+    start = SearchState(graph.ratings[source], FOOD_COST_PER_DAY, remaining, 1, 0, 0, (source,))
+    best = start.score
+
+    def walk(state):
+        nonlocal best
+        best = max(best, state.score)
+        for node in state.route:
+            for edge in graph.out_edges(node):
+                target = graph.edge_target[edge]
+                if graph.districts[target] != district or target in state.route:
+                    continue
+                moved = apply_move(state, graph.edge_time[edge], graph.edge_cost[edge], budget, days)
+                if moved is not None:
+                    walk(SearchState(state.score + graph.ratings[target], *moved, 0, state.route + (target,)))
+
+    walk(start)
+    return best
+
+
+class OptimalRouteTests(SimpleTestCase):
+    def test_beats_greedy_when_top_rated_stop_is_expensive(self):
+        locations = [(1, "D", "D", 0.0, []), (2, "A", "D", 5.0, []), (3, "B", "D", 4.5, []), (4, "C", "D", 4.5, [])]
+        routes = [(1, 2, 60, 1050), (1, 3, 60, 100), (1, 4, 60, 100)]
+        graph = GraphSnapshot(0, locations, routes)
+        greedy = plan_route(graph, "D", "D", 1900, None, None)
+        optimal = plan_optimal_route(graph, "D", "D", 1900, None, None, deadline=5)
+        self.assertEqual([graph.names[n] for n in greedy], ["D", "A"])
+        self.assertEqual([graph.names[n] for n in optimal], ["D", "B", "C"])
+
+    def test_zero_deadline_falls_back_to_greedy(self):
+        locations = [(1, "D", "D", 0.0, []), (2, "A", "D", 5.0, []), (3, "B", "D", 4.5, []), (4, "C", "D", 4.5, [])]
+        routes = [(1, 2, 60, 1050), (1, 3, 60, 100), (1, 4, 60, 100)]
+        graph = GraphSnapshot(0, locations, routes)
+        self.assertEqual(
+            plan_optimal_route(graph, "D", "D", 1900, None, None, deadline=0),
+            plan_route(graph, "D", "D", 1900, None, None),
+        )
+
+    def test_matches_exhaustive_search_on_small_graphs(self):
+        rng = random.Random(11)
+        for _ in range(60):
+            size = rng.randint(2, 7)
+            locations = [(pk, "D" if pk == 1 else f"L{pk}", "D", float(rng.randint(1, 5)), []) for pk in range(1, size + 1)]
+            pairs = {(rng.randint(1, size), rng.randint(1, size)) for _ in range(size * 2)}
+            routes = [(a, b, rng.randint(30, 400), rng.randint(100, 2000)) for a, b in sorted(pairs) if a != b]
+            graph = GraphSnapshot(0, locations, routes)
+            budget = rng.choice([None, 2000, 4000, 7000])
+            days = rng.choice([None, 1, 2])
+            nodes = plan_optimal_route(graph, "D", "D", budget, days, None, deadline=10, beam_width=10**6)
+            self.assertEqual(sum(graph.ratings[n] for n in nodes), brute_force_best(graph, 0, "D", budget, days))
+
+
+class DeadlineParsingTests(SimpleTestCase):
+    def test_explicit_zero_is_kept(self):
+        params = parse_route_request({"source": "D", "destination": "D", "mode": "optimal", "deadline_ms": 0})
+        self.assertEqual(params["deadline"], 0)
+        params = parse_route_request({"source": "D", "destination": "D", "mode": "optimal"})
+        self.assertGreater(params["deadline"], 0)
+
+    def test_non_finite_rejected(self):
+        for value in ("nan", "inf", float("-inf")):
+            with self.assertRaisesMessage(ValueError, "deadline_ms must be a number."):
+                parse_route_request({"source": "D", "destination": "D", "mode": "optimal", "deadline_ms": value})
+
+
+class OptimalRouteApiTests(APITestCase):
+    def setUp(self):
+        hub = Location.objects.create(name="D", district="D", rating=0)
+        a = Location.objects.create(name="A", district="D", rating=5)
+        b = Location.objects.create(name="B", district="D", rating=4.5)
+        c = Location.objects.create(name="C", district="D", rating=4.5)
+        Route.objects.create(source=hub, destination=a, travel_time=60, travel_cost=1050)
+        Route.objects.create(source=hub, destination=b, travel_time=60, travel_cost=100)
+        Route.objects.create(source=hub, destination=c, travel_time=60, travel_cost=100)
+
+    def test_optimal_mode(self):
+        payload = {"source": "D", "destination": "D", "budget": 1900}
+        greedy = self.client.post("/api/route/", payload, format="json")
+        optimal = self.client.post("/api/route/", {**payload, "mode": "optimal", "deadline_ms": 1000}, format="json")
+        self.assertEqual([l["name"] for l in greedy.data["route"]], ["D", "A"])
+        self.assertEqual([l["name"] for l in optimal.data["route"]], ["D", "B", "C"])
+
+    def test_unknown_mode(self):
+        resp = self.client.post("/api/route/", {"source": "D", "destination": "D", "mode": "fast"}, format="json")
+        self.assertEqual(resp.status_code, 400)
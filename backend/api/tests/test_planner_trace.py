@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from api.graph import GraphSnapshot
+from api.models import Location, Route
+from api.utils import PlannerTrace, greedy_route
+
+LOCATIONS = [(1, "D", "D", 0.0, []), (2, "A", "D", 5.0, []), (3, "B", "D", 4.0, []), (4, "C", "D", 3.0, [])]
+ROUTES = [(1, 2, 60, 100), (1, 3, 600, 100), (2, 3, 60, 100), (1, 4, 60, 5000)]
+
+
+class PlannerTraceTests(SimpleTestCase):
+    def test_records_every_considered_move(self):
+        graph = GraphSnapshot(0, LOCATIONS, ROUTES)
+        trace = PlannerTrace()
+        route = greedy_route(graph, "D", "D", 2000, None, trace=trace)
+        self.assertEqual([graph.names[n] for n in route], ["D", "A", "B"])
+        self.assertEqual(
+            [(m["from"], m["to"], m["outcome"], m.get("reason")) for m in trace.moves],
+            [
+                ("D", "A", "accepted", None),
+                ("A", "B", "accepted", None),
+                ("D", "B", "rejected", "visited"),
+                ("D", "C", "rejected", "budget"),
+            ],
+        )
+        self.assertEqual(trace.moves[0]["remaining_budget"], 1100)
+        self.assertEqual(trace.moves[3]["cost"], 5000)
+
+    def test_tracing_does_not_change_the_route(self):
+        graph = GraphSnapshot(0, LOCATIONS, ROUTES)
+        self.assertEqual(
+            greedy_route(graph, "D", "D", 800, 1, trace=PlannerTrace()), greedy_route(graph, "D", "D", 800, 1)
+        )
+
+
+class PlannerTraceApiTests(APITestCase):
+    def setUp(self):
+        hub = Location.objects.create(name="D", district="D", rating=0)
+        a = Location.objects.create(name="A", district="D", rating=5)
+        Route.objects.create(source=hub, destination=a, travel_time=60, travel_cost=100)
+        self.payload = {"source": "D", "destination": "D"}
+
+    def test_trace_is_staff_only(self):
+        resp = self.client.post("/api/route/?trace=1", self.payload, format="json")
+        self.assertNotIn("trace", resp.data)
+        self.client.force_authenticate(User.objects.create_user(username="staff", password="pass", is_staff=True))
+        resp = self.client.post("/api/route/?trace=1", self.payload, format="json")
+        self.assertEqual([l["name"] for l in resp.data["route"]], ["D", "A"])
+        self.assertEqual([(m["to"], m["outcome"]) for m in resp.data["trace"]], [("A", "accepted")])
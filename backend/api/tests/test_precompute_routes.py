@@ -0,0 +1,72 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from api.models import Location, PrecomputedRoute, Route
+from api.offload import planner_pool
+
+
+@override_settings(ROUTE_PRECOMPUTE_BUDGETS=[1000, 5000], ROUTE_PRECOMPUTE_DAYS=[1])
+class PrecomputeRoutesTests(APITestCase):
+    def setUp(self):
+        self.d = Location.objects.create(name="D", district="D", rating=0)
+        self.a = Location.objects.create(name="A", district="D", rating=5)
+        self.b = Location.objects.create(name="B", district="D", rating=4)
+        self.e = Location.objects.create(name="E", district="E", rating=0)
+        self.x = Location.objects.create(name="X", district="E", rating=3)
+        Route.objects.create(source=self.d, destination=self.a, travel_time=60, travel_cost=100)
+        Route.objects.create(source=self.a, destination=self.b, travel_time=60, travel_cost=100)
+        Route.objects.create(source=self.d, destination=self.x, travel_time=60, travel_cost=100)
+
+    def precompute(self, **options):
+        out = StringIO()
+        call_command("precompute_routes", workers=1, stdout=out, **options)
+        return out.getvalue()
+
+    def test_materializes_every_pair_and_bucket(self):
+        self.assertIn("Precomputed 24 itineraries for 4 of 4 district pairs", self.precompute())
+        row = PrecomputedRoute.objects.get(
+            source_district="D", destination_district="D", budget=None, days=None
+        )
+        self.assertEqual(row.location_ids, [self.d.pk, self.a.pk, self.b.pk])
+        self.assertIn("Precomputed 0 itineraries for 0 of 4", self.precompute())
+
+    def test_only_changed_districts_are_recomputed(self):
+        self.precompute()
+        self.x.rating = 1
+        self.x.save()
+        # D -> E and E -> E depend on district E
+        self.assertIn("Precomputed 12 itineraries for 2 of 4", self.precompute())
+        self.assertEqual(PrecomputedRoute.objects.count(), 24)
+        self.assertIn("Precomputed 24 itineraries for 4 of 4", self.precompute(force=True))
+
+    def rows(self):
+        fields = ("source_district", "destination_district", "budget", "days", "location_ids")
+        return {(*row[:4], tuple(row[4])) for row in PrecomputedRoute.objects.values_list(*fields)}
+
+    def test_parallel_run_matches_serial_run(self):
+        self.precompute()
+        serial = self.rows()
+        PrecomputedRoute.objects.all().delete()
+        call_command("precompute_routes", workers=2, stdout=StringIO())
+        self.assertEqual(self.rows(), serial)
+
+    def test_route_view_prefers_fresh_rows(self):
+        for url in ("/api/route/", "/api/route/async/"):
+            with self.subTest(url=url):
+                self.assertPrefersFreshRows(url)
+
+    def assertPrefersFreshRows(self, url):
+        self.addCleanup(planner_pool.shutdown)
+        self.precompute(force=True)
+        # Tamper with the stored answer to see which one the view returns
+        PrecomputedRoute.objects.filter(
+            source_district="D", destination_district="D", budget=5000, days=None
+        ).update(location_ids=[self.d.pk, self.b.pk])
+        payload = {"source": "D", "destination": "D", "budget": 5000}
+        resp = self.client.post(url, payload, format="json")
+        self.assertEqual([l["name"] for l in resp.json()["route"]], ["D", "B"])
+        route = Route.objects.create(source=self.b, destination=self.a, travel_time=30, travel_cost=10)
+        resp = self.client.post(url, payload, format="json")
+        self.assertEqual([l["name"] for l in resp.json()["route"]], ["D", "A", "B"])
+        route.delete()
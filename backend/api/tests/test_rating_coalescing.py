@@ -0,0 +1,168 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from api.checks import check_rating_coalescing_cache
+from api.coalescing import flush_dirty_locations, mark_location_dirty
+from api.models import DirtyLocationRating, Location, Rating
+from api.versioning import CATALOG, GRAPH, get_version
+from api.views import RatingView
+
+FILE_CACHE = "django.core.cache.backends.filebased.FileBasedCache"
+
+
+def shared_default_cache(test_case):
+    """
+    Points the default cache at a file based cache, which unlike LocMemCache
+    is shared with other processes, for the duration of a test class.
+    """
+    location = tempfile.mkdtemp()
+    test_case.addClassCleanup(shutil.rmtree, location, ignore_errors=True)
+    caches = {**settings.CACHES, "default": {"BACKEND": FILE_CACHE, "LOCATION": location}}
+    test_case.enterClassContext(override_settings(CACHES=caches))
+    return location
+
+
+@override_settings(RATING_WRITE_COALESCING=True)
+class RatingCoalescingTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        shared_default_cache(cls)
+
+    def setUp(self):
+        self.hot = Location.objects.create(name="A", district="D", rating=4)
+        self.other = Location.objects.create(name="B", district="D", rating=2)
+        self.users = [User.objects.create_user(username=f"user{i}", password="pass") for i in range(5)]
+
+    def rate(self, user, location, value):
+        self.client.force_authenticate(user=user)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post("/api/rating/", {"location": location.id, "value": value})
+        self.assertEqual(resp.status_code, 200)
+
+    def flush(self, *args):
+        out = StringIO()
+        call_command("flush_ratings", "--once", *args, stdout=out)
+        return out.getvalue()
+
+    def test_writes_are_queued_once_per_location(self):
+        with CaptureQueriesContext(connection) as captured:
+            for i, user in enumerate(self.users):
+                self.rate(user, self.hot, i + 1)
+        self.assertFalse(any(q["sql"].startswith('UPDATE "api_location"') for q in captured))
+        self.assertEqual(list(DirtyLocationRating.objects.values_list("location_id", flat=True)), [self.hot.pk])
+        self.hot.refresh_from_db()
+        self.assertEqual(self.hot.rating, 4)
+
+        self.assertIn("Refreshed ratings of 1 locations", self.flush())
+        self.hot.refresh_from_db()
+        self.assertEqual((self.hot.rating_sum, self.hot.rating_count, self.hot.rating), (15, 5, 3.0))
+        self.assertFalse(DirtyLocationRating.objects.exists())
+
+    def test_overwrites_and_deletes(self):
+        self.rate(self.users[0], self.hot, 5)
+        self.rate(self.users[1], self.hot, 2)
+        self.rate(self.users[1], self.hot, 4)
+        self.rate(self.users[2], self.other, 1)
+        self.client.force_authenticate(user=self.users[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete("/api/rating/", {"location": self.other.id})
+        self.assertIn("Refreshed ratings of 2 locations", self.flush("--batch-size", "1"))
+        self.hot.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.hot.rating_sum, self.hot.rating_count, self.hot.rating), (9, 2, 4.5))
+        self.assertEqual((self.other.rating_sum, self.other.rating_count, self.other.rating), (0, 0, 0))
+        self.assertIn("Refreshed ratings of 0 locations", self.flush())
+
+    def test_process_local_cache(self):
+        local = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with override_settings(CACHES=local):
+            with self.assertRaisesMessage(CommandError, "process-local default cache"):
+                call_command("flush_ratings", "--once", stdout=StringIO())
+            # Reconciling still fixes the totals, it just cannot tell the servers
+            out = StringIO()
+            call_command("reconcile_ratings", stdout=out)
+            self.assertIn("keep their cached ratings until they restart", out.getvalue())
+
+
+class RatingCoalescingCheckTests(SimpleTestCase):
+    def test_needs_a_shared_cache(self):
+        with override_settings(RATING_WRITE_COALESCING=True):
+            self.assertEqual([error.id for error in check_rating_coalescing_cache(None)], ["api.E001"])
+            with override_settings(CACHES={"default": {"BACKEND": FILE_CACHE, "LOCATION": tempfile.gettempdir()}}):
+                self.assertEqual(check_rating_coalescing_cache(None), [])
+        self.assertEqual(check_rating_coalescing_cache(None), [])
+
+
+@override_settings(RATING_WRITE_COALESCING=True)
+class RatingFlushProcessTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.cache_location = shared_default_cache(cls)
+
+    def setUp(self):
+        self.location = Location.objects.create(name="A", district="D", rating=4)
+        self.user = User.objects.create_user(username="user", password="pass")
+
+    def test_flush_process_bumps_versions_seen_here(self):
+        Rating.objects.create(user=self.user, location=self.location, value=2)
+        mark_location_dirty(self.location.pk)
+        versions = get_version(GRAPH), get_version(CATALOG)
+
+        env = {
+            **os.environ,
+            "POSTGRES_DB": connection.settings_dict["NAME"],
+            "DEFAULT_CACHE_BACKEND": FILE_CACHE,
+            "DEFAULT_CACHE_LOCATION": self.cache_location,
+            "RATING_WRITE_COALESCING": "True",
+        }
+        result = subprocess.run(
+            [sys.executable, "manage.py", "flush_ratings", "--once"],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("Refreshed ratings of 1 locations", result.stdout)
+
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.rating, 2)
+        new_versions = get_version(GRAPH), get_version(CATALOG)
+        self.assertTrue(all(new > old for new, old in zip(new_versions, versions)))
+
+    def test_rating_committed_during_a_flush_is_not_lost(self):
+        first = User.objects.create_user(username="first", password="pass")
+        Rating.objects.create(user=first, location=self.location, value=5)
+        mark_location_dirty(self.location.pk)
+
+        def flush():
+            try:
+                flush_dirty_locations(100)
+            finally:
+                connections.close_all()
+
+        # A rating is written while a flush dequeues the location, before
+        # the rating commits
+        with transaction.atomic():
+            Rating.objects.create(user=self.user, location=self.location, value=1)
+            RatingView()._update_location_rating(self.location, 1, 1)
+            flusher = threading.Thread(target=flush)
+            flusher.start()
+            flusher.join()
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.rating_count, 1)
+
+        flush_dirty_locations(100)
+        self.location.refresh_from_db()
+        self.assertEqual((self.location.rating_sum, self.location.rating_count, self.location.rating), (6, 2, 3.0))
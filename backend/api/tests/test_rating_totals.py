@@ -0,0 +1,76 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APITestCase
+from api.models import Location, Rating
+from api.tests.test_rating_coalescing import shared_default_cache
+from api.versioning import CATALOG, GRAPH, get_version
+
+
+class RatingTotalsTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        shared_default_cache(cls)
+
+    def setUp(self):
+        self.location = Location.objects.create(name="A", district="D", rating=4.5, description="<p>x</p>")
+        self.users = [User.objects.create_user(username=f"user{i}", password="pass") for i in range(3)]
+
+    def rate(self, user, value):
+        self.client.force_authenticate(user=user)
+        resp = self.client.post("/api/rating/", {"location": self.location.id, "value": value})
+        self.assertEqual(resp.status_code, 200)
+
+    def unrate(self, user):
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.delete("/api/rating/", {"location": self.location.id}).status_code, 200)
+
+    def assertTotals(self, rating_sum, rating_count, rating):
+        self.location.refresh_from_db()
+        self.assertEqual((self.location.rating_sum, self.location.rating_count), (rating_sum, rating_count))
+        self.assertAlmostEqual(self.location.rating, rating)
+
+    def test_create_overwrite_and_delete(self):
+        self.rate(self.users[0], 4)
+        self.assertTotals(4, 1, 4)
+        self.rate(self.users[1], 1)
+        self.assertTotals(5, 2, 2.5)
+        self.rate(self.users[1], 3)  # Overwrite
+        self.assertTotals(7, 2, 3.5)
+        self.rate(self.users[1], 3)  # Same value again
+        self.assertTotals(7, 2, 3.5)
+        self.unrate(self.users[0])
+        self.assertTotals(3, 1, 3)
+        self.unrate(self.users[1])
+        self.assertTotals(0, 0, 0)
+
+    def test_only_rating_columns_are_written(self):
+        self.client.force_authenticate(user=self.users[0])
+        with CaptureQueriesContext(connection) as captured:
+            self.client.post("/api/rating/", {"location": self.location.id, "value": 4})
+        updates = [q["sql"] for q in captured if q["sql"].startswith('UPDATE "api_location"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn("description", updates[0])
+        self.assertIn('"rating_sum" = ("api_location"."rating_sum" + 4)', updates[0])
+
+    def test_invalid_value(self):
+        self.client.force_authenticate(user=self.users[0])
+        resp = self.client.post("/api/rating/", {"location": self.location.id, "value": "five"})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_reconcile(self):
+        unrated = Location.objects.create(name="B", district="D", rating=3.7)
+        for user, value in zip(self.users, (5, 4, 4)):
+            Rating.objects.create(user=user, location=self.location, value=value)
+        Location.objects.filter(pk=unrated.pk).update(rating_sum=9, rating_count=2)
+        versions = get_version(GRAPH), get_version(CATALOG)
+        out = StringIO()
+        call_command("reconcile_ratings", stdout=out)
+        self.assertIn("Reconciled 2 locations, 2 had drifted totals", out.getvalue())
+        self.assertTotals(13, 3, 13 / 3)
+        unrated.refresh_from_db()
+        self.assertEqual((unrated.rating_sum, unrated.rating_count, unrated.rating), (0, 0, 0))
+        self.assertNotEqual((get_version(GRAPH), get_version(CATALOG)), versions)
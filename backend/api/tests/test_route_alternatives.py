@@ -0,0 +1,72 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from api.graph import GraphSnapshot
+from api.models import Location, Route
+from api.optimizer import plan_alternatives
+from api.utils import OPTIMAL, find_route, greedy_route, plan_route
+
+LOCATIONS = [
+    (1, "D", "D", 0.0, []),
+    (2, "A", "D", 5.0, ["nature"]),
+    (3, "B", "D", 4.5, ["nature"]),
+    (4, "C", "D", 4.5, ["culture"]),
+]
+ROUTES = [(1, 2, 60, 1050), (1, 3, 60, 100), (1, 4, 60, 100)]
+
+
+class RouteAlternativesTests(SimpleTestCase):
+    def setUp(self):
+        self.graph = GraphSnapshot(0, LOCATIONS, ROUTES)
+
+    def names(self, routes):
+        return [[self.graph.names[n] for n in route] for route in routes]
+
+    def test_greedy_itinerary_comes_first(self):
+        routes = plan_alternatives(self.graph, "D", "D", 1900, None, None, deadline=5, k=3)
+        self.assertEqual(routes[0], plan_route(self.graph, "D", "D", 1900, None, None))
+        self.assertEqual(self.names(routes), [["D", "A"], ["D", "B", "C"]])
+
+    def test_greedy_itinerary_planned_once(self):
+        spy = mock.Mock(wraps=greedy_route)
+        with mock.patch("api.utils.greedy_route", spy), mock.patch("api.optimizer.greedy_route", spy):
+            plan_alternatives(self.graph, "D", "D", 1900, None, None, deadline=5, k=3)
+        self.assertEqual(spy.call_count, 1)
+
+    def test_optimal_ranked_by_rating_then_cost(self):
+        routes = plan_alternatives(self.graph, "D", "D", 1900, None, None, OPTIMAL, deadline=5, k=5)
+        self.assertEqual(self.names(routes), [["D", "B", "C"], ["D", "A"]])
+
+    def test_alternatives_are_distinct_after_category_filter(self):
+        routes = plan_alternatives(self.graph, "D", "D", 3000, None, "nature", OPTIMAL, deadline=5, k=5)
+        kept = [frozenset(route) for route in routes]
+        self.assertEqual(len(kept), len(set(kept)))
+        self.assertEqual(self.names(routes)[0], ["D", "A", "B"])
+
+
+class RouteAlternativesApiTests(APITestCase):
+    def setUp(self):
+        hub = Location.objects.create(name="D", district="D", rating=0)
+        a = Location.objects.create(name="A", district="D", rating=5)
+        b = Location.objects.create(name="B", district="D", rating=4.5)
+        c = Location.objects.create(name="C", district="D", rating=4.5)
+        Route.objects.create(source=hub, destination=a, travel_time=60, travel_cost=1050)
+        Route.objects.create(source=hub, destination=b, travel_time=60, travel_cost=100)
+        Route.objects.create(source=hub, destination=c, travel_time=60, travel_cost=100)
+
+    def test_alternatives_in_response(self):
+        payload = {"source": "D", "destination": "D", "budget": 1900, "alternatives": 2}
+        resp = self.client.post("/api/route/", payload, format="json")
+        self.assertEqual([l["name"] for l in resp.data["route"]], ["D", "A"])
+        self.assertEqual(
+            [[l["name"] for l in route] for route in resp.data["alternatives"]], [["D", "B", "C"]]
+        )
+
+    def test_no_alternatives_key_by_default(self):
+        resp = self.client.post("/api/route/", {"source": "D", "destination": "D"}, format="json")
+        self.assertNotIn("alternatives", resp.data)
+
+    def test_find_route_with_k(self):
+        routes = find_route("D", "D", 1900, None, None, k=3)
+        self.assertEqual([[l.name for l in route] for route in routes], [["D", "A"], ["D", "B", "C"]])
+        self.assertEqual([l.name for l in find_route("D", "D", 1900, None, None)], ["D", "A"])
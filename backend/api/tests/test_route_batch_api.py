@@ -0,0 +1,57 @@
+from rest_framework.test import APITestCase
+from api.models import Location, Route
+
+
+class RouteBatchApiTests(APITestCase):
+    def setUp(self):
+        self.hub = Location.objects.create(name="D", district="D", category=[], rating=0)
+        self.a = Location.objects.create(name="A", district="D", category=["nature"], rating=5)
+        self.b = Location.objects.create(name="B", district="D", category=["culture"], rating=4)
+        Route.objects.create(source=self.hub, destination=self.a, travel_time=60, travel_cost=100)
+        Route.objects.create(source=self.a, destination=self.b, travel_time=600, travel_cost=100)
+
+    def test_results_in_input_order_with_shared_locations(self):
+        payloads = [
+            {"source": "D", "destination": "D", "budget": 10000},
+            {"source": "D", "destination": "D", "start_date": "2025-07-10", "end_date": "2025-07-08"},
+            {"source": "D", "destination": "D", "start_date": "2025-07-08", "end_date": "2025-07-08"},
+            {"source": "Nonexistent", "destination": "D"},
+        ]
+        resp = self.client.post("/api/route/batch/", payloads, format="json")
+        self.assertEqual(resp.status_code, 200)
+        results = resp.data["results"]
+        self.assertEqual(results[0], {"route": [self.hub.id, self.a.id, self.b.id]})
+        self.assertEqual(results[1], {"error": "End date must be after start date."})
+        # A one day trip has no time left for the 10 hour leg to B
+        self.assertEqual(results[2], {"route": [self.hub.id, self.a.id]})
+        self.assertEqual(results[3], {"route": []})
+        self.assertEqual(
+            [l["id"] for l in resp.data["locations"]], [self.hub.id, self.a.id, self.b.id]
+        )
+
+    def test_matches_single_route_endpoint(self):
+        payload = {"source": "D", "destination": "D", "budget": 2000, "tier": 1}
+        single = self.client.post("/api/route/", payload, format="json")
+        batch = self.client.post("/api/route/batch/", [payload], format="json")
+        self.assertEqual(batch.data["results"][0]["route"], [l["id"] for l in single.data["route"]])
+
+    def test_rejects_non_list(self):
+        resp = self.client.post("/api/route/batch/", {"source": "D"}, format="json")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_bad_item_types_fail_alone(self):
+        payloads = [
+            {"source": ["D"], "destination": "D"},
+            {"source": "D", "destination": {"name": "D"}},
+            {"source": "D", "destination": "D", "budget": "nan"},
+            {"source": "D", "destination": "D"},
+        ]
+        resp = self.client.post("/api/route/batch/", payloads, format="json")
+        self.assertEqual(resp.status_code, 200)
+        results = resp.data["results"]
+        self.assertEqual(results[0], {"error": "source must be a non-empty string."})
+        self.assertEqual(results[1], {"error": "destination must be a non-empty string."})
+        self.assertEqual(results[2], {"error": "Budget and tier must be numbers."})
+        self.assertIn("route", results[3])
+        resp = self.client.post("/api/route/", {"source": ["D"], "destination": "D"}, format="json")
+        self.assertEqual(resp.status_code, 400)
@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from api.models import Location, Rating, Route
+from api.instrumentation import route_cache_lookups
+
+
+class RouteCacheTests(APITestCase):
+    def setUp(self):
+        self.hub = Location.objects.create(name="D", district="D", category=[], rating=0)
+        self.a = Location.objects.create(name="A", district="D", category=["nature"], rating=5)
+        self.b = Location.objects.create(name="B", district="D", category=["culture"], rating=4)
+        Route.objects.create(source=self.hub, destination=self.a, travel_time=60, travel_cost=100)
+        self.payload = {"source": "D", "destination": "D", "budget": 10000, "tier": 2}
+        route_cache_lookups.reset()
+
+    def assertLookups(self, hits, misses):
+        self.assertEqual((route_cache_lookups.value("hit"), route_cache_lookups.value("miss")), (hits, misses))
+
+    def post(self, payload=None):
+        resp = self.client.post("/api/route/", payload or self.payload, format="json")
+        self.assertEqual(resp.status_code, 200)
+        return [l["name"] for l in resp.data["route"]]
+
+    def test_repeated_query_is_served_from_cache(self):
+        self.assertEqual(self.post(), ["D", "A"])
+        self.assertEqual(self.post(), ["D", "A"])
+        # Same normalized budget without a tier
+        self.post({"source": "D", "destination": "D", "budget": 5000})
+        self.assertLookups(2, 1)
+
+    def test_route_write_invalidates(self):
+        self.post()
+        Route.objects.create(source=self.a, destination=self.b, travel_time=60, travel_cost=100)
+        self.assertEqual(self.post(), ["D", "A", "B"])
+        self.assertLookups(0, 2)
+
+    def test_location_write_invalidates(self):
+        payload = {**self.payload, "category": "nature"}
+        self.assertEqual(self.post(payload), ["D", "A"])
+        self.a.category = ["culture"]
+        self.a.save()
+        self.assertEqual(self.post(payload), ["D"])
+
+    def test_rating_write_invalidates(self):
+        self.post()
+        user = User.objects.create_user(username="user", password="pass")
+        Rating.objects.create(user=user, location=self.a, value=3)
+        self.post()
+        self.assertLookups(0, 2)
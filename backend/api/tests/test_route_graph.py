@@ -0,0 +1,48 @@
+from django.test import TestCase
+from api.graph import get_snapshot
+from api.models import Location, Route
+from api.utils import find_route
+
+
+class RouteGraphSnapshotTests(TestCase):
+    def setUp(self):
+        self.hub = Location.objects.create(name="D", district="D", category=[], rating=0)
+        self.a = Location.objects.create(name="A", district="D", category=["nature"], rating=5)
+        self.b = Location.objects.create(name="B", district="D", category=["culture"], rating=4)
+        self.other = Location.objects.create(name="X", district="E", category=["nature"], rating=3)
+        Route.objects.create(source=self.hub, destination=self.a, travel_time=60, travel_cost=100)
+        Route.objects.create(source=self.hub, destination=self.b, travel_time=60, travel_cost=100)
+        Route.objects.create(source=self.a, destination=self.other, travel_time=60, travel_cost=100)
+
+    def test_compiled_layout(self):
+        graph = get_snapshot()
+        self.assertEqual(len(graph), 4)
+        hub = graph.index["D"]
+        self.assertEqual(graph.pks[hub], self.hub.pk)
+        self.assertEqual(
+            sorted(graph.names[graph.edge_target[e]] for e in graph.out_edges(hub)), ["A", "B"]
+        )
+        self.assertEqual(graph.ratings[graph.index["A"]], 5)
+        nature = graph.category_mask("D", "nature")
+        self.assertTrue(graph.category_masks[graph.index["A"]] & nature)
+        self.assertFalse(graph.category_masks[graph.index["B"]] & nature)
+        self.assertEqual(graph.category_mask("D", "sea"), 0)
+        self.assertEqual(len(graph.district_edges["D"]), 2)
+        self.assertEqual(len(graph.district_edges["E"]), 1)
+
+    def test_snapshot_reused_until_graph_changes(self):
+        graph = get_snapshot()
+        self.assertIs(get_snapshot(), graph)
+        self.a.rating = 1
+        self.a.save()
+        rebuilt = get_snapshot()
+        self.assertIsNot(rebuilt, graph)
+        self.assertEqual(rebuilt.ratings[rebuilt.index["A"]], 1)
+        Route.objects.filter(destination=self.other).delete()
+        self.assertNotIn("E", get_snapshot().district_edges)
+
+    def test_find_route_only_loads_result_rows(self):
+        get_snapshot()
+        with self.assertNumQueries(1):
+            route = find_route("D", "D", None, None, None)
+        self.assertEqual([l.name for l in route], ["D", "A", "B"])
@@ -0,0 +1,110 @@
+import logging
+import random
+from django.test import SimpleTestCase
+from api.graph import GraphSnapshot
+from api.utils import (
+    ACCOMMODATION_COST_PER_NIGHT,
+    FOOD_COST_PER_DAY,
+    MAX_TRAVEL_MINUTES_PER_DAY,
+    plan_route,
+)
+
+logging.disable(logging.CRITICAL)
+
+
+def rescan_route(locations, routes, source_name, destination_district, budget, days, category):
+    """
+    The original find_route algorithm, which rescans and re-sorts every route of
+    the district after each move, over plain tuples instead of ORM rows.
+    """
+    by_pk = {pk: (name, district, rating, set(cats)) for pk, name, district, rating, cats in locations}
+    by_name = {name: pk for pk, name, _, _, _ in locations}
+    if source_name not in by_name:
+        return []
+    all_possible_routes = [r for r in routes if by_pk[r[1]][1] == destination_district]
+    source = by_name[source_name]
+    route = [source]
+    visited = {source}
+    depth_map = {source: 0}
+    current_day = 1
+    time_spent_today = 0
+    remaining_budget = budget or float("inf")
+    if budget:
+        remaining_budget -= FOOD_COST_PER_DAY
+        if remaining_budget < 0:
+            return [source]
+    while True:
+        candidates = [r for r in all_possible_routes if r[0] in visited and r[1] not in visited]
+        sorted_candidates = sorted(
+            candidates, key=lambda r: (depth_map[r[0]], by_pk[r[1]][2]), reverse=True
+        )
+        best_move_found = False
+        for src, dst, travel_time, travel_cost in sorted_candidates:
+            temp_day = current_day
+            cost_of_move = travel_cost
+            if (time_spent_today + travel_time) > MAX_TRAVEL_MINUTES_PER_DAY:
+                temp_day += 1
+                temp_time_today = travel_time
+                if budget:
+                    cost_of_move += ACCOMMODATION_COST_PER_NIGHT + FOOD_COST_PER_DAY
+            else:
+                temp_time_today = time_spent_today + travel_time
+            if days and temp_day > days:
+                continue
+            if budget and remaining_budget < cost_of_move:
+                continue
+            current_day = temp_day
+            time_spent_today = temp_time_today
+            if budget:
+                remaining_budget -= cost_of_move
+            route.append(dst)
+            visited.add(dst)
+            depth_map[dst] = depth_map[src] + 1
+            best_move_found = True
+            break
+        if not best_move_found:
+            break
+    return [
+        pk
+        for pk in route
+        if by_pk[pk][0] in (source_name, destination_district)
+        or (not category or category in by_pk[pk][3])
+    ]
+
+
+def random_graph(rng, node_count, edge_count):
+    districts = ["D", "E"]
+    locations = []
+    for pk in range(1, node_count + 1):
+        district = rng.choice(districts)
+        name = district if pk <= len(districts) and district not in [l[1] for l in locations] else f"L{pk}"
+        locations.append(
+            (pk, name, district, rng.choice([3.0, 4.0, 4.5, 5.0]), rng.sample(["nature", "culture", "sea"], rng.randint(0, 2)))
+        )
+    pairs = set()
+    while len(pairs) < edge_count:
+        a, b = rng.randint(1, node_count), rng.randint(1, node_count)
+        if a != b:
+            pairs.add((a, b))
+    pairs = list(pairs)
+    rng.shuffle(pairs)
+    routes = [(a, b, rng.randint(10, 400), rng.randint(0, 1500)) for a, b in pairs]
+    return locations, routes
+
+
+class RouteSearchEquivalenceTests(SimpleTestCase):
+    def test_heap_search_matches_rescan_on_random_graphs(self):
+        rng = random.Random(20250708)
+        for _ in range(500):
+            node_count = rng.randint(2, 40)
+            edge_count = rng.randint(node_count // 2, min(node_count * (node_count - 1), 200))
+            locations, routes = random_graph(rng, node_count, edge_count)
+            graph = GraphSnapshot(0, locations, routes)
+            source = rng.choice(locations)[1]
+            destination = rng.choice(["D", "E"])
+            budget = rng.choice([None, 0, 500, 3000, 8000, 20000.0])
+            days = rng.choice([None, 1, 2, 3, 5])
+            category = rng.choice([None, "nature", "sea"])
+            expected = rescan_route(locations, routes, source, destination, budget, days, category)
+            nodes = plan_route(graph, source, destination, budget, days, category)
+            self.assertEqual([graph.pks[n] for n in nodes], expected)
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from api.graph import get_snapshot
+from api.models import Location, Rating, Route
+
+
+class UserRatingQueryCountTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.hub = Location.objects.create(name="D", district="D", rating=0)
+
+    def add_locations(self, count):
+        for i in range(count):
+            location = Location.objects.create(name=f"L{i}", district="D", category=["nature"], rating=i % 5)
+            Route.objects.create(source=self.hub, destination=location, travel_time=10, travel_cost=10)
+            if i % 2:
+                Rating.objects.create(user=self.user, location=location, value=i % 5 + 1)
+
+    def test_listing_query_count_is_constant(self):
+        self.add_locations(3)
+        with self.assertNumQueries(2):
+            resp = self.client.get("/api/locations/", {"category": "nature"})
+        self.assertEqual(len(resp.data), 3)
+        Location.objects.filter(name__startswith="L").delete()
+        self.add_locations(30)
+        with self.assertNumQueries(2):
+            resp = self.client.get("/api/locations/", {"category": "nature"})
+        self.assertEqual(len(resp.data), 30)
+        self.assertEqual({l["name"]: l["user_rating"] for l in resp.data}["L7"], 3)
+        self.assertIsNone({l["name"]: l["user_rating"] for l in resp.data}["L8"])
+
+    def test_detail(self):
+        self.add_locations(2)
+        location = Location.objects.get(name="L1")
+        with self.assertNumQueries(2):
+            resp = self.client.get(f"/api/locations/{location.pk}/")
+        self.assertEqual(resp.data["user_rating"], 2)
+
+    def route_queries(self):
+        get_snapshot()
+        payload = {"source": "D", "destination": "D", "alternatives": 1}
+        with self.assertNumQueries(2):
+            resp = self.client.post("/api/route/", payload, format="json")
+        return resp
+
+    def test_route_query_count_is_constant(self):
+        self.add_locations(3)
+        self.assertEqual(len(self.route_queries().data["route"]), 4)
+        Location.objects.filter(name__startswith="L").delete()
+        self.add_locations(40)
+        resp = self.route_queries()
+        self.assertEqual(len(resp.data["route"]), 41)
+        self.assertEqual({l["name"]: l["user_rating"] for l in resp.data["route"]}["L3"], 4)
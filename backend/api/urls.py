@@ -4,7 +4,12 @@ from .views import (
     LoginView,
     LogoutView,
     RouteView,
+    AsyncRouteView,
+    RouteBatchView,
+    LegView,
+    MetricsView,
     LocationListByCategoryView,
+    LocationSearchView,
     LocationDetailView,
     RatingView,
 )
@@ -14,7 +19,12 @@ urlpatterns = [
     path("login/", LoginView.as_view(), name="login"),
     path("logout/", LogoutView.as_view(), name="logout"),
     path("route/", RouteView.as_view(), name="route"),
+    path("route/async/", AsyncRouteView.as_view(), name="route-async"),
+    path("route/batch/", RouteBatchView.as_view(), name="route-batch"),
+    path("route/leg/", LegView.as_view(), name="route-leg"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
     path("locations/", LocationListByCategoryView.as_view(), name="locations-by-category"),
+    path("locations/search/", LocationSearchView.as_view(), name="location-search"),
     path("locations/<int:pk>/", LocationDetailView.as_view(), name="location-detail"),
     path("rating/", RatingView.as_view(), name="rating"),
 ]
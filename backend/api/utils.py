@@ -1,35 +1,266 @@
-import logging
-from .models import Location, Route
+import heapq
+from .graph import get_snapshot
+from .instrumentation import span
+from .models import Location
 
 MAX_TRAVEL_MINUTES_PER_DAY = 540  # 9 hours
 FOOD_COST_PER_DAY = 800
 ACCOMMODATION_COST_PER_NIGHT = 800
 
-logger = logging.getLogger(__name__)
 
+GREEDY = "greedy"
+OPTIMAL = "optimal"
+PLANNER_MODES = (GREEDY, OPTIMAL)
 
-def find_route(source_district, destination_district, budget, days, category):
+# How the category is applied: only to the finished itinerary, as a preference
+# for matching stops during the search, or as a restriction to matching stops.
+CATEGORY_FILTER = "filter"
+CATEGORY_PREFER = "prefer"
+CATEGORY_RESTRICT = "restrict"
+CATEGORY_MODES = (CATEGORY_FILTER, CATEGORY_PREFER, CATEGORY_RESTRICT)
+
+
+ACCEPTED = "accepted"
+REJECTED = "rejected"
+
+
+class PlannerTrace:
+    """
+    Structured record of the moves the greedy planner considered, in order,
+    each with whether it was taken and why not. The planner only does tracing
+    work when it is handed one of these.
+    """
+
+    def __init__(self):
+        self.moves = []
+
+    def record(self, graph, edge, outcome, reason=None, cost=None, day=None, remaining_budget=None):
+        target = graph.edge_target[edge]
+        move = {
+            "from": graph.names[graph.edge_source[edge]],
+            "to": graph.names[target],
+            "location": graph.pks[target],
+            "travel_time": graph.edge_time[edge],
+            "travel_cost": graph.edge_cost[edge],
+            "outcome": outcome,
+        }
+        if reason is not None:
+            move["reason"] = reason
+        if cost is not None:
+            move["cost"] = cost
+            move["day"] = day
+            if remaining_budget != float("inf"):
+                move["remaining_budget"] = remaining_budget
+        self.moves.append(move)
+
+
+def find_route(
+    source_district,
+    destination_district,
+    budget,
+    days,
+    category,
+    mode=GREEDY,
+    deadline=None,
+    k=None,
+    category_mode=CATEGORY_FILTER,
+    trace=None,
+):
     """
     Finds a route from a source to a destination district using an iterative greedy
     approach with depth-first exploration, considering budget and day constraints.
+
+    With ``mode="optimal"`` the itinerary is searched for with the anytime
+    optimizer instead, which stops after ``deadline`` seconds. When ``k`` is
+    given, a list of up to ``k`` distinct itineraries is returned instead of a
+    single one, the first being the one the chosen mode would return.
+    ``category_mode`` selects how the category is applied (see CATEGORY_MODES).
+    Pass a PlannerTrace as ``trace`` to record the greedy planner's moves.
     """
-    try:
-        source_location = Location.objects.get(name=source_district)
-    except Location.DoesNotExist:
-        return []
+    with span("graph"):
+        graph = get_snapshot()
+    with span("plan"):
+        itineraries = plan_itineraries(
+            graph,
+            source_district,
+            destination_district,
+            budget,
+            days,
+            category,
+            mode,
+            deadline,
+            k,
+            category_mode,
+            trace,
+        )
+    with span("load"):
+        by_pk = Location.objects.in_bulk({graph.pks[node] for nodes in itineraries for node in nodes})
+    itineraries = [[by_pk[graph.pks[node]] for node in nodes] for nodes in itineraries]
+    if k is None:
+        return itineraries[0]
+    return itineraries
+
+
+def plan(
+    graph,
+    source_district,
+    destination_district,
+    budget,
+    days,
+    category,
+    mode=GREEDY,
+    deadline=None,
+    category_mode=CATEGORY_FILTER,
+    trace=None,
+):
+    """
+    Plans an itinerary against a GraphSnapshot with the given planner mode.
+    ``trace`` only records anything in greedy mode.
+    """
+    if mode == OPTIMAL:
+        from .optimizer import plan_optimal_route
 
-    # Fetch all possible routes in the destination district once to reduce database queries
-    all_possible_routes = list(
-        Route.objects.filter(destination__district=destination_district).select_related(
-            "source", "destination"
+        return plan_optimal_route(
+            graph,
+            source_district,
+            destination_district,
+            budget,
+            days,
+            category,
+            deadline,
+            category_mode=category_mode,
         )
+    return plan_route(
+        graph, source_district, destination_district, budget, days, category, category_mode, trace
     )
 
+
+def plan_itineraries(
+    graph,
+    source_district,
+    destination_district,
+    budget,
+    days,
+    category,
+    mode=GREEDY,
+    deadline=None,
+    k=None,
+    category_mode=CATEGORY_FILTER,
+    trace=None,
+):
+    """
+    Plans the itinerary for a query, plus up to ``k - 1`` alternatives when ``k``
+    is given, and returns them as a list of node lists. ``trace`` is passed on
+    to plan() when no alternatives are asked for.
+    """
+    if not k:
+        route = plan(
+            graph,
+            source_district,
+            destination_district,
+            budget,
+            days,
+            category,
+            mode,
+            deadline,
+            category_mode,
+            trace,
+        )
+        return [route]
+    from .optimizer import plan_alternatives
+
+    routes = plan_alternatives(
+        graph,
+        source_district,
+        destination_district,
+        budget,
+        days,
+        category,
+        mode,
+        deadline,
+        k,
+        category_mode,
+    )
+    return routes or [[]]
+
+
+def plan_route(
+    graph,
+    source_district,
+    destination_district,
+    budget,
+    days,
+    category,
+    category_mode=CATEGORY_FILTER,
+    trace=None,
+):
+    """
+    Runs the greedy route search against a compiled GraphSnapshot and returns
+    the itinerary as a list of graph nodes.
+    """
+    route = greedy_route(
+        graph, source_district, destination_district, budget, days, category, category_mode, trace
+    )
+    return filter_route(graph, route, source_district, destination_district, category)
+
+
+def category_matcher(graph, destination_district, category):
+    """
+    Returns a predicate telling whether a node of the destination district is a
+    stop for ``category``. The district's own location always counts as one.
+    """
+    names = graph.names
+    masks = graph.category_masks
+    bit = graph.category_mask(destination_district, category)
+
+    def matches(node):
+        return not category or bool(masks[node] & bit) or names[node] == destination_district
+
+    return matches
+
+
+def filter_route(graph, route, source_district, destination_district, category):
+    """
+    Filters the generated route based on the category, always including the source
+    or destination.
+    """
+    matches = category_matcher(graph, destination_district, category)
+    source_node = graph.index.get(source_district)
+    return [node for node in route if node == source_node or matches(node)]
+
+
+def greedy_route(
+    graph,
+    source_district,
+    destination_district,
+    budget,
+    days,
+    category=None,
+    category_mode=CATEGORY_FILTER,
+    trace=None,
+):
+    """
+    Runs the greedy depth-first search and returns every visited node in visiting
+    order, before any category filtering. With CATEGORY_PREFER the search tries
+    stops matching ``category`` before any others, and with CATEGORY_RESTRICT it
+    never moves to a stop that does not match.
+
+    Candidate moves are kept in a heap that is extended with the outgoing routes
+    of each newly visited location, instead of rescanning every route of the
+    district after each move. Every candidate taken off the heap is recorded in
+    ``trace``, a PlannerTrace, when one is given.
+    """
+    source_node = graph.index.get(source_district)
+    if source_node is None:
+        return []
+
+    ratings = graph.ratings
+    districts = graph.districts
+    edge_target = graph.edge_target
+
     # Initialization
-    route = [source_location]
-    visited = {source_location.name}
-    # Track the depth of each location to prioritize deeper routes
-    depth_map = {source_location.name: 0}
+    route = [source_node]
+    visited = {source_node}
 
     # State variables for constraints
     current_day = 1
@@ -40,99 +271,89 @@ def find_route(source_district, destination_district, budget, days, category):
     if budget:
         remaining_budget -= FOOD_COST_PER_DAY
         if remaining_budget < 0:
-            return [source_location]
-
-    while True:
-        # Select next candidates
-        # Find all possible next moves from any location in the current route
-        # to an unvisited destination in the target district.
-        candidates = [
-            route_edge
-            for route_edge in all_possible_routes
-            if route_edge.source.name in visited
-            and route_edge.destination.name not in visited
-        ]
-        # Sort candidates to prioritize depth, then rating.
-        # Primary key: depth of the source node (descending).
-        # Secondary key: rating of the destination node (descending).
-        sorted_candidates = sorted(
-            candidates,
-            key=lambda route_edge: (
-                depth_map[route_edge.source.name],
-                route_edge.destination.rating,
-            ),
-            reverse=True,
-        )
+            return [source_node]
 
-        best_move_found = False
-        for route_edge in sorted_candidates:
-            next_location = route_edge.destination
-            travel_time = route_edge.travel_time
-            travel_cost = route_edge.travel_cost
-            logger.debug(
-                f"Considering move to {next_location.name} with travel time {travel_time} and cost {travel_cost}"
-            )
-
-            # Tentatively calculate next state
-            temp_day = current_day
-            temp_time_today = time_spent_today
-            cost_of_move = travel_cost
-            is_new_day = False
-
-            if (time_spent_today + travel_time) > MAX_TRAVEL_MINUTES_PER_DAY:
-                is_new_day = True
-                temp_day += 1
-                temp_time_today = travel_time
-
-                if budget:
-                    # Accommodation for previous night + food for new day
-                    cost_of_move += ACCOMMODATION_COST_PER_NIGHT + FOOD_COST_PER_DAY
-                    logger.debug(
-                        f"New day started, adding accommodation and food costs: {cost_of_move}"
-                    )
-            else:
-                temp_time_today += travel_time
-
-            # Check constraints
-            if days and temp_day > days:
-                logger.debug(f"Exceeds day limit: {temp_day} > {days}")
-                continue  # Exceeds day limit
-
-            if budget and remaining_budget < cost_of_move:
-                logger.debug(
-                    f"Exceeds budget limit: {remaining_budget} < {cost_of_move}"
-                )
-                continue  # Exceeds budget limit
-
-            # If all checks pass, commit this move
-            if is_new_day:
-                current_day = temp_day
-                time_spent_today = temp_time_today
+    matches = category_matcher(graph, destination_district, category)
+    prefer = category and category_mode == CATEGORY_PREFER
+    restrict = category and category_mode == CATEGORY_RESTRICT
+
+    # Frontier of possible next moves from any location in the current route to
+    # a destination in the target district. Entries are ordered by depth of the
+    # source node (descending), then rating of the destination node (descending),
+    # then Route primary key, which is the order the candidates were tried in
+    # when they were re-sorted on every step. When preferring a category,
+    # matching stops are ordered ahead of all others.
+    frontier = []
+
+    def expand(node, depth):
+        for route_edge in graph.out_edges(node):
+            target = edge_target[route_edge]
+            if districts[target] != destination_district or target in visited:
+                continue
+            if prefer or restrict:
+                match = matches(target)
+                if restrict and not match:
+                    continue
+                miss = 0 if match else 1
             else:
-                time_spent_today = temp_time_today
+                miss = 0
+            heapq.heappush(frontier, (miss, -depth, -ratings[target], route_edge))
+
+    expand(source_node, 0)
+    while frontier:
+        _, neg_depth, _, route_edge = heapq.heappop(frontier)
+        next_location = edge_target[route_edge]
+        if next_location in visited:
+            if trace is not None:
+                trace.record(graph, route_edge, REJECTED, "visited")
+            continue  # Reached through another route in the meantime
+
+        travel_time = graph.edge_time[route_edge]
+        travel_cost = graph.edge_cost[route_edge]
+
+        # Tentatively calculate next state
+        temp_day = current_day
+        temp_time_today = time_spent_today
+        cost_of_move = travel_cost
+        is_new_day = False
+
+        if (time_spent_today + travel_time) > MAX_TRAVEL_MINUTES_PER_DAY:
+            is_new_day = True
+            temp_day += 1
+            temp_time_today = travel_time
 
             if budget:
-                remaining_budget -= cost_of_move
-
-            logger.info(
-                f"Moving to {next_location.name}, current day: {current_day}, time spent today: {time_spent_today}, remaining budget: {remaining_budget}"
-            )
-            route.append(next_location)
-            visited.add(next_location.name)
-            # Update depth for the new location
-            depth_map[next_location.name] = depth_map[route_edge.source.name] + 1
-            best_move_found = True
-            break  # Found the best valid move, restart the search
-
-        if not best_move_found:
-            break  # No more valid locations to add, route is complete
-
-    # Filter the generated route based on the category, always including the source or destination.
-    final_route = [
-        location
-        for location in route
-        if (location.name == source_district or location.name == destination_district)
-        or (not category or category in location.category)
-    ]
-
-    return final_route
+                # Accommodation for previous night + food for new day
+                cost_of_move += ACCOMMODATION_COST_PER_NIGHT + FOOD_COST_PER_DAY
+        else:
+            temp_time_today += travel_time
+
+        # Check constraints. A move that fails them can be dropped for good: the
+        # remaining budget only shrinks, and the day counter only moves forward
+        # through a move that itself had room for another day, so the move could
+        # never become affordable again.
+        if days and temp_day > days:
+            if trace is not None:
+                trace.record(graph, route_edge, REJECTED, "day_limit", cost_of_move, temp_day, remaining_budget)
+            continue  # Exceeds day limit
+
+        if budget and remaining_budget < cost_of_move:
+            if trace is not None:
+                trace.record(graph, route_edge, REJECTED, "budget", cost_of_move, temp_day, remaining_budget)
+            continue  # Exceeds budget limit
+
+        # If all checks pass, commit this move
+        if is_new_day:
+            current_day = temp_day
+        time_spent_today = temp_time_today
+
+        if budget:
+            remaining_budget -= cost_of_move
+
+        if trace is not None:
+            trace.record(graph, route_edge, ACCEPTED, None, cost_of_move, current_day, remaining_budget)
+        route.append(next_location)
+        visited.add(next_location)
+        expand(next_location, 1 - neg_depth)
+
+    return route
@@ -0,0 +1,94 @@
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+GRAPH = "graph"
+RATING = "rating"
+CATALOG = "catalog"  # what /api/locations/ serves: locations and ratings
+
+VERSION_KEY_PREFIX = "api:version:"
+MODIFIED_KEY_PREFIX = "api:modified:"
+
+# Cache backends whose entries no other process can see
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+UNSHARED_VERSIONS_MESSAGE = (
+    "Versions are kept in a process-local default cache, so version bumps made outside the "
+    "web processes never reach them. Configure a shared default cache (e.g. Redis or Memcached)."
+)
+
+
+def _key(name):
+    return f"{VERSION_KEY_PREFIX}{name}"
+
+
+def _modified_key(name):
+    return f"{MODIFIED_KEY_PREFIX}{name}"
+
+
+def get_version(name):
+    """
+    Returns the current version number for a named piece of shared state.
+    Versions live in the default cache so every process sharing that cache
+    agrees on them.
+    """
+    key = _key(name)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock rather than 1 so that a counter which was evicted
+        # and re-created never repeats a value an older reader already saw.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(name):
+    """Async counterpart of get_version."""
+    key = _key(name)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def get_modified(name):
+    """
+    Returns the time (seconds since the epoch) a named piece of shared state
+    last changed, or when it was first asked about if it never has.
+    """
+    key = _modified_key(name)
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, time.time(), timeout=None)
+        modified = cache.get(key)
+    return modified
+
+
+def _incr(name):
+    key = _key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+    cache.set(_modified_key(name), time.time(), timeout=None)
+
+
+def bump_version(name):
+    """
+    Marks a named piece of shared state as changed.
+
+    The version is bumped straight away, so the writing connection sees its own
+    change, and again once the surrounding transaction commits, so readers that
+    rebuilt from the not yet committed data in between are invalidated too.
+    """
+    _incr(name)
+    transaction.on_commit(lambda: _incr(name))
+
+
+def versions_are_shared():
+    """Whether versions bumped by this process are seen by every other process."""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], PROCESS_LOCAL_CACHES)
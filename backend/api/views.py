@@ -1,17 +1,61 @@
-from datetime import datetime
+import hashlib
+import json
+import math
+from datetime import datetime, timezone
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.contrib.postgres.search import SearchRank
+from django.db import models, transaction
+from django.db.models.functions import Cast
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from rest_framework import generics
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .models import Location, Rating
-from .serializers import LocationSerializer, RatingSerializer, UserSerializer
-from .utils import find_route
+from .serializers import (
+    LocationSerializer,
+    RatingSerializer,
+    UserSerializer,
+    user_rating_map,
+    user_ratings_context,
+)
+from .utils import (
+    CATEGORY_FILTER,
+    CATEGORY_MODES,
+    GREEDY,
+    OPTIMAL,
+    PLANNER_MODES,
+    PlannerTrace,
+    plan_itineraries,
+)
+from .coalescing import queue_location_refresh
+from .distances import get_leg_matrices
+from .encoders import LOCATION_FIELDS, LocationEncoder, location_rows
+from .graph import get_snapshot
+from .instrumentation import TimedViewMixin, render_metrics, span
+from .offload import PlannerBusy, planner_pool
+from .pagination import RatingKeysetPagination, SearchPagination
+from .route_cache import (
+    acached_itineraries,
+    cached_itineraries,
+    normalize_route_query,
+)
+from .search import search_query
+from .versioning import CATALOG, get_modified, get_version
 
 
 class SignupView(generics.CreateAPIView):
@@ -41,67 +85,389 @@ class LogoutView(APIView):
         return Response(status=204)
 
 
-class RouteView(APIView):
+def parse_route_request(data):
+    """
+    Validates a /api/route/ payload and returns the matching find_route keyword
+    arguments. Raises ValueError with a client-facing message when the payload
+    is invalid.
+    """
+    source = data.get("source")
+    destination = data.get("destination")
+    budget = data.get("budget")
+    tier = data.get("tier")
+    start_date = data.get("start_date")
+    end_date = data.get("end_date")
+    category = data.get("category")
+    mode = data.get("mode") or GREEDY
+    deadline_ms = data.get("deadline_ms")
+    alternatives = data.get("alternatives")
+    category_mode = data.get("category_mode") or CATEGORY_FILTER
+
+    for name, value in (("source", source), ("destination", destination)):
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"{name} must be a non-empty string.")
+    if category is not None and not isinstance(category, str):
+        raise ValueError("category must be a string.")
+
+    # Calculate days from start_date and end_date
+    days = None
+    if start_date and end_date:
+        try:
+            d1 = datetime.strptime(start_date, "%Y-%m-%d")
+            d2 = datetime.strptime(end_date, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+        if d2 < d1:
+            raise ValueError("End date must be after start date.")
+        days = (d2 - d1).days + 1
+
+    # Apply tier divisor if both budget and tier are provided
+    if budget:
+        try:
+            budget = float(budget)
+            tier = float(tier) if tier else 1.0
+            # float() accepts "nan" and "inf", which would disable the budget
+            if not (math.isfinite(budget) and math.isfinite(tier)):
+                raise ValueError(budget)
+            budget = budget / tier
+        except (TypeError, ValueError, ZeroDivisionError):
+            raise ValueError("Budget and tier must be numbers.")
+    else:
+        budget = None
+
+    if mode not in PLANNER_MODES:
+        raise ValueError(f"mode must be one of: {', '.join(PLANNER_MODES)}.")
+    if category_mode not in CATEGORY_MODES:
+        raise ValueError(f"category_mode must be one of: {', '.join(CATEGORY_MODES)}.")
+    k = None
+    if alternatives:
+        try:
+            alternatives = int(alternatives)
+        except (TypeError, ValueError):
+            raise ValueError("alternatives must be a whole number.")
+        if alternatives < 0:
+            raise ValueError("alternatives must be a whole number.")
+        k = 1 + min(alternatives, settings.ROUTE_MAX_ALTERNATIVES)
+
+    deadline = None
+    if mode == OPTIMAL or k:
+        try:
+            deadline_ms = float(settings.ROUTE_OPTIMAL_DEADLINE_MS if deadline_ms is None else deadline_ms)
+            if not math.isfinite(deadline_ms):
+                raise ValueError(deadline_ms)
+        except (TypeError, ValueError):
+            raise ValueError("deadline_ms must be a number.")
+        deadline = min(max(deadline_ms, 0), settings.ROUTE_OPTIMAL_MAX_DEADLINE_MS) / 1000
+
+    return {
+        "source_district": source,
+        "destination_district": destination,
+        "budget": budget,
+        "days": days,
+        "category": category,
+        "mode": mode,
+        "deadline": deadline,
+        "k": k,
+        "category_mode": category_mode,
+    }
+
+
+def encode_itineraries(request, itineraries, rows, with_alternatives):
+    """
+    Response body for itineraries given as lists of Location ids, with ``rows``
+    the location_rows for all of them.
+    """
+    encoder = LocationEncoder(request, user_rating_map(request, rows.keys()))
+    encoded = {pk: encoder.encode(row) for pk, row in rows.items()}
+    route, *alternatives = [
+        [encoded[pk] for pk in location_ids if pk in encoded] for location_ids in itineraries
+    ]
+    data = {"route": route}
+    if with_alternatives:
+        data["alternatives"] = alternatives
+    return data
+
+
+class RouteView(TimedViewMixin, APIView):
+    """
+    Plans an itinerary. Staff can add ``?trace=1`` to get the greedy planner's
+    considered moves back under ``trace``; traced requests skip the route cache.
+    """
+
     permission_classes = [AllowAny]
 
     def post(self, request):
-        source = request.data.get("source")
-        destination = request.data.get("destination")
-        budget = request.data.get("budget")
-        tier = request.data.get("tier")
-        start_date = request.data.get("start_date")
-        end_date = request.data.get("end_date")
-        category = request.data.get("category")
-
-        # Calculate days from start_date and end_date
-        days = None
-        if start_date and end_date:
-            try:
-                d1 = datetime.strptime(start_date, "%Y-%m-%d")
-                d2 = datetime.strptime(end_date, "%Y-%m-%d")
-                if d2 < d1:
-                    return Response(
-                        {"error": "End date must be after start date."}, status=400
-                    )
-                days = (d2 - d1).days + 1
-            except ValueError:
-                return Response(
-                    {"error": "Invalid date format. Use YYYY-MM-DD."}, status=400
-                )
-
-        # Apply tier divisor if both budget and tier are provided
-        if budget:
+        try:
+            params = parse_route_request(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        query = normalize_route_query(**params)
+        trace = None
+        if request.query_params.get("trace") == "1" and request.user.is_staff:
+            trace = PlannerTrace()
+            graph = get_snapshot()
+            with span("plan"):
+                itineraries = [
+                    [graph.pks[node] for node in nodes]
+                    for nodes in plan_itineraries(graph, *query, trace=trace)
+                ]
+        else:
+            itineraries = cached_itineraries(query)
+        with span("load"):
+            rows = location_rows({pk for location_ids in itineraries for pk in location_ids})
+        with span("serialize"):
+            data = encode_itineraries(request, itineraries, rows, params["k"])
+        if trace is not None:
+            data["trace"] = trace.moves
+        return Response(data)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncRouteView(View):
+    """
+    Async variant of RouteView for ASGI deployments. Planning runs on the
+    bounded planner process pool and database access uses the async ORM, so a
+    slow plan does not hold up the event loop. Answers 503 when the pool is
+    saturated instead of queueing the request.
+    """
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON body."}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "Expected a route request object."}, status=400)
+        try:
+            params = parse_route_request(data)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        try:
+            itineraries = await acached_itineraries(normalize_route_query(**params), planner_pool)
+        except PlannerBusy:
+            response = JsonResponse({"error": "Route planner is busy, try again shortly."}, status=503)
+            response["Retry-After"] = "1"
+            return response
+
+        rows = {
+            row["id"]: row
+            async for row in Location.objects.filter(
+                pk__in={pk for location_ids in itineraries for pk in location_ids}
+            ).values(*LOCATION_FIELDS)
+        }
+        try:
+            data = await sync_to_async(self.encode)(request, params, itineraries, rows)
+        except AuthenticationFailed as e:
+            return JsonResponse({"detail": str(e.detail)}, status=401)
+        return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
+
+    def encode(self, request, params, itineraries, rows):
+        # Authenticate like the DRF views do, so user_rating matches RouteView
+        request = Request(
+            request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        )
+        return encode_itineraries(request, itineraries, rows, params["k"])
+
+
+class RouteBatchView(TimedViewMixin, APIView):
+    """
+    Plans a list of /api/route/ payloads in one call. Every plan runs against
+    the same graph snapshot, and each location is serialized once in
+    ``locations`` while the itineraries in ``results`` refer to it by id.
+    """
+
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        payloads = request.data
+        if not isinstance(payloads, list):
+            return Response({"error": "Expected a list of route requests."}, status=400)
+        if len(payloads) > settings.ROUTE_BATCH_MAX_ITEMS:
+            return Response(
+                {"error": f"At most {settings.ROUTE_BATCH_MAX_ITEMS} route requests per batch."},
+                status=400,
+            )
+
+        graph = get_snapshot()
+        results = []
+        location_ids = []
+        for payload in payloads:
+            if not isinstance(payload, dict):
+                results.append({"error": "Expected a route request object."})
+                continue
             try:
-                budget = float(budget)
-                if tier:
-                    budget = budget / float(tier)
-            except ValueError:
-                return Response(
-                    {"error": "Budget and tier must be numbers."}, status=400
-                )
+                params = parse_route_request(payload)
+            except ValueError as e:
+                results.append({"error": str(e)})
+                continue
+            route, *alternatives = cached_itineraries(normalize_route_query(**params), graph)
+            result = {"route": route}
+            if params["k"]:
+                result["alternatives"] = alternatives
+            results.append(result)
+            location_ids.extend(route)
+            for alternative in alternatives:
+                location_ids.extend(alternative)
+
+        location_ids = list(dict.fromkeys(location_ids))
+        with span("load"):
+            rows = location_rows(location_ids)
+        with span("serialize"):
+            encoder = LocationEncoder(request, user_rating_map(request, rows.keys()))
+            locations = encoder.encode_many(rows[pk] for pk in location_ids if pk in rows)
+            data = {"locations": locations, "results": results}
+        return Response(data)
+
+
+class LegView(APIView):
+    """
+    Fastest or cheapest way to get from one location to another over any
+    sequence of routes, looked up in the precomputed all-pairs matrices.
+    Answers 503 until ``manage.py precompute_legs`` has run for the current
+    routes.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        by = request.query_params.get("by", "time")
+        if by not in ("time", "cost"):
+            return Response({"error": "by must be 'time' or 'cost'."}, status=400)
+        graph = get_snapshot()
+        try:
+            source = graph.pks[graph.index[request.query_params.get("source")]]
+            destination = graph.pks[graph.index[request.query_params.get("destination")]]
+        except KeyError:
+            return Response({"error": "Location not found"}, status=404)
+
+        matrices = get_leg_matrices()
+        if matrices is None:
+            response = Response(
+                {"error": "Leg matrices for the current routes are not computed yet, try again later."},
+                status=503,
+            )
+            response["Retry-After"] = "60"
+            return response
+        if by == "time":
+            leg = matrices.fastest_leg(source, destination)
         else:
-            budget = None
+            leg = matrices.cheapest_leg(source, destination)
+        if leg is None:
+            return Response({"error": "No route between these locations"}, status=404)
+        return Response({"by": by, "travel_time": leg.travel_time, "travel_cost": leg.travel_cost})
+
+
+class MetricsView(APIView):
+    """Request and phase timing histograms in the Prometheus text format, for staff."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class UserRatingsMixin:
+    """
+    Serializes locations with the requesting user's ratings fetched in one
+    query for all of them, instead of one query per location.
+    """
+
+    def get_serializer(self, instance=None, *args, **kwargs):
+        if instance is not None:
+            # Evaluates a queryset here; the serializer then reuses its cache
+            locations = list(instance) if kwargs.get("many") else [instance]
+            kwargs["context"] = {
+                **self.get_serializer_context(),
+                **user_ratings_context(self.request, locations),
+            }
+        return super().get_serializer(instance, *args, **kwargs)
 
-        route_locations = find_route(source, destination, budget, days, category)
-        serializer = LocationSerializer(
-            route_locations, many=True, context={"request": request}
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    Strong ETag for a location catalog response. It changes with the catalog
+    version and differs per URL and per credentials, since the body carries
+    the requesting user's own ratings.
+    """
+    key = "\n".join(
+        (
+            str(get_version(CATALOG)),
+            request.build_absolute_uri(),
+            request.META.get("HTTP_AUTHORIZATION", ""),
         )
-        return Response({"route": serializer.data})
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(get_modified(CATALOG), tz=timezone.utc)
+
+
+# Answers conditional GETs with 304 before any location is queried
+catalog_conditional = [
+    vary_on_headers("Authorization"),
+    condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified),
+]
 
 
+@method_decorator(catalog_conditional, name="get")
 class LocationListByCategoryView(generics.ListAPIView):
     serializer_class = LocationSerializer
     permission_classes = [AllowAny]
+    pagination_class = RatingKeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        # Read-only hot path: encode .values() rows instead of model instances
+        rows = self.filter_queryset(self.get_queryset()).values(*LOCATION_FIELDS)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            rows = page
+        rows = list(rows)
+        encoder = LocationEncoder(request, user_rating_map(request, [row["id"] for row in rows]))
+        data = encoder.encode_many(rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
     def get_queryset(self):
         category = self.request.query_params.get("category")
         qs = Location.objects.exclude(name=models.F("district"))
         if category:
             qs = qs.filter(category__contains=[category])
-        return qs.order_by("-rating")
+        return qs.order_by("-rating", "-id")
+
+
+@method_decorator(catalog_conditional, name="get")
+class LocationSearchView(generics.ListAPIView):
+    """
+    Full-text search over location names, districts, categories and
+    descriptions (``?q=``), best matches first, in limit/offset pages.
+    """
 
+    serializer_class = LocationSerializer
+    permission_classes = [AllowAny]
+    pagination_class = SearchPagination
 
-class LocationDetailView(generics.RetrieveAPIView):
+    def list(self, request, *args, **kwargs):
+        query = search_query(request.query_params.get("q", ""))
+        if query is None:
+            raise ValidationError({"q": ["Enter at least one word to search for."]})
+        rows = (
+            Location.objects.exclude(name=models.F("district"))
+            .filter(search_vector=query)
+            .annotate(rank=SearchRank(models.F("search_vector"), query, normalization=1))
+            .order_by("-rank", "-id")
+            .values(*LOCATION_FIELDS)
+        )
+        rows = self.paginate_queryset(rows)
+        encoder = LocationEncoder(request, user_rating_map(request, [row["id"] for row in rows]))
+        return self.get_paginated_response(encoder.encode_many(rows))
+
+
+@method_decorator(catalog_conditional, name="get")
+class LocationDetailView(UserRatingsMixin, generics.RetrieveAPIView):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
     permission_classes = [AllowAny]
@@ -123,12 +489,25 @@ class RatingView(generics.GenericAPIView):
             location = Location.objects.get(pk=location_id)
         except Location.DoesNotExist:
             return Response({"error": "Location not found"}, status=404)
-        rating, created = Rating.objects.update_or_create(
-            user=request.user,
-            location=location,
-            defaults={"value": value},
-        )
-        self._update_location_rating(location)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return Response({"error": "value must be a whole number"}, status=400)
+        with transaction.atomic():
+            # Lock the user's existing rating so the delta below is exact
+            rating, created = Rating.objects.select_for_update().get_or_create(
+                user=request.user,
+                location=location,
+                defaults={"value": value},
+            )
+            if created:
+                self._update_location_rating(location, value, 1)
+            else:
+                previous = rating.value
+                rating.value = value
+                rating.save(update_fields=["value", "updated_at"])
+                if value != previous:
+                    self._update_location_rating(location, value - previous, 0)
         return Response(RatingSerializer(rating).data)
 
     def delete(self, request, *args, **kwargs):
@@ -143,15 +522,35 @@ class RatingView(generics.GenericAPIView):
         except Location.DoesNotExist:
             return Response({"error": "Location not found"}, status=404)
         try:
-            rating = Rating.objects.get(user=request.user, location=location)
-            rating.delete()
-            self._update_location_rating(location)
+            with transaction.atomic():
+                rating = Rating.objects.select_for_update().get(user=request.user, location=location)
+                rating.delete()
+                self._update_location_rating(location, -rating.value, -1)
             return Response({"success": True})
         except Rating.DoesNotExist:
             return Response({"error": "Rating not found"}, status=404)
 
-    def _update_location_rating(self, location):
-        ratings = location.ratings.all()
-        avg = ratings.aggregate(models.Avg("value"))["value__avg"] or 0
-        location.rating = avg
-        location.save()
+    def _update_location_rating(self, location, sum_delta, count_delta):
+        if settings.RATING_WRITE_COALESCING:
+            queue_location_refresh(location.pk)
+        else:
+            self._apply_rating_delta(location, sum_delta, count_delta)
+
+    def _apply_rating_delta(self, location, sum_delta, count_delta):
+        """
+        Applies a change in the location's ratings to its running totals and
+        average in one UPDATE of just those columns. The new values are computed
+        by the database from the current row, so concurrent raters do not
+        overwrite each other's changes.
+        """
+        count = models.F("rating_count") + count_delta
+        location.rating_sum = models.F("rating_sum") + sum_delta
+        location.rating_count = count
+        location.rating = models.Case(
+            models.When(
+                rating_count__gt=-count_delta,
+                then=Cast(models.F("rating_sum") + sum_delta, models.FloatField()) / count,
+            ),
+            default=models.Value(0.0),
+        )
+        location.save(update_fields=["rating_sum", "rating_count", "rating"])
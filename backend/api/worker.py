@@ -0,0 +1,45 @@
+# Entry points for route planning worker processes.
+#
+# Workers may be started with the "spawn" method, so this module must be
+# importable before Django is set up: nothing from the api app is imported at
+# module level, and graph snapshots arrive pickled and are only loaded once
+# the worker has called django.setup().
+import os
+import pickle
+
+_graph = None
+
+
+def init_worker(snapshot_bytes=None):
+    global _graph
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    import django
+
+    django.setup()
+    if snapshot_bytes is not None:
+        _graph = pickle.loads(snapshot_bytes)
+
+
+def plan_in_worker(query):
+    """
+    Plans a normalized route query against the worker's snapshot and returns
+    the itineraries as lists of Location ids.
+    """
+    from api.utils import plan_itineraries
+
+    return [[_graph.pks[node] for node in nodes] for nodes in plan_itineraries(_graph, *query)]
+
+
+def plan_versioned(version, query, snapshot_bytes=None):
+    """
+    plan_in_worker for long-lived workers that follow graph changes. Returns
+    None, without planning, when the worker's snapshot is not of ``version``
+    and no pickled snapshot came along; the caller then resends the job with
+    one, which the worker keeps for later jobs.
+    """
+    global _graph
+    if snapshot_bytes is not None:
+        _graph = pickle.loads(snapshot_bytes)
+    if _graph is None or _graph.version != version:
+        return None
+    return plan_in_worker(query)
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.instrumentation.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,6 +90,102 @@ DATABASES = {
     }
 }
 
+# =========================
+# Caches
+# =========================
+# Both caches are per-process by default. Point them at a shared backend
+# (e.g. Redis or Memcached) when running several workers so that graph/rating
+# versions and cached routes are shared between them. The default cache must
+# be shared for RATING_WRITE_COALESCING and the rating management commands,
+# whose version bumps happen outside the web processes.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DEFAULT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DEFAULT_CACHE_LOCATION', 'default'),
+    },
+    'routes': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'routes',
+        'TIMEOUT': int(os.environ.get('ROUTE_CACHE_TIMEOUT', '3600')),  # seconds
+        'OPTIONS': {
+            # Least recently used entries are culled once this is reached
+            'MAX_ENTRIES': int(os.environ.get('ROUTE_CACHE_MAX_ENTRIES', '10000')),
+        },
+    },
+}
+
+ROUTE_CACHE_ALIAS = 'routes'
+
+# Optimal planner mode: beam width, and default/maximum wall-clock deadline
+ROUTE_OPTIMAL_BEAM_WIDTH = int(os.environ.get('ROUTE_OPTIMAL_BEAM_WIDTH', '256'))
+ROUTE_OPTIMAL_DEADLINE_MS = int(os.environ.get('ROUTE_OPTIMAL_DEADLINE_MS', '200'))
+ROUTE_OPTIMAL_MAX_DEADLINE_MS = int(os.environ.get('ROUTE_OPTIMAL_MAX_DEADLINE_MS', '2000'))
+
+# Most alternative itineraries /api/route/ returns next to the main one
+ROUTE_MAX_ALTERNATIVES = int(os.environ.get('ROUTE_MAX_ALTERNATIVES', '5'))
+
+# Page size of /api/locations/ when a client asks for pages (?limit=/?cursor=)
+LOCATION_PAGE_SIZE = int(os.environ.get('LOCATION_PAGE_SIZE', '50'))
+LOCATION_MAX_PAGE_SIZE = int(os.environ.get('LOCATION_MAX_PAGE_SIZE', '200'))
+
+# Page size of /api/travel-partner/requests/ when a client asks for pages, and
+# how many of the newest comments each entry of such a page carries
+TRAVEL_PARTNER_PAGE_SIZE = int(os.environ.get('TRAVEL_PARTNER_PAGE_SIZE', '20'))
+TRAVEL_PARTNER_MAX_PAGE_SIZE = int(os.environ.get('TRAVEL_PARTNER_MAX_PAGE_SIZE', '100'))
+TRAVEL_PARTNER_LATEST_COMMENTS = int(os.environ.get('TRAVEL_PARTNER_LATEST_COMMENTS', '3'))
+# Default number of ranked partners /api/travel-partner/requests/<id>/matches/ returns
+TRAVEL_PARTNER_MATCHES = int(os.environ.get('TRAVEL_PARTNER_MATCHES', '20'))
+# Change feed (/api/travel-partner/requests/sync/): each cursor trails the poll
+# by SYNC_OVERLAP seconds so late commits are not missed (comment stream
+# replays reach back as far for the same reason), and deletes are kept
+# for TOMBSTONE_DAYS, after which older cursors get 410 and must reload. A poll
+# returns at most SYNC_LIMIT changes of each kind and continues with a cursor
+TRAVEL_PARTNER_SYNC_OVERLAP = float(os.environ.get('TRAVEL_PARTNER_SYNC_OVERLAP', '5'))
+TRAVEL_PARTNER_SYNC_LIMIT = int(os.environ.get('TRAVEL_PARTNER_SYNC_LIMIT', '500'))
+TRAVEL_PARTNER_TOMBSTONE_DAYS = int(os.environ.get('TRAVEL_PARTNER_TOMBSTONE_DAYS', '30'))
+# Comment streams (/api/travel-partner/requests/<id>/stream/, ASGI only). The
+# "local" backend fans comments out inside one process; with several server
+# processes use "postgres", which relays them through LISTEN/NOTIFY.
+TRAVEL_PARTNER_STREAM_BACKEND = os.environ.get('TRAVEL_PARTNER_STREAM_BACKEND', 'local')
+TRAVEL_PARTNER_STREAM_HEARTBEAT = float(os.environ.get('TRAVEL_PARTNER_STREAM_HEARTBEAT', '15'))  # seconds
+TRAVEL_PARTNER_STREAM_MAX_AGE = float(os.environ.get('TRAVEL_PARTNER_STREAM_MAX_AGE', '300'))  # seconds
+# Lifetime of the ?token= stream tokens EventSource clients connect with; a
+# client whose reconnect is refused fetches a new one
+TRAVEL_PARTNER_STREAM_TOKEN_MAX_AGE = int(os.environ.get('TRAVEL_PARTNER_STREAM_TOKEN_MAX_AGE', '3600'))  # seconds
+# Events buffered per stream before a slow client is cut off to resume later
+TRAVEL_PARTNER_STREAM_QUEUE_SIZE = int(os.environ.get('TRAVEL_PARTNER_STREAM_QUEUE_SIZE', '100'))
+
+# Page size of the full-text search endpoints (?limit=/?offset=)
+SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', '20'))
+SEARCH_MAX_PAGE_SIZE = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', '100'))
+
+# Coalesced rating writes: when on, RatingView only queues a location for a
+# refresh and `manage.py flush_ratings` recomputes queued averages in batches,
+# so an average lags its ratings by at most about RATING_FLUSH_INTERVAL seconds
+RATING_WRITE_COALESCING = os.environ.get('RATING_WRITE_COALESCING', 'False') == 'True'
+RATING_FLUSH_INTERVAL = float(os.environ.get('RATING_FLUSH_INTERVAL', '5'))
+RATING_FLUSH_BATCH_SIZE = int(os.environ.get('RATING_FLUSH_BATCH_SIZE', '1000'))
+
+# Upper bound on the number of plans accepted by /api/route/batch/
+ROUTE_BATCH_MAX_ITEMS = int(os.environ.get('ROUTE_BATCH_MAX_ITEMS', '100'))
+
+# Process pool behind /api/route/async/. Requests beyond MAX_PENDING queued or
+# running plans are answered with 503 rather than waiting for a worker.
+ROUTE_PLANNER_WORKERS = int(os.environ.get('ROUTE_PLANNER_WORKERS', str(os.cpu_count() or 1)))
+ROUTE_PLANNER_MAX_PENDING = int(
+    os.environ.get('ROUTE_PLANNER_MAX_PENDING', str(4 * (os.cpu_count() or 1)))
+)
+ROUTE_PLANNER_START_METHOD = os.environ.get('ROUTE_PLANNER_START_METHOD', 'spawn')
+
+# Budget and trip length buckets materialized by `manage.py precompute_routes`
+# (each list also gets a "no limit" bucket)
+ROUTE_PRECOMPUTE_BUDGETS = [
+    int(b) for b in os.environ.get('ROUTE_PRECOMPUTE_BUDGETS', '5000,10000,15000,20000,30000,50000').split(',') if b
+]
+ROUTE_PRECOMPUTE_DAYS = [
+    int(d) for d in os.environ.get('ROUTE_PRECOMPUTE_DAYS', '1,2,3,4,5,7').split(',') if d
+]
+
 # =========================
 # REST Framework
 # =========================
@@ -109,6 +206,9 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Precomputed planner data (e.g. all-pairs leg matrices), keyed by graph content
+ROUTE_ARTIFACT_DIR = os.environ.get('ROUTE_ARTIFACT_DIR', os.path.join(BASE_DIR, 'artifacts'))
+
 # =========================
 # Internationalization
 # =========================
@@ -0,0 +1,12 @@
+"""Helpers shared by the test suites of several apps."""
+import math
+
+
+def summarize(samples):
+    """p50/p95/max of a list of millisecond timings."""
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {"p50_ms": percentile(50), "p95_ms": percentile(95), "max_ms": ordered[-1]}
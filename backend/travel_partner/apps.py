@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TravelPartnerConfig(AppConfig):
     name = "travel_partner"
+
+    def ready(self):
+        from . import signals  # noqa: F401
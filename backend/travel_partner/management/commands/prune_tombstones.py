@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from travel_partner.models import TravelPartnerTombstone
+from travel_partner.sync import tombstone_horizon
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes travel partner tombstones older than TRAVEL_PARTNER_TOMBSTONE_DAYS. Sync cursors "
+        "from before that are answered with 410 anyway."
+    )
+
+    def handle(self, *args, **options):
+        deleted, _ = TravelPartnerTombstone.objects.filter(deleted_at__lt=tombstone_horizon()).delete()
+        self.stdout.write(f"Pruned {deleted} tombstones")
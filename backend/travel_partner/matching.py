@@ -0,0 +1,276 @@
+import heapq
+import threading
+from array import array
+from datetime import timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.versioning import get_version
+
+from .models import TravelPartnerRequest, TravelPartnerTombstone
+
+# Version name bumped by every TravelPartnerRequest write
+REQUESTS = "travel_partner:requests"
+
+# Weights of the match score components, each of which is between 0 and 1
+OVERLAP_WEIGHT = 4.0
+BUDGET_WEIGHT = 2.0
+MEMBER_WEIGHT = 1.0
+SOURCE_WEIGHT = 1.0
+
+
+class IntervalTree:
+    """
+    Static interval tree over closed integer intervals.
+
+    Intervals are sorted by start and the tree is implicit: the root of the
+    slice ``[lo, hi)`` is its middle element, and ``max_end`` holds the largest
+    end in each subtree. A query only descends into subtrees that can contain
+    an overlapping interval, so it touches O(log n) nodes per reported
+    interval at worst and never scans the whole set.
+    """
+
+    def __init__(self, intervals):
+        intervals = sorted(intervals)
+        self.starts = array("l", (start for start, _, _ in intervals))
+        self.ends = array("l", (end for _, end, _ in intervals))
+        self.items = [item for _, _, item in intervals]
+        self.max_end = array("l", self.ends)
+        if self.items:
+            self._augment(0, len(self.items))
+
+    def _augment(self, lo, hi):
+        mid = (lo + hi) // 2
+        best = self.ends[mid]
+        if lo < mid:
+            best = max(best, self._augment(lo, mid))
+        if mid + 1 < hi:
+            best = max(best, self._augment(mid + 1, hi))
+        self.max_end[mid] = best
+        return best
+
+    def overlapping(self, start, end):
+        """Yields the items whose interval shares at least one point with [start, end]."""
+        starts, ends, max_end, items = self.starts, self.ends, self.max_end, self.items
+        stack = [(0, len(items))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if max_end[mid] < start:
+                continue
+            stack.append((lo, mid))
+            if starts[mid] <= end:
+                if ends[mid] >= start:
+                    yield items[mid]
+                stack.append((mid + 1, hi))
+
+    def __len__(self):
+        return len(self.items)
+
+
+def place_key(name):
+    return name.strip().casefold()
+
+
+class MatchIndex:
+    """
+    Index of open travel partner requests for partner matching.
+
+    Requests are numbered in the order they are added and their attributes
+    live in parallel lists and arrays. Dates are stored as proleptic ordinals,
+    and each destination gets its own interval tree over the trip dates, so a
+    lookup only looks at trips to the same place that overlap in time.
+
+    Changes are applied in place by ``update`` and ``remove``: a request's old
+    row is flagged as removed and its new row joins a short list of recent
+    rows of its destination, which lookups scan. Once a destination has
+    collected enough of either, only its tree is rebuilt. A destination's
+    tree and recent rows are replaced together, so lookups can run while
+    changes are applied.
+    """
+
+    # Recent plus removed rows a destination may collect before its tree is rebuilt
+    MIN_REBUILD = 64
+    REBUILD_FRACTION = 0.125
+
+    def __init__(self, version, today, requests, synced_at=None):
+        self.version = version
+        self.today = today
+        # When the requests were read, see refresh_match_index
+        self.synced_at = synced_at
+
+        self.pks = array("q")
+        self.users = array("q")
+        self.sources = []
+        self.destinations = []
+        self.starts = array("l")
+        self.ends = array("l")
+        self.budgets = []
+        self.members = array("l")
+        self.removed = bytearray()
+        self.rows = {}  # pk -> current row
+        self._stale = {}  # destination -> removed rows still in its tree
+        by_destination = {}
+        for request in requests:
+            row = self._append(*request)
+            by_destination.setdefault(self.destinations[row], []).append((self.starts[row], self.ends[row], row))
+        # destination -> (interval tree, rows added since it was built)
+        self.trees = {destination: (IntervalTree(trips), []) for destination, trips in by_destination.items()}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _append(self, pk, user_id, source, destination, start_date, end_date, budget, member):
+        row = len(self.sources)
+        self.pks.append(pk)
+        self.users.append(user_id)
+        self.sources.append(place_key(source))
+        self.destinations.append(place_key(destination))
+        self.starts.append(start_date.toordinal())
+        self.ends.append(end_date.toordinal())
+        self.budgets.append(None if budget is None else float(budget))
+        self.members.append(member)
+        self.removed.append(0)
+        self.rows[pk] = row
+        return row
+
+    def update(self, pk, user_id, source, destination, start_date, end_date, budget, member):
+        """Adds a request or replaces its entry; requests without a trip ahead are removed."""
+        self.remove(pk)
+        if start_date is None or end_date is None or end_date < self.today:
+            return
+        row = self._append(pk, user_id, source, destination, start_date, end_date, budget, member)
+        destination = self.destinations[row]
+        if destination not in self.trees:
+            self.trees[destination] = (IntervalTree([]), [row])
+            return
+        self.trees[destination][1].append(row)
+        self._maybe_rebuild(destination)
+
+    def remove(self, pk):
+        row = self.rows.pop(pk, None)
+        if row is None:
+            return
+        self.removed[row] = 1
+        destination = self.destinations[row]
+        self._stale[destination] = self._stale.get(destination, 0) + 1
+        self._maybe_rebuild(destination)
+
+    def _maybe_rebuild(self, destination):
+        tree, recent = self.trees[destination]
+        if len(recent) + self._stale.get(destination, 0) < max(self.MIN_REBUILD, len(tree) * self.REBUILD_FRACTION):
+            return
+        # Trips that have ended since the index was built are dropped too
+        today = self.today.toordinal()
+        trips = [
+            (self.starts[row], self.ends[row], row)
+            for row in chain(tree.items, recent)
+            if not self.removed[row] and self.ends[row] >= today
+        ]
+        self.trees[destination] = (IntervalTree(trips), [])
+        self._stale.pop(destination, None)
+
+    def matches(self, request, limit):
+        """
+        The best ``limit`` matches for a request as ``(score, pk)`` pairs,
+        best first. The request's own entry and other requests of its user
+        never match, and neither does anything once its trip is over.
+        """
+        entry = self.trees.get(place_key(request.destination))
+        if entry is None or request.start_date is None or request.end_date is None:
+            return []
+        start = max(request.start_date.toordinal(), self.today.toordinal())
+        end = request.end_date.toordinal()
+        if start > end:
+            return []
+
+        tree, recent = entry
+        starts, ends = self.starts, self.ends
+        rows = chain(tree.overlapping(start, end), (row for row in recent if starts[row] <= end and ends[row] >= start))
+        span = end - start + 1
+        source = place_key(request.source)
+        budget = None if request.budget is None else float(request.budget)
+        scored = []
+        for row in rows:
+            if self.removed[row] or self.users[row] == request.user_id:
+                continue
+            overlap = (min(end, ends[row]) - max(start, starts[row]) + 1) / span
+            score = OVERLAP_WEIGHT * overlap
+            score += BUDGET_WEIGHT * budget_proximity(budget, self.budgets[row])
+            score += MEMBER_WEIGHT / (1 + abs(request.member - self.members[row]))
+            if self.sources[row] == source:
+                score += SOURCE_WEIGHT
+            scored.append((score, -self.pks[row]))
+        return [(score, -neg_pk) for score, neg_pk in heapq.nlargest(limit, scored)]
+
+
+def budget_proximity(budget, other):
+    """1 for equal budgets, falling towards 0 as they drift apart; 0.5 when either is unknown."""
+    if budget is None or other is None:
+        return 0.5
+    high = max(budget, other)
+    if high <= 0:
+        return 1.0
+    return 1 - abs(budget - other) / high
+
+
+MATCH_FIELDS = ("id", "user_id", "source", "destination", "start_date", "end_date", "budget", "member")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_match_index():
+    """
+    Returns this process's match index, first applying the requests written
+    since it was last brought up to date. The index is only built in full
+    once a day, when trips have ended.
+    """
+    global _index
+    version = get_version(REQUESTS)
+    today = timezone.localdate()
+    index = _index
+    if index is None or index.version != version or index.today != today:
+        with _index_lock:
+            if _index is None or _index.today != today:
+                _index = build_match_index(version, today)
+            elif _index.version != version:
+                refresh_match_index(_index, version)
+            index = _index
+    return index
+
+
+def build_match_index(version, today):
+    synced_at = timezone.now()
+    requests = (
+        TravelPartnerRequest.objects.filter(start_date__isnull=False, end_date__gte=today)
+        .order_by("id")
+        .values_list(*MATCH_FIELDS)
+    )
+    return MatchIndex(version, today, requests.iterator(chunk_size=10000), synced_at)
+
+
+def refresh_match_index(index, version):
+    """
+    Applies the requests saved or deleted since the index was last synced, read
+    through the change feed's ``updated_at`` and tombstone indexes.
+
+    Like the sync feed, this looks back TRAVEL_PARTNER_SYNC_OVERLAP seconds
+    further than needed, to catch requests saved by transactions that had not
+    committed yet at the last sync. A transaction that commits later than that
+    is only picked up by the next day's full build.
+    """
+    synced_at = timezone.now()
+    since = index.synced_at - timedelta(seconds=settings.TRAVEL_PARTNER_SYNC_OVERLAP)
+    changed = TravelPartnerRequest.objects.filter(updated_at__gte=since).order_by("updated_at", "id")
+    for request in changed.values_list(*MATCH_FIELDS):
+        index.update(*request)
+    deleted = TravelPartnerTombstone.objects.filter(kind=TravelPartnerTombstone.REQUEST, deleted_at__gte=since)
+    for pk in deleted.values_list("object_id", flat=True):
+        index.remove(pk)
+    index.version = version
+    index.synced_at = synced_at
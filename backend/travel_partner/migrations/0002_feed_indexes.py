@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_partner', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='travelpartnercomment',
+            index=models.Index(fields=['request', '-created_at', '-id'], name='tp_comment_request_created'),
+        ),
+        migrations.AddIndex(
+            model_name='travelpartnerrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='tp_request_created_id_desc'),
+        ),
+        migrations.AddIndex(
+            model_name='travelpartnerrequest',
+            index=models.Index(fields=['source', 'destination', '-created_at'], name='tp_request_route_created'),
+        ),
+        migrations.AddIndex(
+            model_name='travelpartnerrequest',
+            index=models.Index(fields=['destination', 'start_date', 'end_date'], name='tp_request_dest_dates'),
+        ),
+        migrations.AddIndex(
+            model_name='travelpartnerrequest',
+            index=models.Index(fields=['budget', '-created_at'], name='tp_request_budget_created'),
+        ),
+    ]
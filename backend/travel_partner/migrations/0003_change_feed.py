@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_partner', '0002_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelPartnerTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('request', 'Request'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='travelpartnercomment',
+            index=models.Index(fields=['updated_at', 'id'], name='tp_comment_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='travelpartnerrequest',
+            index=models.Index(fields=['updated_at', 'id'], name='tp_request_updated'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 class TravelPartnerRequest(models.Model):
@@ -15,9 +17,22 @@ class TravelPartnerRequest(models.Model):
     details = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Route, category and details text, kept up to date by a post_save signal
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Feed order and keyset pagination
+            models.Index(fields=["-created_at", "-id"], name="tp_request_created_id_desc"),
+            # Feed filters: exact route, destination plus date window, budget range
+            models.Index(fields=["source", "destination", "-created_at"], name="tp_request_route_created"),
+            models.Index(fields=["destination", "start_date", "end_date"], name="tp_request_dest_dates"),
+            models.Index(fields=["budget", "-created_at"], name="tp_request_budget_created"),
+            # Change feed (?since=)
+            models.Index(fields=["updated_at", "id"], name="tp_request_updated"),
+            GinIndex(fields=["search_vector"], name="tp_request_search_gin"),
+        ]
 
     def __str__(self):
         return f"{self.user.username}: {self.source} → {self.destination} ({self.start_date} - {self.end_date})"
@@ -32,6 +47,26 @@ class TravelPartnerComment(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # Comment counts and the latest comments of each feed entry
+            models.Index(fields=["request", "-created_at", "-id"], name="tp_comment_request_created"),
+            models.Index(fields=["updated_at", "id"], name="tp_comment_updated"),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.request}"
+
+
+class TravelPartnerTombstone(models.Model):
+    """Marks a deleted request or comment for clients syncing changes with ``?since=``."""
+
+    REQUEST = "request"
+    COMMENT = "comment"
+    KIND_CHOICES = [(REQUEST, "Request"), (COMMENT, "Comment")]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Deleted {self.kind} {self.object_id}"
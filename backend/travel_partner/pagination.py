@@ -0,0 +1,20 @@
+from django.utils.dateparse import parse_datetime
+
+from api.pagination import KeysetPagination
+
+
+class FeedKeysetPagination(KeysetPagination):
+    """Keyset pages of travel partner requests, newest first."""
+
+    ordering_field = "created_at"
+    page_size_setting = "TRAVEL_PARTNER_PAGE_SIZE"
+    max_page_size_setting = "TRAVEL_PARTNER_MAX_PAGE_SIZE"
+
+    def encode_value(self, value):
+        return value.isoformat()
+
+    def decode_value(self, value):
+        created_at = parse_datetime(value)
+        if created_at is None:
+            raise ValueError(value)
+        return created_at
@@ -0,0 +1,9 @@
+from api.search import search_document
+
+
+def request_document(travel_request):
+    return search_document(
+        (f"{travel_request.source} {travel_request.destination}", "A"),
+        (f"{travel_request.category} {travel_request.tier}", "B"),
+        (travel_request.details, "C"),
+    )
@@ -34,3 +34,60 @@ class TravelPartnerRequestSerializer(serializers.ModelSerializer):
             "comments",
         ]
         read_only_fields = ["id", "user", "created_at", "updated_at", "comments"]
+
+
+class TravelPartnerFeedSerializer(TravelPartnerRequestSerializer):
+    """
+    Feed entry: the comment count and the latest few comments instead of the
+    whole thread, which is served by the request's ``comments`` action.
+    Expects ``comment_count`` to be annotated and ``latest_comments`` to be
+    prefetched, newest first.
+    """
+
+    comment_count = serializers.IntegerField(read_only=True)
+    latest_comments = TravelPartnerCommentSerializer(many=True, read_only=True)
+
+    class Meta(TravelPartnerRequestSerializer.Meta):
+        fields = [
+            *(f for f in TravelPartnerRequestSerializer.Meta.fields if f != "comments"),
+            "comment_count",
+            "latest_comments",
+        ]
+        read_only_fields = ["id", "user", "created_at", "updated_at", "comment_count", "latest_comments"]
+
+
+class TravelPartnerSyncRequestSerializer(TravelPartnerRequestSerializer):
+    """Changed request in the ``sync`` feed; comments come separately."""
+
+    class Meta(TravelPartnerRequestSerializer.Meta):
+        fields = [f for f in TravelPartnerRequestSerializer.Meta.fields if f != "comments"]
+        read_only_fields = ["id", "user", "created_at", "updated_at"]
+
+
+class TravelPartnerSyncCommentSerializer(TravelPartnerCommentSerializer):
+    """Changed comment in the ``sync`` feed, with the request it belongs to."""
+
+    class Meta(TravelPartnerCommentSerializer.Meta):
+        fields = ["id", "request", *TravelPartnerCommentSerializer.Meta.fields[1:]]
+        read_only_fields = ["id", "request", "user", "created_at", "updated_at"]
+
+
+class TravelPartnerFilterSerializer(serializers.Serializer):
+    """
+    Query parameters of the request list. A trip matches the date window when
+    it overlaps it, and the budget bounds are inclusive.
+    """
+
+    source = serializers.CharField(required=False)
+    destination = serializers.CharField(required=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    min_budget = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_budget = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    def validate(self, data):
+        if "start_date" in data and "end_date" in data and data["start_date"] > data["end_date"]:
+            raise serializers.ValidationError("start_date must not be after end_date")
+        if "min_budget" in data and "max_budget" in data and data["min_budget"] > data["max_budget"]:
+            raise serializers.ValidationError("min_budget must not be above max_budget")
+        return data
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.versioning import bump_version
+
+from .matching import REQUESTS
+from .stream import publish_comment
+from .models import TravelPartnerComment, TravelPartnerRequest, TravelPartnerTombstone
+from .search import request_document
+
+
+@receiver(post_save, sender=TravelPartnerRequest)
+@receiver(post_delete, sender=TravelPartnerRequest)
+def invalidate_match_index(sender, **kwargs):
+    bump_version(REQUESTS)
+
+
+# Request fields that make up its search document
+SEARCHED_REQUEST_FIELDS = {"source", "destination", "category", "tier", "details"}
+
+
+@receiver(post_save, sender=TravelPartnerRequest)
+def index_request(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCHED_REQUEST_FIELDS.intersection(update_fields):
+        return
+    # A queryset update, so updated_at and the sync feed are left alone
+    TravelPartnerRequest.objects.filter(pk=instance.pk).update(search_vector=request_document(instance))
+
+
+@receiver(post_delete, sender=TravelPartnerRequest)
+def record_request_tombstone(sender, instance, **kwargs):
+    TravelPartnerTombstone.objects.create(kind=TravelPartnerTombstone.REQUEST, object_id=instance.pk)
+
+
+@receiver(post_delete, sender=TravelPartnerComment)
+def record_comment_tombstone(sender, instance, **kwargs):
+    TravelPartnerTombstone.objects.create(kind=TravelPartnerTombstone.COMMENT, object_id=instance.pk)
+
+
+@receiver(post_save, sender=TravelPartnerComment)
+def stream_new_comment(sender, instance, created, **kwargs):
+    if created:
+        publish_comment(instance)
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection, connections, transaction
+
+from .models import TravelPartnerComment
+from .serializers import TravelPartnerSyncCommentSerializer
+
+logger = logging.getLogger(__name__)
+
+LOCAL = "local"
+POSTGRES = "postgres"
+NOTIFY_CHANNEL = "travel_partner_comments"
+
+
+STREAM_TOKEN_SALT = "travel_partner.stream"
+
+
+def make_stream_token(user, request_id):
+    """
+    Signed token that lets ``user`` open the comment stream of one request
+    from the query string, since EventSource cannot send an Authorization
+    header. Valid for TRAVEL_PARTNER_STREAM_TOKEN_MAX_AGE seconds.
+    """
+    return signing.dumps({"user": user.pk, "request": request_id}, salt=STREAM_TOKEN_SALT, compress=True)
+
+
+def stream_token_user_id(token, request_id):
+    """The user id a stream token was issued to, or None if it is invalid, expired or for another request."""
+    try:
+        data = signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=settings.TRAVEL_PARTNER_STREAM_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if not isinstance(data, dict) or data.get("request") != request_id:
+        return None
+    return data.get("user")
+
+
+def comment_event(comment):
+    """A comment as a Server-Sent Events message, its id doubling as the event id."""
+    data = json.dumps(TravelPartnerSyncCommentSerializer(comment).data, ensure_ascii=False)
+    return f"id: {comment.pk}\nevent: comment\ndata: {data}\n\n"
+
+
+class Subscription:
+    """One stream's inbox. Lives on the event loop of the stream that opened it."""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        # Set when an event did not fit; the stream then ends once it has
+        # drained the queue and the client resumes from its Last-Event-ID
+        self.overflowed = False
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class CommentBroker:
+    """
+    In-process pub/sub of comment events per travel partner request.
+    ``publish`` may be called from any thread; events are handed to each
+    subscriber's event loop, so idle subscribers cost no thread.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, request_id):
+        subscription = Subscription(asyncio.get_running_loop(), settings.TRAVEL_PARTNER_STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(request_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, request_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(request_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[request_id]
+
+    def has_subscribers(self, request_id):
+        return request_id in self._subscribers
+
+    def publish(self, request_id, comment_id, event):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(request_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, (comment_id, event))
+            except RuntimeError:  # the subscriber's loop is closed
+                self.unsubscribe(request_id, subscription)
+
+
+broker = CommentBroker()
+
+
+def publish_comment(comment):
+    """
+    Fans a new comment out to the streams of its request once the saving
+    transaction commits: directly through this process's broker, or through
+    Postgres NOTIFY to the listener of every process.
+    """
+    if settings.TRAVEL_PARTNER_STREAM_BACKEND == POSTGRES:
+        # NOTIFY is transactional, so it is delivered on commit by itself
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [NOTIFY_CHANNEL, f"{comment.request_id}:{comment.pk}"])
+        return
+    transaction.on_commit(lambda: publish_local(comment))
+
+
+def publish_local(comment):
+    # Most comments go to requests nobody is watching
+    if broker.has_subscribers(comment.request_id):
+        broker.publish(comment.request_id, comment.pk, comment_event(comment))
+
+
+class NotifyListener(threading.Thread):
+    """
+    Listens on NOTIFY_CHANNEL with a connection of its own and publishes the
+    notified comments to this process's broker, loading each comment once
+    however many streams are watching its request.
+    """
+
+    poll_timeout = 1
+
+    def __init__(self):
+        super().__init__(name="travel-partner-notify", daemon=True)
+        self.listening = threading.Event()
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        try:
+            while not self._stopped.is_set():
+                try:
+                    self.listen()
+                except Exception:
+                    logger.exception("Comment notification listener failed, reconnecting")
+                    time.sleep(1)
+        finally:
+            connections.close_all()
+
+    def listen(self):
+        params = connections["default"].get_connection_params()
+        listener = connections["default"].Database.connect(**params)
+        try:
+            listener.autocommit = True
+            with listener.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            self.listening.set()
+            while not self._stopped.is_set():
+                if select.select([listener], [], [], self.poll_timeout) == ([], [], []):
+                    continue
+                listener.poll()
+                while listener.notifies:
+                    self.deliver(listener.notifies.pop(0).payload)
+        finally:
+            self.listening.clear()
+            listener.close()
+
+    def deliver(self, payload):
+        request_id, comment_id = (int(part) for part in payload.split(":"))
+        if not broker.has_subscribers(request_id):
+            return
+        comment = TravelPartnerComment.objects.select_related("user").filter(pk=comment_id).first()
+        if comment is not None:
+            broker.publish(request_id, comment.pk, comment_event(comment))
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener():
+    """Starts this process's NOTIFY listener the first time a stream needs it."""
+    global _listener
+    if settings.TRAVEL_PARTNER_STREAM_BACKEND != POSTGRES:
+        return None
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = NotifyListener()
+            _listener.start()
+        return _listener
+
+
+def stop_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.join()
+            _listener = None
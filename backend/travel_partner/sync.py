@@ -0,0 +1,129 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+
+from .models import TravelPartnerComment, TravelPartnerRequest, TravelPartnerTombstone
+
+invalid_cursor_message = "Invalid cursor"
+
+# Kinds of changes in the feed, each read in (timestamp, id) order
+REQUESTS = "requests"
+COMMENTS = "comments"
+DELETED = "deleted"
+
+# A decoded cursor: changes after ``since`` and, when continuing a poll that
+# did not fit in one page, up to ``until`` and after the positions in ``after``
+SyncCursor = namedtuple("SyncCursor", ["since", "until", "after"])
+
+
+class SyncCursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Cursor is older than the kept deletes, reload the full list."
+    default_code = "cursor_expired"
+
+
+def encode_sync_cursor(moment):
+    return _encode(moment.isoformat())
+
+
+def encode_continuation_cursor(since, until, after):
+    positions = {kind: [moment.isoformat(), pk] for kind, (moment, pk) in after.items()}
+    return _encode(json.dumps({"since": since.isoformat(), "until": until.isoformat(), "after": positions}))
+
+
+def _encode(text):
+    return base64.urlsafe_b64encode(text.encode("ascii")).decode("ascii")
+
+
+def decode_sync_cursor(cursor):
+    try:
+        text = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii")
+        if not text.startswith("{"):
+            return SyncCursor(_moment(text), None, {})
+        data = json.loads(text)
+        after = {kind: (_moment(data["after"][kind][0]), int(data["after"][kind][1])) for kind in data["after"]}
+        if not set(after) <= {REQUESTS, COMMENTS, DELETED}:
+            raise ValueError(cursor)
+        return SyncCursor(_moment(data["since"]), _moment(data["until"]), after)
+    except (TypeError, ValueError, LookupError, UnicodeError):
+        raise NotFound(invalid_cursor_message)
+
+
+def _moment(text):
+    moment = parse_datetime(text)
+    if moment is None or timezone.is_naive(moment):
+        raise ValueError(text)
+    return moment
+
+
+def tombstone_horizon():
+    """Oldest moment tombstones are still kept for; older cursors may have missed deletes."""
+    return timezone.now() - timedelta(days=settings.TRAVEL_PARTNER_TOMBSTONE_DAYS)
+
+
+def changes_since(since, until, after, limit):
+    """
+    Requests and comments created or updated, and ids of the ones deleted, in
+    ``(since, until]``, at most ``limit`` of each kind and starting after the
+    ``(timestamp, id)`` positions in ``after``. Each part is a range scan over
+    an ``updated_at`` (or ``deleted_at``) index, so the cost follows the
+    number of changes returned.
+
+    Also returns the positions to continue from, or None once every kind has
+    been read to ``until``.
+    """
+    requests = TravelPartnerRequest.objects.select_related("user")
+    comments = TravelPartnerComment.objects.select_related("user")
+    requests, more_requests = _page(requests, "updated_at", since, until, after.get(REQUESTS), limit)
+    comments, more_comments = _page(comments, "updated_at", since, until, after.get(COMMENTS), limit)
+    tombstones, more_deleted = _page(
+        TravelPartnerTombstone.objects.only("deleted_at", "kind", "object_id"),
+        "deleted_at", since, until, after.get(DELETED), limit,
+    )
+    deleted = {TravelPartnerTombstone.REQUEST: [], TravelPartnerTombstone.COMMENT: []}
+    for tombstone in tombstones:
+        deleted[tombstone.kind].append(tombstone.object_id)
+
+    if not (more_requests or more_comments or more_deleted):
+        return requests, comments, deleted, None
+    positions = dict(after)
+    for kind, rows, field in (
+        (REQUESTS, requests, "updated_at"),
+        (COMMENTS, comments, "updated_at"),
+        (DELETED, tombstones, "deleted_at"),
+    ):
+        if rows:
+            positions[kind] = (getattr(rows[-1], field), rows[-1].pk)
+    return requests, comments, deleted, positions
+
+
+def _page(queryset, field, since, until, position, limit):
+    """Up to ``limit`` rows after ``position`` (or ``since``), and whether more follow."""
+    queryset = queryset.filter(**{f"{field}__lte": until})
+    if position is None:
+        queryset = queryset.filter(**{f"{field}__gt": since})
+    else:
+        moment, pk = position
+        # The first condition bounds the index scan, the second one only has
+        # to skip rows sharing the position's timestamp
+        queryset = queryset.filter(Q(**{f"{field}__gt": moment}) | Q(id__gt=pk), **{f"{field}__gte": moment})
+    rows = list(queryset.order_by(field, "id")[: limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def next_sync_cursor(until):
+    """
+    Cursor for the next poll. It trails ``until`` by the overlap setting, so
+    rows saved in a transaction that had not committed yet when this poll ran
+    still show up next time. Clients get those rows twice and apply them as
+    upserts.
+    """
+    return encode_sync_cursor(until - timedelta(seconds=settings.TRAVEL_PARTNER_SYNC_OVERLAP))
@@ -0,0 +1,148 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from travel_partner.models import TravelPartnerComment, TravelPartnerRequest
+from travel_partner.stream import broker, ensure_listener, stop_listener
+
+
+class CommentBrokerTests(SimpleTestCase):
+    async def test_publish_from_another_thread(self):
+        subscription = broker.subscribe(1)
+        try:
+            await asyncio.to_thread(broker.publish, 1, 5, "event")
+            self.assertEqual(await asyncio.wait_for(subscription.queue.get(), 1), (5, "event"))
+            await asyncio.to_thread(broker.publish, 2, 6, "other request")
+            self.assertTrue(subscription.queue.empty())
+        finally:
+            broker.unsubscribe(1, subscription)
+        self.assertFalse(broker.has_subscribers(1))
+
+    @override_settings(TRAVEL_PARTNER_STREAM_QUEUE_SIZE=1)
+    async def test_slow_subscriber_is_flagged(self):
+        subscription = broker.subscribe(1)
+        try:
+            broker.publish(1, 5, "a")
+            broker.publish(1, 6, "b")
+            await asyncio.sleep(0)
+            self.assertTrue(subscription.overflowed)
+            self.assertEqual(subscription.queue.qsize(), 1)
+        finally:
+            broker.unsubscribe(1, subscription)
+
+
+class CommentStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass")
+        self.token = Token.objects.create(user=self.user)
+        self.travel_request = TravelPartnerRequest.objects.create(
+            user=self.user, source="A", destination="B", member=1
+        )
+        self.seen = self.add_comment("seen")
+        self.missed = self.add_comment("missed")
+        self.url = f"/api/travel-partner/requests/{self.travel_request.id}/stream/"
+
+    def add_comment(self, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            return TravelPartnerComment.objects.create(request=self.travel_request, user=self.user, text=text)
+
+    async def test_replays_missed_then_streams_new_comments(self):
+        headers = {"authorization": f"Token {self.token.key}", "last-event-id": str(self.seen.id)}
+        response = await self.async_client.get(self.url, headers=headers)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(events), b"retry: 2000\n\n")
+            self.assertTrue((await anext(events)).decode().startswith(f"id: {self.missed.id}\nevent: comment\n"))
+            live = await sync_to_async(self.add_comment)("live")
+            event = (await asyncio.wait_for(anext(events), 2)).decode()
+            self.assertTrue(event.startswith(f"id: {live.id}\n"))
+            self.assertIn('"text": "live"', event)
+        finally:
+            await events.aclose()
+
+    async def test_replay_includes_lower_ids_committed_late(self):
+        # "seen" has the lower id, but its transaction may have committed after
+        # "missed", which the client got
+        headers = {"authorization": f"Token {self.token.key}", "last-event-id": str(self.missed.id)}
+        events = aiter((await self.async_client.get(self.url, headers=headers)).streaming_content)
+        try:
+            await anext(events)
+            self.assertTrue((await anext(events)).decode().startswith(f"id: {self.seen.id}\n"))
+        finally:
+            await events.aclose()
+
+        # Comments created well before the last one seen are not replayed
+        await TravelPartnerComment.objects.filter(pk=self.seen.pk).aupdate(
+            created_at=self.missed.created_at - timedelta(hours=1)
+        )
+        events = aiter((await self.async_client.get(self.url, headers=headers)).streaming_content)
+        try:
+            await anext(events)
+            live = await sync_to_async(self.add_comment)("live")
+            event = (await asyncio.wait_for(anext(events), 2)).decode()
+            self.assertTrue(event.startswith(f"id: {live.id}\n"))
+        finally:
+            await events.aclose()
+
+    def test_unwatched_comments_are_not_serialized(self):
+        with mock.patch("travel_partner.stream.comment_event") as comment_event:
+            self.add_comment("nobody is watching")
+        comment_event.assert_not_called()
+
+    async def test_stream_token_in_query_string(self):
+        headers = {"authorization": f"Token {self.token.key}"}
+        resp = await self.async_client.post(
+            f"/api/travel-partner/requests/{self.travel_request.id}/stream_token/", headers=headers
+        )
+        self.assertEqual(resp.status_code, 200)
+        token = resp.json()["token"]
+
+        response = await self.async_client.get(self.url, {"token": token, "last_event_id": self.seen.id})
+        self.assertEqual(response.status_code, 200)
+        events = aiter(response.streaming_content)
+        try:
+            await anext(events)
+            self.assertTrue((await anext(events)).decode().startswith(f"id: {self.missed.id}\n"))
+        finally:
+            await events.aclose()
+
+        other = await TravelPartnerRequest.objects.acreate(user=self.user, source="C", destination="D", member=1)
+        url = f"/api/travel-partner/requests/{other.id}/stream/"
+        self.assertEqual((await self.async_client.get(url, {"token": token})).status_code, 401)
+        self.assertEqual((await self.async_client.get(self.url, {"token": token + "x"})).status_code, 401)
+        with override_settings(TRAVEL_PARTNER_STREAM_TOKEN_MAX_AGE=-1):
+            self.assertEqual((await self.async_client.get(self.url, {"token": token})).status_code, 401)
+
+    def test_not_served_under_wsgi(self):
+        resp = self.client.get(self.url, HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(resp.status_code, 501)
+
+    async def test_requires_auth_and_existing_request(self):
+        self.assertEqual((await self.async_client.get(self.url)).status_code, 401)
+        headers = {"authorization": f"Token {self.token.key}"}
+        url = f"/api/travel-partner/requests/{self.travel_request.id + 1000}/stream/"
+        self.assertEqual((await self.async_client.get(url, headers=headers)).status_code, 404)
+
+
+@override_settings(TRAVEL_PARTNER_STREAM_BACKEND="postgres")
+class NotifyRelayTests(TransactionTestCase):
+    def create_request(self):
+        user = User.objects.create_user(username="user", password="pass")
+        return user, TravelPartnerRequest.objects.create(user=user, source="A", destination="B", member=1)
+
+    async def test_comments_are_relayed_through_notify(self):
+        user, travel_request = await sync_to_async(self.create_request)()
+        subscription = broker.subscribe(travel_request.id)
+        try:
+            self.assertTrue(await asyncio.to_thread(ensure_listener().listening.wait, 5))
+            comment = await TravelPartnerComment.objects.acreate(request=travel_request, user=user, text="hi")
+            comment_id, event = await asyncio.wait_for(subscription.queue.get(), 5)
+            self.assertEqual(comment_id, comment.id)
+            self.assertIn('"text": "hi"', event)
+        finally:
+            broker.unsubscribe(travel_request.id, subscription)
+            await asyncio.to_thread(stop_listener)
@@ -0,0 +1,121 @@
+import heapq
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from django.conf import settings
+from django.test import SimpleTestCase
+from core.testing import summarize
+from travel_partner.matching import (
+    BUDGET_WEIGHT,
+    MEMBER_WEIGHT,
+    OVERLAP_WEIGHT,
+    SOURCE_WEIGHT,
+    MatchIndex,
+    budget_proximity,
+    place_key,
+)
+
+# Benchmark knobs, read from the environment. The default size keeps the test
+# quick; MATCH_BENCHMARK_SIZE=1000000 is the opt-in full size run.
+SIZE = int(os.environ.get("MATCH_BENCHMARK_SIZE", "20000"))
+RUNS = int(os.environ.get("MATCH_BENCHMARK_RUNS", "50"))
+SEED = int(os.environ.get("MATCH_BENCHMARK_SEED", "1"))
+OUTPUT = os.environ.get(
+    "MATCH_BENCHMARK_OUTPUT",
+    os.path.join(settings.ROUTE_ARTIFACT_DIR, "benchmarks", "travel-partner-matches.json"),
+)
+
+TODAY = date(2025, 1, 1)
+PLACES = [f"Place{i}" for i in range(64)]
+
+
+def generate_requests(size, seed):
+    """
+    Seeded synthetic open requests: destinations skewed towards a few popular
+    places, trips of 1-14 days starting within the next year, log-normal-ish
+    budgets (a tenth unknown) and groups of 1-6.
+    """
+    rng = random.Random(seed)
+    for pk in range(1, size + 1):
+        start = TODAY + timedelta(days=rng.randrange(365))
+        yield (
+            pk,
+            rng.randrange(size // 3 + 1),
+            rng.choice(PLACES),
+            PLACES[min(len(PLACES) - 1, int(rng.expovariate(1 / 8)))],
+            start,
+            start + timedelta(days=rng.randrange(14)),
+            None if rng.random() < 0.1 else round(rng.lognormvariate(9, 0.5), 2),
+            rng.randint(1, 6),
+        )
+
+
+def scan_matches(rows, today, request, limit):
+    """The same ranking as MatchIndex.matches, by looking at every request."""
+    start = max(request.start_date.toordinal(), today.toordinal())
+    end = request.end_date.toordinal()
+    destination = place_key(request.destination)
+    source = place_key(request.source)
+    scored = []
+    for pk, user_id, row_source, row_destination, start_date, end_date, budget, member in rows:
+        row_start, row_end = start_date.toordinal(), end_date.toordinal()
+        if place_key(row_destination) != destination or row_start > end or row_end < start:
+            continue
+        if user_id == request.user_id:
+            continue
+        overlap = (min(end, row_end) - max(start, row_start) + 1) / (end - start + 1)
+        score = OVERLAP_WEIGHT * overlap + BUDGET_WEIGHT * budget_proximity(request.budget, budget)
+        score += MEMBER_WEIGHT / (1 + abs(request.member - member))
+        if place_key(row_source) == source:
+            score += SOURCE_WEIGHT
+        scored.append((score, -pk))
+    return [(score, -neg_pk) for score, neg_pk in heapq.nlargest(limit, scored)]
+
+
+class MatchIndexPerformanceTest(SimpleTestCase):
+    def time(self, fn, queries):
+        timings = []
+        results = []
+        for query in queries:
+            start = time.perf_counter()
+            results.append(fn(query))
+            timings.append((time.perf_counter() - start) * 1000)
+        return summarize(timings), results
+
+    def test_performance(self):
+        rows = list(generate_requests(SIZE, SEED))
+        start = time.perf_counter()
+        index = MatchIndex(0, TODAY, rows)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(SEED)
+        queries = [
+            SimpleNamespace(
+                user_id=row[1], source=row[2], destination=row[3], start_date=row[4], end_date=row[5],
+                budget=row[6], member=row[7],
+            )
+            for row in rng.sample(rows, min(RUNS, len(rows)))
+        ]
+        indexed, indexed_results = self.time(lambda q: index.matches(q, 20), queries)
+        scan, scan_results = self.time(lambda q: scan_matches(rows, TODAY, q, 20), queries)
+        self.assertEqual(indexed_results, scan_results)
+
+        # A write moves one request to a new trip
+        changes = [(pk, *change[1:]) for pk, change in zip(range(1, RUNS + 1), generate_requests(RUNS, SEED + 1))]
+        update, _ = self.time(lambda change: index.update(*change), changes)
+
+        results = {
+            "seed": SEED, "runs": len(queries), "size": SIZE, "build_ms": build_ms, "update": update,
+            "index": indexed, "scan": scan,
+        }
+        os.makedirs(os.path.dirname(OUTPUT), exist_ok=True)
+        with open(OUTPUT, "w") as f:
+            json.dump(results, f, indent=2)
+
+        print(f"\nMatch index over {SIZE} requests built in {build_ms:.0f} ms, updated in {update['p50_ms']:.3f} ms")
+        print("Lookup | p50 (ms) | p95 (ms) | Max (ms)")
+        for name, m in (("index", indexed), ("scan", scan)):
+            print(f"{name:<6} | {m['p50_ms']:>8.2f} | {m['p95_ms']:>8.2f} | {m['max_ms']:>8.2f}")
@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from travel_partner.models import TravelPartnerComment, TravelPartnerRequest
+
+URL = "/api/travel-partner/requests/"
+
+
+@override_settings(TRAVEL_PARTNER_LATEST_COMMENTS=2)
+class TravelPartnerFeedTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.trips = [
+            TravelPartnerRequest.objects.create(
+                user=self.user,
+                source="Dhaka",
+                destination="Sylhet" if i % 2 else "Cox's Bazar",
+                member=2,
+                budget=1000 * (i + 1),
+                start_date=f"2025-07-{i + 1:02d}",
+                end_date=f"2025-07-{i + 3:02d}",
+            )
+            for i in range(5)
+        ]
+        for i in range(4):
+            TravelPartnerComment.objects.create(request=self.trips[0], user=self.user, text=f"c{i}")
+
+    def test_pages_walk_the_feed_newest_first(self):
+        seen = []
+        resp = self.client.get(URL, {"limit": 2})
+        while True:
+            self.assertEqual(resp.status_code, 200)
+            seen.extend(r["id"] for r in resp.data["results"])
+            if not resp.data["next"]:
+                break
+            resp = self.client.get(resp.data["next"])
+        self.assertEqual(seen, [t.id for t in reversed(self.trips)])
+
+    def test_feed_entries_carry_count_and_latest_comments(self):
+        with self.assertNumQueries(2):  # page with comment counts, then the latest comments
+            resp = self.client.get(URL, {"limit": 10})
+        entry = next(r for r in resp.data["results"] if r["id"] == self.trips[0].id)
+        self.assertEqual(entry["comment_count"], 4)
+        self.assertEqual([c["text"] for c in entry["latest_comments"]], ["c3", "c2"])
+        self.assertNotIn("comments", entry)
+        resp = self.client.get(f"{URL}{self.trips[0].id}/comments/")
+        self.assertEqual([c["text"] for c in resp.data], ["c0", "c1", "c2", "c3"])
+
+    def test_filters(self):
+        def ids(**params):
+            resp = self.client.get(URL, {"limit": 10, **params})
+            self.assertEqual(resp.status_code, 200)
+            return sorted(r["id"] for r in resp.data["results"])
+
+        pks = [t.id for t in self.trips]
+        self.assertEqual(ids(destination="Sylhet"), [pks[1], pks[3]])
+        self.assertEqual(ids(start_date="2025-07-05", end_date="2025-07-06"), pks[2:])
+        self.assertEqual(ids(min_budget=2000, max_budget=3000), pks[1:3])
+        self.assertEqual(self.client.get(URL, {"min_budget": "x"}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {"cursor": "nope"}).status_code, 404)
@@ -0,0 +1,118 @@
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from travel_partner import matching
+from travel_partner.matching import IntervalTree, MatchIndex, get_match_index
+from travel_partner.models import TravelPartnerRequest
+from travel_partner.tests.test_matching_performance import TODAY, generate_requests, scan_matches
+
+
+class IntervalTreeTests(SimpleTestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        intervals = []
+        for item in range(500):
+            start = rng.randrange(0, 1000)
+            intervals.append((start, start + rng.randrange(0, 30), item))
+        tree = IntervalTree(intervals)
+        for _ in range(200):
+            start = rng.randrange(-10, 1010)
+            end = start + rng.randrange(0, 50)
+            expected = sorted(item for s, e, item in intervals if s <= end and e >= start)
+            self.assertEqual(sorted(tree.overlapping(start, end)), expected)
+
+    def test_empty(self):
+        self.assertEqual(list(IntervalTree([]).overlapping(0, 10)), [])
+
+
+class MatchIndexUpdateTests(SimpleTestCase):
+    def test_updates_match_a_fresh_scan(self):
+        rows = {row[0]: row for row in generate_requests(3000, 5)}
+        index = MatchIndex(0, TODAY, rows.values())
+        rng = random.Random(5)
+        changes = list(generate_requests(3000, 6))
+        for step in range(2000):
+            if step % 3 == 0:
+                pk = rng.choice(list(rows))
+                del rows[pk]
+                index.remove(pk)
+            else:
+                # Moves an existing request or adds a new one
+                pk = rng.randrange(1, 4000)
+                rows[pk] = (pk, *changes[step][1:])
+                index.update(*rows[pk])
+            if step % 200 == 0:
+                self.assertEqual(len(index), len(rows))
+                for row in rng.sample(list(rows.values()), 10):
+                    request = SimpleNamespace(
+                        user_id=row[1], source=row[2], destination=row[3], start_date=row[4], end_date=row[5],
+                        budget=row[6], member=row[7],
+                    )
+                    self.assertEqual(index.matches(request, 20), scan_matches(rows.values(), TODAY, request, 20))
+
+    def test_ended_and_undated_requests_are_removed(self):
+        index = MatchIndex(0, TODAY, [])
+        index.update(1, 1, "A", "B", TODAY, TODAY + timedelta(days=2), None, 1)
+        index.update(1, 1, "A", "B", TODAY - timedelta(days=3), TODAY - timedelta(days=1), None, 1)
+        index.update(2, 1, "A", "B", None, None, None, 1)
+        self.assertEqual(len(index), 0)
+
+
+class TravelPartnerMatchesApiTests(APITestCase):
+    def setUp(self):
+        # Rows of earlier tests were rolled back without tombstones
+        matching._index = None
+        self.addCleanup(setattr, matching, "_index", None)
+        self.user = User.objects.create_user(username="user", password="pass")
+        self.other = User.objects.create_user(username="other", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.day = date.today() + timedelta(days=10)
+
+    def trip(self, user, destination="Sylhet", offset=0, days=4, budget=5000, member=2, source="Dhaka"):
+        return TravelPartnerRequest.objects.create(
+            user=user,
+            source=source,
+            destination=destination,
+            member=member,
+            budget=budget,
+            start_date=self.day + timedelta(days=offset),
+            end_date=self.day + timedelta(days=offset + days - 1),
+        )
+
+    def test_ranking(self):
+        mine = self.trip(self.user)
+        same = self.trip(self.other)
+        partial = self.trip(self.other, offset=2, budget=9000, source="Khulna")
+        self.trip(self.other, offset=10)  # no overlap
+        self.trip(self.other, destination="Bandarban")
+        self.trip(self.user)  # own request
+
+        resp = self.client.get(f"/api/travel-partner/requests/{mine.id}/matches/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r["id"] for r in resp.data], [same.id, partial.id])
+        self.assertGreater(resp.data[0]["match_score"], resp.data[1]["match_score"])
+        self.assertEqual(resp.data[0]["comment_count"], 0)
+
+        resp = self.client.get(f"/api/travel-partner/requests/{mine.id}/matches/", {"limit": 1})
+        self.assertEqual([r["id"] for r in resp.data], [same.id])
+
+    def test_index_follows_writes(self):
+        mine = self.trip(self.user)
+        index = get_match_index()
+        self.assertIs(get_match_index(), index)
+        late = self.trip(self.other, destination=" sylhet ")
+        self.assertEqual([pk for _, pk in get_match_index().matches(mine, 10)], [late.id])
+        late.start_date += timedelta(days=30)
+        late.end_date += timedelta(days=30)
+        late.save()
+        self.assertEqual(get_match_index().matches(mine, 10), [])
+        late.start_date = mine.start_date
+        late.save()
+        self.assertEqual([pk for _, pk in get_match_index().matches(mine, 10)], [late.id])
+        late.delete()
+        self.assertEqual(get_match_index().matches(mine, 10), [])
+        # Applied in place rather than rebuilt
+        self.assertIs(get_match_index(), index)
@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from travel_partner.models import TravelPartnerComment, TravelPartnerRequest
+
+URL = "/api/travel-partner/requests/search/"
+
+
+class TravelPartnerSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.sylhet = TravelPartnerRequest.objects.create(
+            user=self.user, source="ঢাকা", destination="সিলেট", member=2, details="<p>চা বাগান আর ঝর্ণা</p>"
+        )
+        self.coast = TravelPartnerRequest.objects.create(
+            user=self.user, source="Dhaka", destination="Kuakata", member=3, details="Sunrise at the sea beach"
+        )
+        TravelPartnerComment.objects.create(request=self.coast, user=self.user, text="Count me in")
+
+    def ids(self, q):
+        resp = self.client.get(URL, {"q": q})
+        self.assertEqual(resp.status_code, 200)
+        return [r["id"] for r in resp.data["results"]]
+
+    def test_search(self):
+        self.assertEqual(self.ids("বাগান"), [self.sylhet.id])
+        self.assertEqual(self.ids("sea kuak"), [self.coast.id])
+        resp = self.client.get(URL, {"q": "dhaka"})
+        self.assertEqual(resp.data["results"][0]["comment_count"], 1)
+        self.assertEqual(self.client.get(URL).status_code, 400)
+
+    def test_edit_reindexes(self):
+        resp = self.client.patch(f"/api/travel-partner/requests/{self.coast.id}/", {"details": "Mangrove cruise"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.ids("mangrove"), [self.coast.id])
+        self.assertEqual(self.ids("sunrise"), [])
@@ -0,0 +1,90 @@
+import base64
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from travel_partner.models import TravelPartnerComment, TravelPartnerRequest
+from travel_partner.sync import encode_sync_cursor
+
+URL = "/api/travel-partner/requests/sync/"
+
+
+@override_settings(TRAVEL_PARTNER_SYNC_OVERLAP=0)
+class TravelPartnerSyncTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.old = TravelPartnerRequest.objects.create(user=self.user, source="A", destination="B", member=1)
+        self.old_comment = TravelPartnerComment.objects.create(request=self.old, user=self.user, text="hi")
+
+    def sync(self, cursor=None, **params):
+        resp = self.client.get(URL, {"since": cursor, **params} if cursor else params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_only_changes_after_cursor(self):
+        start = self.sync()
+        self.assertEqual(start["requests"], [])
+
+        new = TravelPartnerRequest.objects.create(user=self.user, source="C", destination="D", member=2)
+        comment = TravelPartnerComment.objects.create(request=self.old, user=self.user, text="again")
+        with self.assertNumQueries(3):
+            delta = self.sync(start["cursor"])
+        self.assertEqual([r["id"] for r in delta["requests"]], [new.id])
+        self.assertEqual([(c["id"], c["request"]) for c in delta["comments"]], [(comment.id, self.old.id)])
+        self.assertNotIn("comments", delta["requests"][0])
+
+        self.old_comment.text = "edited"
+        self.old_comment.save()
+        old_id, old_comment_id = self.old.id, self.old_comment.id
+        self.old.delete()
+        delta = self.sync(delta["cursor"])
+        self.assertEqual(delta["requests"], [])
+        self.assertEqual(delta["comments"], [])
+        self.assertEqual(delta["deleted"]["requests"], [old_id])
+        self.assertEqual(sorted(delta["deleted"]["comments"]), sorted([old_comment_id, comment.id]))
+
+        self.assertEqual(self.sync(delta["cursor"])["deleted"], {"requests": [], "comments": []})
+
+    def test_limit_continues_the_poll(self):
+        start = self.sync()
+        new = [
+            TravelPartnerRequest.objects.create(user=self.user, source="C", destination=f"D{i}", member=1)
+            for i in range(5)
+        ]
+        # Saved in one statement, so they share their updated_at
+        TravelPartnerRequest.objects.filter(pk__in=[r.pk for r in new]).update(updated_at=timezone.now())
+        comment = TravelPartnerComment.objects.create(request=new[0], user=self.user, text="hi")
+        deleted_id = new.pop().id
+        TravelPartnerRequest.objects.get(pk=deleted_id).delete()
+
+        pages = []
+        cursor = start["cursor"]
+        while True:
+            page = self.sync(cursor, limit=2)
+            pages.append(page)
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                break
+        self.assertEqual([len(page["requests"]) for page in pages], [2, 2])
+        self.assertEqual(sorted(r["id"] for page in pages for r in page["requests"]), sorted(r.id for r in new))
+        self.assertEqual([c["id"] for page in pages for c in page["comments"]], [comment.id])
+        self.assertEqual([pk for page in pages for pk in page["deleted"]["requests"]], [deleted_id])
+        # The poll's end is kept, so later changes wait for the next poll
+        later = TravelPartnerRequest.objects.create(user=self.user, source="E", destination="F", member=1)
+        self.assertEqual([r["id"] for r in self.sync(cursor)["requests"]], [later.id])
+
+    def test_bad_and_expired_cursors(self):
+        self.assertEqual(self.client.get(URL, {"since": "nope"}).status_code, 404)
+        broken = base64.urlsafe_b64encode(b'{"since": 1}').decode()
+        self.assertEqual(self.client.get(URL, {"since": broken}).status_code, 404)
+        expired = encode_sync_cursor(timezone.now() - timedelta(days=365))
+        self.assertEqual(self.client.get(URL, {"since": expired}).status_code, 410)
+
+    @override_settings(TRAVEL_PARTNER_SYNC_OVERLAP=60)
+    def test_cursor_overlaps_previous_poll(self):
+        start = encode_sync_cursor(timezone.now() - timedelta(seconds=1))
+        first = self.sync(start)
+        self.assertEqual([r["id"] for r in first["requests"]], [self.old.id])
+        self.assertEqual([r["id"] for r in self.sync(first["cursor"])["requests"]], [self.old.id])
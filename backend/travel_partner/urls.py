@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TravelPartnerRequestViewSet, TravelPartnerCommentViewSet
+from .views import CommentStreamView, TravelPartnerRequestViewSet, TravelPartnerCommentViewSet
 
 router = DefaultRouter()
 router.register(r"requests", TravelPartnerRequestViewSet, basename="travelpartnerrequest")
 router.register(r"comments", TravelPartnerCommentViewSet, basename="travelpartnercomment")
 
 urlpatterns = [
+    path("requests/<int:pk>/stream/", CommentStreamView.as_view(), name="travelpartnerrequest-stream"),
     path("", include(router.urls)),
 ]
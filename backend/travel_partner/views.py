@@ -1,23 +1,201 @@
+import asyncio
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchRank
+from django.db.models import Count, DateTimeField, ExpressionWrapper, F, Prefetch, Q, Subquery
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views import View
 from rest_framework import viewsets, permissions
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.settings import api_settings
+
+from api.pagination import SearchPagination
+from api.search import search_query
+
+from .matching import get_match_index
 from .models import TravelPartnerRequest, TravelPartnerComment
-from .serializers import TravelPartnerRequestSerializer, TravelPartnerCommentSerializer
+from .pagination import FeedKeysetPagination
+from .serializers import (
+    TravelPartnerRequestSerializer,
+    TravelPartnerCommentSerializer,
+    TravelPartnerFeedSerializer,
+    TravelPartnerFilterSerializer,
+    TravelPartnerSyncCommentSerializer,
+    TravelPartnerSyncRequestSerializer,
+)
+from .stream import broker, comment_event, ensure_listener, make_stream_token, stream_token_user_id
+from .sync import (
+    SyncCursorExpired,
+    changes_since,
+    decode_sync_cursor,
+    encode_continuation_cursor,
+    next_sync_cursor,
+    tombstone_horizon,
+)
+
+
+def with_comment_summary(queryset):
+    """Annotates comment_count and prefetches latest_comments, as TravelPartnerFeedSerializer expects."""
+    latest = TravelPartnerComment.objects.select_related("user").order_by("-created_at", "-id")
+    return queryset.annotate(comment_count=Count("comments")).prefetch_related(
+        Prefetch("comments", queryset=latest[: settings.TRAVEL_PARTNER_LATEST_COMMENTS], to_attr="latest_comments")
+    )
 
 
 class TravelPartnerRequestViewSet(viewsets.ModelViewSet):
     queryset = TravelPartnerRequest.objects.all()
     serializer_class = TravelPartnerRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedKeysetPagination
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def is_feed(self):
+        # Paginated lists are served as a feed with comment counts and only
+        # the latest comments; the plain list keeps nesting every comment
+        return self.action == "list" and self.paginator.is_requested(self.request)
+
+    def get_serializer_class(self):
+        if self.is_feed():
+            return TravelPartnerFeedSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
-        return (
-            TravelPartnerRequest.objects.all()
+        qs = TravelPartnerRequest.objects.all().select_related("user")
+        if self.action in ("comments", "matches"):
+            return qs
+        if not self.is_feed():
+            return qs.prefetch_related("comments")
+        return with_comment_summary(qs)
+
+    def filter_queryset(self, queryset):
+        if self.action != "list":
+            return queryset
+        filters = TravelPartnerFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+        if "source" in params:
+            queryset = queryset.filter(source=params["source"])
+        if "destination" in params:
+            queryset = queryset.filter(destination=params["destination"])
+        # Trips overlapping the window; ones without dates never match a bound
+        if "start_date" in params:
+            queryset = queryset.filter(end_date__gte=params["start_date"])
+        if "end_date" in params:
+            queryset = queryset.filter(start_date__lte=params["end_date"])
+        if "min_budget" in params:
+            queryset = queryset.filter(budget__gte=params["min_budget"])
+        if "max_budget" in params:
+            queryset = queryset.filter(budget__lte=params["max_budget"])
+        return queryset
+
+    @action(detail=True, methods=["get"], permission_classes=[permissions.IsAuthenticated])
+    def comments(self, request, pk=None):
+        travel_request = self.get_object()
+        thread = travel_request.comments.select_related("user").order_by("created_at", "id")
+        return Response(TravelPartnerCommentSerializer(thread, many=True).data)
+
+    @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
+    def search(self, request):
+        """Full-text search over route, category and details (``?q=``), best matches first."""
+        query = search_query(request.query_params.get("q", ""))
+        if query is None:
+            raise ValidationError({"q": ["Enter at least one word to search for."]})
+        matches = (
+            TravelPartnerRequest.objects.filter(search_vector=query)
             .select_related("user")
-            .prefetch_related("comments")
+            .annotate(rank=SearchRank(F("search_vector"), query, normalization=1))
+            .order_by("-rank", "-id")
+        )
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(with_comment_summary(matches), request, view=self)
+        return paginator.get_paginated_response(TravelPartnerFeedSerializer(page, many=True).data)
+
+    @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
+    def sync(self, request):
+        """
+        Changes since ``?since=<cursor>``: requests and comments created or
+        updated, and ids of deleted ones. Without a cursor only a starting
+        cursor is returned, to be taken before loading the full list.
+
+        A poll returns at most ``?limit=`` changes of each kind (capped by
+        TRAVEL_PARTNER_SYNC_LIMIT). When more are left ``has_more`` is true and
+        the returned cursor continues the same poll; clients fetch until it is
+        false.
+
+        Changes are found by the time they were saved, not by when their
+        transaction committed, so each final cursor reaches back
+        TRAVEL_PARTNER_SYNC_OVERLAP seconds and clients see some changes
+        twice. A change whose transaction commits more than that long after
+        it was saved can be missed; it shows up once the row changes again or
+        on a full reload.
+        """
+        data = {"requests": [], "comments": [], "deleted": {"requests": [], "comments": []}, "has_more": False}
+        since = request.query_params.get("since")
+        if not since:
+            data["cursor"] = next_sync_cursor(timezone.now())
+            return Response(data)
+
+        cursor = decode_sync_cursor(since)
+        if cursor.since < tombstone_horizon():
+            raise SyncCursorExpired()
+        try:
+            limit = int(request.query_params.get("limit", settings.TRAVEL_PARTNER_SYNC_LIMIT))
+        except ValueError:
+            limit = settings.TRAVEL_PARTNER_SYNC_LIMIT
+        limit = min(max(limit, 1), settings.TRAVEL_PARTNER_SYNC_LIMIT)
+
+        until = cursor.until or timezone.now()
+        requests, comments, deleted, after = changes_since(cursor.since, until, cursor.after, limit)
+        data["requests"] = TravelPartnerSyncRequestSerializer(requests, many=True).data
+        data["comments"] = TravelPartnerSyncCommentSerializer(comments, many=True).data
+        data["deleted"] = {"requests": deleted["request"], "comments": deleted["comment"]}
+        if after is None:
+            data["cursor"] = next_sync_cursor(until)
+        else:
+            data["cursor"] = encode_continuation_cursor(cursor.since, until, after)
+            data["has_more"] = True
+        return Response(data)
+
+    @action(detail=True, methods=["get"], permission_classes=[permissions.IsAuthenticated])
+    def matches(self, request, pk=None):
+        travel_request = self.get_object()
+        try:
+            limit = int(request.query_params.get("limit", settings.TRAVEL_PARTNER_MATCHES))
+        except ValueError:
+            limit = settings.TRAVEL_PARTNER_MATCHES
+        limit = min(max(limit, 1), settings.TRAVEL_PARTNER_MAX_PAGE_SIZE)
+
+        ranked = get_match_index().matches(travel_request, limit)
+        by_pk = with_comment_summary(TravelPartnerRequest.objects.select_related("user")).in_bulk(
+            [pk for _, pk in ranked]
+        )
+        results = []
+        for score, pk in ranked:
+            if pk in by_pk:  # deleted since the index was built
+                entry = TravelPartnerFeedSerializer(by_pk[pk]).data
+                entry["match_score"] = round(score, 4)
+                results.append(entry)
+        return Response(results)
+
+    @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
+    def stream_token(self, request, pk=None):
+        """Token for opening this request's comment stream with EventSource (``stream/?token=``)."""
+        travel_request = self.get_object()
+        return Response(
+            {
+                "token": make_stream_token(request.user, travel_request.pk),
+                "expires_in": settings.TRAVEL_PARTNER_STREAM_TOKEN_MAX_AGE,
+            }
         )
 
     @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
@@ -46,6 +224,114 @@ class TravelPartnerRequestViewSet(viewsets.ModelViewSet):
         instance.delete()
 
 
+class CommentStreamView(View):
+    """
+    Server-Sent Events stream of new comments on one travel partner request,
+    for ASGI deployments: every open stream is a coroutine waiting on the
+    comment broker, so idle streams cost no worker thread.
+
+    EventSource cannot send an Authorization header, so besides token
+    authentication the stream accepts ``?token=`` with a stream token from
+    the request's ``stream_token`` action. Under WSGI it answers 501 rather
+    than tie up a worker thread for the life of the stream.
+
+    A client reconnecting with ``Last-Event-ID`` first gets the comments it
+    missed. Comment ids are taken when a comment is saved, not when it
+    commits, so the replay also repeats comments created up to
+    TRAVEL_PARTNER_SYNC_OVERLAP seconds before the last one seen, and
+    clients skip ids they already have. Streams end after
+    TRAVEL_PARTNER_STREAM_MAX_AGE seconds, or when they fall too far behind,
+    and EventSource clients then resume on their own.
+    """
+
+    retry_ms = 2000
+
+    async def get(self, request, pk):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"detail": "Comment streams need the ASGI application (core.asgi)."}, status=501)
+        token = request.GET.get("token")
+        if token:
+            user_id = stream_token_user_id(token, pk)
+            user = await User.objects.filter(pk=user_id, is_active=True).afirst() if user_id else None
+            if user is None:
+                return JsonResponse({"detail": "Invalid or expired stream token."}, status=401)
+        else:
+            try:
+                user = await sync_to_async(self.authenticate)(request)
+            except AuthenticationFailed as e:
+                return JsonResponse({"detail": str(e.detail)}, status=401)
+            if not user.is_authenticated:
+                return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        if not await TravelPartnerRequest.objects.filter(pk=pk).aexists():
+            return JsonResponse({"detail": "Not found."}, status=404)
+
+        last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return JsonResponse({"detail": "Invalid Last-Event-ID."}, status=400)
+
+        response = StreamingHttpResponse(self.events(pk, last_event_id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # no proxy buffering
+        return response
+
+    def authenticate(self, request):
+        request = Request(
+            request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        )
+        return request.user
+
+    async def events(self, request_id, last_event_id):
+        # Subscribe before replaying so nothing committed in between is lost;
+        # comments seen in both are skipped by id
+        subscription = broker.subscribe(request_id)
+        replayed = set()
+        try:
+            ensure_listener()
+            yield f"retry: {self.retry_ms}\n\n"
+            if last_event_id is not None:
+                async for comment in self.missed(request_id, last_event_id):
+                    yield comment_event(comment)
+                    replayed.add(comment.pk)
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.TRAVEL_PARTNER_STREAM_MAX_AGE
+            while not (subscription.overflowed and subscription.queue.empty()):
+                timeout = min(settings.TRAVEL_PARTNER_STREAM_HEARTBEAT, deadline - loop.time())
+                if timeout <= 0:
+                    break
+                try:
+                    comment_id, event = await asyncio.wait_for(subscription.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if comment_id not in replayed:
+                    yield event
+        finally:
+            broker.unsubscribe(request_id, subscription)
+
+    @staticmethod
+    def missed(request_id, last_event_id):
+        """
+        Comments after the last one seen, plus the ones created shortly before
+        it, whose transactions may have committed after it. Without the last
+        seen comment only the later ids are replayed.
+        """
+        seen_at = TravelPartnerComment.objects.filter(pk=last_event_id, request_id=request_id).values("created_at")
+        window_start = ExpressionWrapper(
+            Subquery(seen_at) - timedelta(seconds=settings.TRAVEL_PARTNER_SYNC_OVERLAP),
+            output_field=DateTimeField(),
+        )
+        return (
+            TravelPartnerComment.objects.filter(request_id=request_id)
+            .filter(Q(pk__gt=last_event_id) | Q(created_at__gte=window_start))
+            .exclude(pk=last_event_id)
+            .select_related("user")
+            .order_by("created_at", "id")
+        )
+
+
 class TravelPartnerCommentViewSet(viewsets.ModelViewSet):
     queryset = TravelPartnerComment.objects.all()
     serializer_class = TravelPartnerCommentSerializer